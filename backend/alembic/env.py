@@ -0,0 +1,64 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.config import settings
+from app.database import create_db_engine
+from app.models import Base
+
+config = context.config
+
+# 以编程方式调用时不重复配置日志
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or settings.database_url
+
+
+def run_migrations_offline() -> None:
+    """生成SQL脚本而不连接数据库"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """连接数据库执行迁移"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
+    connectable = create_db_engine(get_url())
+    with connectable.connect() as connection:
+        _run_with_connection(connection)
+    connectable.dispose()
+
+
+def _run_with_connection(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite不支持大部分ALTER，使用批量模式重建表
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
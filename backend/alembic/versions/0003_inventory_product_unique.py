@@ -0,0 +1,75 @@
+"""inventory product unique
+
+每个商品只保留一条库存记录：合并历史重复行（数量求和、成本加权平均），
+并将 inventory.product_id 索引改为唯一索引，供 ON CONFLICT 使用。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 17:05:12.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+inventory = sa.table(
+    'inventory',
+    sa.column('id', sa.Integer),
+    sa.column('product_id', sa.Integer),
+    sa.column('quantity', sa.Integer),
+    sa.column('avg_cost', sa.Numeric(10, 2)),
+)
+
+
+def _merge_duplicate_rows() -> None:
+    conn = op.get_bind()
+    duplicates = conn.execute(
+        sa.select(inventory.c.product_id)
+        .group_by(inventory.c.product_id)
+        .having(sa.func.count() > 1)
+    ).scalars().all()
+
+    for product_id in duplicates:
+        rows = conn.execute(
+            sa.select(inventory.c.id, inventory.c.quantity, inventory.c.avg_cost)
+            .where(inventory.c.product_id == product_id)
+            .order_by(inventory.c.id)
+        ).all()
+        total_quantity = sum(row.quantity or 0 for row in rows)
+        total_cost = sum((row.quantity or 0) * (row.avg_cost or 0) for row in rows)
+        avg_cost = total_cost / total_quantity if total_quantity > 0 else rows[0].avg_cost
+
+        keep_id = rows[0].id
+        conn.execute(
+            inventory.update()
+            .where(inventory.c.id == keep_id)
+            .values(quantity=total_quantity, avg_cost=avg_cost)
+        )
+        conn.execute(
+            inventory.delete()
+            .where(inventory.c.id.in_([row.id for row in rows[1:]]))
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _merge_duplicate_rows()
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventory_product_id'))
+        batch_op.create_index(batch_op.f('ix_inventory_product_id'), ['product_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventory_product_id'))
+        batch_op.create_index(batch_op.f('ix_inventory_product_id'), ['product_id'], unique=False)
@@ -1,11 +1,14 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 from pydantic import BaseModel
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import aget_current_user, get_current_user, get_read_db, get_async_db
+from app.config import settings
 from app.crud import analytics as analytics_crud
+from app.crud.time_bucket import TIME_BUCKETS
 from app.models.user import User
 
 router = APIRouter()
@@ -17,22 +20,31 @@ class DateRangeQuery(BaseModel):
     group_by: Optional[str] = "day"
 
 
-@router.get("/dashboard")
-def get_dashboard_data(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """获取仪表板数据"""
-    dashboard_data = analytics_crud.get_dashboard_data(db)
-    return dashboard_data
+if settings.async_db_enabled:
+    @router.get("/dashboard")
+    async def get_dashboard_data(
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(aget_current_user)
+    ):
+        """获取仪表板数据（异步会话）"""
+        return await analytics_crud.aget_dashboard_data(db)
+else:
+    @router.get("/dashboard")
+    def get_dashboard_data(
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user)
+    ):
+        """获取仪表板数据"""
+        dashboard_data = analytics_crud.get_dashboard_data(db)
+        return dashboard_data
 
 
 @router.get("/sales-report")
 def get_sales_report(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
     end_date: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
-    group_by: str = Query("day", description="分组方式: day/week/month"),
+    group_by: str = Query("day", description="分组方式: day/week/month/quarter/year"),
     # current_user: User = Depends(get_current_user)
 ):
     """获取销售报表"""
@@ -42,8 +54,8 @@ def get_sales_report(
     except ValueError:
         raise HTTPException(status_code=400, detail="日期格式不正确，请使用 YYYY-MM-DD 格式")
 
-    if group_by not in ["day", "week", "month"]:
-        raise HTTPException(status_code=400, detail="分组方式必须是 day、week 或 month")
+    if group_by not in TIME_BUCKETS:
+        raise HTTPException(status_code=400, detail="分组方式必须是 day、week、month、quarter 或 year")
 
     sales_report = analytics_crud.get_sales_report(
         db, start_date=start_dt, end_date=end_dt, group_by=group_by
@@ -53,10 +65,10 @@ def get_sales_report(
 
 @router.get("/purchase-report")
 def get_purchase_report(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
     end_date: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
-    group_by: str = Query("day", description="分组方式: day/week/month"),
+    group_by: str = Query("day", description="分组方式: day/week/month/quarter/year"),
     current_user: User = Depends(get_current_user)
 ):
     """获取采购报表"""
@@ -66,8 +78,8 @@ def get_purchase_report(
     except ValueError:
         raise HTTPException(status_code=400, detail="日期格式不正确，请使用 YYYY-MM-DD 格式")
 
-    if group_by not in ["day", "week", "month"]:
-        raise HTTPException(status_code=400, detail="分组方式必须是 day、week 或 month")
+    if group_by not in TIME_BUCKETS:
+        raise HTTPException(status_code=400, detail="分组方式必须是 day、week、month、quarter 或 year")
 
     purchase_report = analytics_crud.get_purchase_report(
         db, start_date=start_dt, end_date=end_dt, group_by=group_by
@@ -77,7 +89,7 @@ def get_purchase_report(
 
 @router.get("/top-products")
 def get_top_selling_products(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
     end_date: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
     limit: int = Query(10, description="返回记录数"),
@@ -98,7 +110,7 @@ def get_top_selling_products(
 
 @router.get("/top-customers")
 def get_top_customers(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
     end_date: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
     limit: int = Query(10, description="返回记录数"),
@@ -119,7 +131,7 @@ def get_top_customers(
 
 @router.get("/profit-analysis")
 def get_profit_analysis(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
     end_date: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
     current_user: User = Depends(get_current_user)
@@ -139,7 +151,7 @@ def get_profit_analysis(
 
 @router.get("/inventory-turnover")
 def get_inventory_turnover(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
     end_date: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
     current_user: User = Depends(get_current_user)
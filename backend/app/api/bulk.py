@@ -0,0 +1,86 @@
+import json
+from typing import AsyncIterator, Callable, List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.crud.bulk import BulkEntry
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# 批量导入接口的OpenAPI请求体说明
+BULK_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}}
+    }
+}
+
+
+def _parse_line(line_number: int, raw: bytes, schema: Type[BaseModel]) -> Optional[BulkEntry]:
+    """解析一行NDJSON，空行返回None，无法解析或校验失败时以错误信息代替订单"""
+    try:
+        text = raw.decode("utf-8")
+        if not text.strip():
+            return None
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("每行必须是一个JSON对象")
+        return line_number, schema(**data)
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        return line_number, f"数据校验失败: {field}: {error['msg']}"
+    except ValueError as e:
+        return line_number, f"无法解析: {e}"
+
+
+async def ndjson_chunks(
+    stream: AsyncIterator[bytes], schema: Type[BaseModel], chunk_size: int
+) -> AsyncIterator[List[BulkEntry]]:
+    """边接收请求体边逐行解析NDJSON，每凑满 chunk_size 行产出一块
+
+    内存中只保留当前块和未结束的一行，导入大文件时不必先读入整个请求体。
+    """
+    chunk: List[BulkEntry] = []
+    pending = b""
+    line_number = 0
+
+    def add(raw: bytes) -> None:
+        nonlocal line_number
+        line_number += 1
+        entry = _parse_line(line_number, raw.rstrip(b"\r"), schema)
+        if entry is not None:
+            chunk.append(entry)
+
+    async for data in stream:
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        for raw in lines:
+            add(raw)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if pending:
+        add(pending)
+    if chunk:
+        yield chunk
+
+
+def reject(entries: List[BulkEntry], check: Callable[[BaseModel], Optional[str]]) -> List[BulkEntry]:
+    """对已解析的订单执行校验，不通过的以错误信息代替"""
+    checked = []
+    for line_number, order in entries:
+        error = None if isinstance(order, str) else check(order)
+        checked.append((line_number, error if error else order))
+    return checked
+
+
+def summarize(results: List[dict]) -> dict:
+    """汇总逐单结果"""
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "total": len(results),
+        "created": created,
+        "failed": len(results) - created,
+        "results": results
+    }
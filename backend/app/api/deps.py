@@ -1,13 +1,17 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.security import verify_token
 from app.config import settings
 from app.crud import user as user_crud
-from app.database import SessionLocal
+from app.database import SessionLocal, ReadSessionLocal, AsyncSessionLocal
+
+# 请求头携带该标记时，读请求也走主库（读己之写）
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="/api/auth/login"
@@ -23,6 +27,24 @@ def get_db() -> Generator:
         db.close()
 
 
+def get_read_db(request: Request) -> Generator:
+    """获取只读数据库会话，配置副本时路由到副本库"""
+    read_your_writes = request.headers.get(READ_YOUR_WRITES_HEADER, "").lower() in ("1", "true", "yes")
+    try:
+        db = SessionLocal() if read_your_writes else ReadSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator:
+    """获取异步数据库会话（需开启 async_db_enabled）"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("异步数据库未启用，请设置 ASYNC_DB_ENABLED=true")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 async def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
 ):
@@ -30,6 +52,13 @@ async def get_current_user(
     return None
 
 
+async def aget_current_user(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+):
+    """获取当前用户（异步会话，供异步路由使用）- 已禁用认证"""
+    return None
+
+
 def get_current_active_user(
     current_user = Depends(get_current_user),
 ):
@@ -49,3 +78,10 @@ def get_optional_user(
 ):
     """获取可选的当前用户 - 已禁用认证"""
     return None
+
+
+async def aget_optional_user(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+):
+    """获取可选的当前用户（异步会话，供异步路由使用）- 已禁用认证"""
+    return None
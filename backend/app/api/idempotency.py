@@ -0,0 +1,82 @@
+import json
+from typing import Callable, Optional, Union
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.crud import idempotency as idempotency_crud
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# 回放的响应携带该响应头
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def find_replay(
+    db: Session, *, scope: str, key: Optional[str], request_hash: str
+) -> Optional[JSONResponse]:
+    """幂等键已有未过期记录时返回保存的响应；同一键用于不同请求体时返回422"""
+    if not key:
+        return None
+    stored = idempotency_crud.get_active(db, scope=scope, key=key)
+    if stored is None:
+        return None
+    if stored.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_KEY_HEADER} 已用于不同的请求")
+    return JSONResponse(
+        content=json.loads(stored.response_body),
+        status_code=stored.status_code,
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+
+def record_key(
+    db: Session, *, scope: str, key: Optional[str], request_hash: str, response: dict
+) -> None:
+    """在当前事务中保存幂等记录，不提交；同一键已被并发请求写入时抛出IntegrityError"""
+    if key:
+        idempotency_crud.record(
+            db, scope=scope, key=key, request_hash=request_hash,
+            status_code=200, response=response
+        )
+
+
+def replay_conflict(
+    db: Session, error: IntegrityError, *, scope: str, key: Optional[str], request_hash: str
+) -> JSONResponse:
+    """写入冲突后返回先提交请求的响应；不是幂等键冲突时重新抛出原异常"""
+    replayed = find_replay(db, scope=scope, key=key, request_hash=request_hash)
+    if replayed is None:
+        raise error
+    return replayed
+
+
+def commit_with_key(
+    db: Session,
+    *,
+    scope: str,
+    key: Optional[str],
+    request_hash: str,
+    write: Callable[[Session], dict],
+    commit: Optional[Callable[[Callable[[Session], dict]], dict]] = None
+) -> Union[dict, JSONResponse]:
+    """write(db) 写入业务数据并返回响应，幂等记录与业务数据同一事务提交
+
+    commit 接收事务内的写入函数，负责执行、提交并返回其结果（如组提交写线程）；
+    未指定时在 db 上执行并提交。并发的重复请求先一步提交时，本次事务整体回滚并返回对方保存的响应。
+    """
+    def job(write_db: Session) -> dict:
+        response = write(write_db)
+        record_key(write_db, scope=scope, key=key, request_hash=request_hash, response=response)
+        return response
+
+    try:
+        if commit is not None:
+            return commit(job)
+        response = job(db)
+        db.commit()
+        return response
+    except IntegrityError as e:
+        db.rollback()
+        return replay_conflict(db, e, scope=scope, key=key, request_hash=request_hash)
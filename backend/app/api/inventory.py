@@ -4,11 +4,16 @@ from sqlalchemy.orm import Session
 from datetime import datetime, date
 from pydantic import BaseModel
 
-from app.api.deps import get_optional_user, get_db
+from app.api.deps import get_optional_user, get_db, get_read_db
 from app.crud import inventory as inventory_crud
 from app.crud import product as product_crud
+from app.crud import cost_revaluation, inventory_snapshot
+from app.crud import warehouse as warehouse_crud
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID
 from app.models.user import User
+from app.stock_alerts import stock_alerts
 from app.schemas.inventory import InventoryMovement, InventoryMovementCreate
+from app.schemas.inventory import Inventory as InventorySchema
 
 router = APIRouter()
 
@@ -18,19 +23,46 @@ class InventoryAdjust(BaseModel):
     adjustment_quantity: int
     reason: str
     new_avg_cost: Optional[float] = None
+    warehouse_id: Optional[int] = None
+
+
+AS_OF_QUERY = Query(None, description="历史时点 YYYY-MM-DD，返回该日结束时的库存数量")
+
+
+def _parse_as_of(as_of: str) -> datetime:
+    """as_of 日期取当天结束时刻"""
+    try:
+        return datetime.strptime(as_of, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式不正确，请使用 YYYY-MM-DD 格式")
+
+
+def _apply_as_of(db: Session, items: List[dict], as_of: str) -> List[dict]:
+    """将扁平化库存记录的数量替换为历史时点的数量"""
+    as_of_dt = _parse_as_of(as_of)
+    quantities = inventory_snapshot.quantities_as_of(
+        db, product_ids=[item["product_id"] for item in items], as_of=as_of_dt
+    )
+    for item in items:
+        item["quantity"] = quantities.get(item["product_id"], item["quantity"])
+        item["as_of"] = as_of_dt.isoformat()
+    return items
 
 
 @router.get("/")
 def read_inventory(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = Query(None),
     low_stock: bool = Query(False),
     out_of_stock: bool = Query(False),
+    as_of: Optional[str] = AS_OF_QUERY,
     # current_user: User = Depends(get_optional_user)
 ):
     """获取库存列表（扁平化数据结构）"""
+    if as_of and (low_stock or out_of_stock):
+        raise HTTPException(status_code=400, detail="as_of 不能与 low_stock、out_of_stock 同时使用")
     if low_stock:
         inventory_items = inventory_crud.get_low_stock_items_flattened(
             db, skip=skip, limit=limit
@@ -48,12 +80,14 @@ def read_inventory(
         inventory_items = inventory_crud.get_with_product_flattened(
             db, skip=skip, limit=limit
         )
+    if as_of:
+        inventory_items = _apply_as_of(db, inventory_items, as_of)
     return inventory_items
 
 
 @router.get("/low-stock")
 def read_low_stock_inventory(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
     # current_user: User = Depends(get_optional_user)
@@ -66,7 +100,7 @@ def read_low_stock_inventory(
 
 @router.get("/out-of-stock")
 def read_out_of_stock_inventory(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
     # current_user: User = Depends(get_optional_user)
@@ -79,33 +113,54 @@ def read_out_of_stock_inventory(
 
 @router.get("/summary")
 def read_inventory_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     # current_user: User = Depends(get_optional_user)
 ):
     """获取库存汇总信息"""
     return inventory_crud.get_inventory_summary(db)
 
 
+@router.get("/alerts")
+async def read_stock_alerts(
+    after: int = Query(0, ge=0, description="只返回编号大于该值的告警，传上次响应的 last_id"),
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=30, description="暂无新告警时最多等待的秒数"),
+    # current_user: User = Depends(get_optional_user)
+):
+    """获取库存预警告警（写入后增量检查产生，替代轮询低库存列表）
+
+    告警编号在每个进程内从1开始，服务重启后重新编号；after 大于当前最大编号时从头返回。
+    """
+    alerts = await stock_alerts.wait_alerts(after=after, limit=limit, wait=wait)
+    return {
+        "alerts": alerts,
+        "last_id": alerts[-1]["id"] if alerts else min(after, stock_alerts.last_id)
+    }
+
+
 @router.get("/{product_id}")
 def read_product_inventory(
     *,
     db: Session = Depends(get_db),
     product_id: int,
+    as_of: Optional[str] = AS_OF_QUERY,
     # current_user: User = Depends(get_optional_user)
 ):
     """获取指定商品的库存信息（扁平化数据结构）"""
-    inventory = inventory_crud.get_by_product(db, product_id=product_id)
+    inventory = inventory_crud.get_by_product_with_product(db, product_id=product_id)
     if not inventory:
         raise HTTPException(status_code=404, detail="库存记录不存在")
     
-    # 转换为扁平化格式
+    # 转换为扁平化格式；汇总行数量在提交后同步，可用数量取各仓库之和
     if inventory.product:
+        quantities = inventory_crud.total_quantities(db, product_ids=[product_id])
         flattened_item = {
             "id": inventory.id,
             "product_id": inventory.product_id,
-            "quantity": inventory.quantity,
+            "quantity": quantities.get(product_id, 0),
             "avg_cost": float(inventory.avg_cost) if inventory.avg_cost else 0,
             "last_updated": inventory.last_updated.isoformat() if inventory.last_updated else None,
+            "version_id": inventory.version_id,
             "product_name": inventory.product.name,
             "product_sku": inventory.product.sku,
             "product_description": inventory.product.description,
@@ -114,11 +169,27 @@ def read_product_inventory(
             "selling_price": float(inventory.product.selling_price) if inventory.product.selling_price else 0,
             "reorder_level": inventory.product.reorder_level
         }
+        if as_of:
+            flattened_item = _apply_as_of(db, [flattened_item], as_of)[0]
         return flattened_item
     else:
         return inventory
 
 
+@router.get("/{product_id}/locations")
+def read_product_locations(
+    *,
+    db: Session = Depends(get_db),
+    product_id: int,
+    # current_user: User = Depends(get_optional_user)
+):
+    """获取指定商品在各仓库的库存"""
+    product = product_crud.get(db, id=product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="商品不存在")
+    return inventory_crud.get_locations_flattened(db, product_id=product_id)
+
+
 @router.post("/adjust")
 def adjust_inventory(
     *,
@@ -136,6 +207,12 @@ def adjust_inventory(
     if adjustment.adjustment_quantity == 0:
         raise HTTPException(status_code=400, detail="调整数量不能为0")
 
+    warehouse_id = adjustment.warehouse_id or DEFAULT_WAREHOUSE_ID
+    try:
+        warehouse_crud.check_active(db, [warehouse_id])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # Perform inventory adjustment
     inventory = inventory_crud.adjust_inventory(
         db,
@@ -144,15 +221,39 @@ def adjust_inventory(
         reason=adjustment.reason,
         # user_id=current_user.id if current_user else None,
         user_id=None,
-        new_avg_cost=adjustment.new_avg_cost
+        new_avg_cost=adjustment.new_avg_cost,
+        warehouse_id=warehouse_id
     )
 
-    return {"message": "库存调整成功", "inventory": inventory}
+    # 只返回库存字段，不带计数器、预警的内部列
+    return {"message": "库存调整成功", "inventory": InventorySchema.model_validate(inventory)}
+
+
+@router.post("/revalue-costs")
+def revalue_inventory_costs(
+    *,
+    db: Session = Depends(get_db),
+    product_ids: Optional[List[int]] = Query(None),
+    # current_user: User = Depends(get_optional_user)
+):
+    """按采购、销售流水重算平均成本，不指定商品时重算全部商品"""
+    return cost_revaluation.revalue(db, product_ids=product_ids)
+
+
+@router.post("/snapshots")
+def create_inventory_snapshot(
+    *,
+    db: Session = Depends(get_db),
+    min_new_movements: int = Query(0, ge=0, description="新增变动少于该数量时不创建检查点"),
+    # current_user: User = Depends(get_optional_user)
+):
+    """创建库存快照检查点"""
+    return inventory_snapshot.take_snapshot(db, min_new_movements=min_new_movements)
 
 
 @router.get("/movements/", response_model=List[InventoryMovement])
 def read_inventory_movements(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
     product_id: Optional[int] = Query(None),
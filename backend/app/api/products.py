@@ -147,6 +147,8 @@ def delete_product(
 
     # 删除相关的库存记录
     from app.models.inventory import Inventory
+    from app.models.warehouse import WarehouseStock
+    db.query(WarehouseStock).filter(WarehouseStock.product_id == product_id).delete()
     inventory = db.query(Inventory).filter(Inventory.product_id == product_id).first()
     if inventory:
         db.delete(inventory)
@@ -1,28 +1,33 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_optional_user, get_db
+from app.api.bulk import BULK_REQUEST_BODY, ndjson_chunks, reject, summarize
+from app.api.idempotency import IDEMPOTENCY_KEY_HEADER, commit_with_key, find_replay
+from app.api.deps import aget_optional_user, get_optional_user, get_db, get_read_db, get_async_db
+from app.config import settings
 from app.crud import purchase as purchase_crud
 from app.crud import supplier as supplier_crud
+from app.crud.idempotency import request_hash as idempotency_hash
 from app.models.user import User
-from app.schemas.purchase import Purchase, PurchaseCreate, PurchaseUpdate
+from app.schemas.purchase import Purchase, PurchaseCreate, PurchaseUpdate, PurchaseStatusBulkUpdate
 from app.schemas.purchase import PurchaseItem as PurchaseItemSchema
 
 router = APIRouter()
 
 
-@router.get("/")
-def read_purchases(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
-    supplier_id: Optional[int] = Query(None),
-    status: Optional[str] = Query(None),
-    search: Optional[str] = Query(None),
-    # current_user: User = Depends(get_optional_user)
+def _read_purchases(
+    db: Session,
+    *,
+    skip: int,
+    limit: int,
+    supplier_id: Optional[int],
+    status: Optional[str],
+    search: Optional[str],
 ):
-    """获取采购订单列表"""
+    """按筛选条件获取采购订单列表"""
     if supplier_id:
         purchases = purchase_crud.get_by_supplier_flattened(
             db, supplier_id=supplier_id, skip=skip, limit=limit
@@ -42,28 +47,55 @@ def read_purchases(
     return purchases
 
 
-@router.post("/")
-def create_purchase(
-    *,
-    db: Session = Depends(get_db),
-    purchase_in: PurchaseCreate,
-    # current_user: User = Depends(get_optional_user)
-):
-    """创建采购订单"""
-    # Validate supplier exists
-    supplier = supplier_crud.get(db, id=purchase_in.supplier_id)
-    if not supplier:
-        raise HTTPException(status_code=404, detail="供应商不存在")
+if settings.async_db_enabled:
+    @router.get("/")
+    async def read_purchases(
+        db: AsyncSession = Depends(get_async_db),
+        skip: int = 0,
+        limit: int = 100,
+        supplier_id: Optional[int] = Query(None),
+        status: Optional[str] = Query(None),
+        search: Optional[str] = Query(None),
+        # current_user: User = Depends(aget_optional_user)
+    ):
+        """获取采购订单列表（异步会话）"""
+        if supplier_id or status or search:
+            # 筛选查询复用同步CRUD，在异步连接上执行
+            return await db.run_sync(
+                lambda session: _read_purchases(
+                    session, skip=skip, limit=limit, supplier_id=supplier_id,
+                    status=status, search=search
+                )
+            )
+        return await purchase_crud.aget_multi_with_items_flattened(
+            db, skip=skip, limit=limit
+        )
+else:
+    @router.get("/")
+    def read_purchases(
+        db: Session = Depends(get_read_db),
+        skip: int = 0,
+        limit: int = 100,
+        supplier_id: Optional[int] = Query(None),
+        status: Optional[str] = Query(None),
+        search: Optional[str] = Query(None),
+        # current_user: User = Depends(get_optional_user)
+    ):
+        """获取采购订单列表"""
+        return _read_purchases(
+            db, skip=skip, limit=limit, supplier_id=supplier_id,
+            status=status, search=search
+        )
 
-    # Validate items
-    if not purchase_in.items:
-        raise HTTPException(status_code=400, detail="采购订单必须包含商品")
 
+def _post_purchase_response(db: Session, purchase_in: PurchaseCreate) -> dict:
+    """写入采购订单并生成扁平化响应；不提交事务"""
     # Create purchase with items
-    purchase = purchase_crud.create_purchase_with_items(
+    purchase = purchase_crud.post_purchase(
         db, purchase_in=purchase_in, user_id= None #current_user.id if current_user else None
     )
-    
+    purchase = purchase_crud.get_with_items(db, id=purchase.id)
+
     # Return flattened version
     flattened_purchase = {
         "id": purchase.id,
@@ -75,11 +107,13 @@ def create_purchase(
         "status": purchase.status,
         "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
         "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
+        "version_id": purchase.version_id,
         "items": [
             {
                 "id": item.id,
                 "purchase_id": item.purchase_id,
                 "product_id": item.product_id,
+                "warehouse_id": item.warehouse_id,
                 "quantity": item.quantity,
                 "unit_price": float(item.unit_price) if item.unit_price else 0,
                 "total_price": float(item.total_price) if item.total_price else 0,
@@ -92,6 +126,85 @@ def create_purchase(
     return flattened_purchase
 
 
+@router.post("/")
+def create_purchase(
+    *,
+    db: Session = Depends(get_db),
+    purchase_in: PurchaseCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
+    # current_user: User = Depends(get_optional_user)
+):
+    """创建采购订单，携带 Idempotency-Key 的重试请求直接回放首次响应"""
+    request_hash = idempotency_hash(purchase_in.model_dump(warnings=False))
+    replayed = find_replay(db, scope="purchases", key=idempotency_key, request_hash=request_hash)
+    if replayed:
+        return replayed
+
+    # Validate supplier exists
+    supplier = supplier_crud.get(db, id=purchase_in.supplier_id)
+    if not supplier:
+        raise HTTPException(status_code=404, detail="供应商不存在")
+
+    # Validate items
+    if not purchase_in.items:
+        raise HTTPException(status_code=400, detail="采购订单必须包含商品")
+
+    try:
+        # 订单与幂等记录同一事务提交
+        return commit_with_key(
+            db, scope="purchases", key=idempotency_key, request_hash=request_hash,
+            write=lambda write_db: _post_purchase_response(write_db, purchase_in)
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/bulk", openapi_extra=BULK_REQUEST_BODY)
+async def import_purchases(
+    request: Request,
+    db: Session = Depends(get_db),
+    chunk_size: Optional[int] = Query(None, ge=1, le=1000, description="每个事务提交的订单数"),
+    # current_user: User = Depends(get_optional_user)
+):
+    """批量导入采购订单（NDJSON，每行一个订单），返回逐单结果"""
+    chunk_size = chunk_size or settings.bulk_import_chunk_size
+    results = []
+    # 边接收边解析，每凑满一块即校验并提交
+    async for entries in ndjson_chunks(request.stream(), PurchaseCreate, chunk_size):
+        orders = [order for _, order in entries if not isinstance(order, str)]
+        supplier_ids = await run_in_threadpool(
+            supplier_crud.get_existing_ids, db, {order.supplier_id for order in orders}
+        )
+        entries = reject(entries, lambda order: (
+            "供应商不存在" if order.supplier_id not in supplier_ids
+            else "采购订单必须包含商品" if not order.items
+            else None
+        ))
+        results.extend(await run_in_threadpool(
+            purchase_crud.import_purchases,
+            db,
+            orders=entries,
+            user_id=None,  # user_id=current_user.id if current_user else None
+            chunk_size=chunk_size
+        ))
+    return summarize(results)
+
+
+@router.patch("/status")
+def bulk_update_purchase_status(
+    *,
+    db: Session = Depends(get_db),
+    status_in: PurchaseStatusBulkUpdate,
+    # current_user: User = Depends(get_optional_user)
+):
+    """批量变更采购订单状态，返回逐单结果"""
+    try:
+        return purchase_crud.bulk_update_status(db, ids=status_in.ids, status=status_in.status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/{purchase_id}")
 def read_purchase(
     *,
@@ -115,11 +228,13 @@ def read_purchase(
         "status": purchase.status,
         "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
         "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
+        "version_id": purchase.version_id,
         "items": [
             {
                 "id": item.id,
                 "purchase_id": item.purchase_id,
                 "product_id": item.product_id,
+                "warehouse_id": item.warehouse_id,
                 "quantity": item.quantity,
                 "unit_price": float(item.unit_price) if item.unit_price else 0,
                 "total_price": float(item.total_price) if item.total_price else 0,
@@ -145,12 +260,14 @@ def update_purchase(
     if not purchase:
         raise HTTPException(status_code=404, detail="采购订单不存在")
 
-    # Only allow updating status for completed purchases
-    if purchase.status == "completed":
-        if purchase_in.status and purchase_in.status != purchase.status:
+    # 状态变更经过流转校验，取消时扣回入库数量
+    if purchase_in.status and purchase_in.status != purchase.status:
+        try:
             purchase = purchase_crud.update_status(
-                db, db_obj=purchase, status=purchase_in.status
+                db, db_obj=purchase, status=purchase_in.status, expected_version=purchase_in.version_id
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
     db.refresh(purchase)
     
@@ -165,6 +282,7 @@ def update_purchase(
         "status": purchase.status,
         "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
         "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
+        "version_id": purchase.version_id,
         "items": []
     }
     return flattened_purchase
@@ -176,6 +294,7 @@ def update_purchase_status(
     db: Session = Depends(get_db),
     purchase_id: int,
     status: str,
+    version_id: Optional[int] = Query(None, description="读取时的版本号，提供时校验订单是否已被修改"),
     # current_user: User = Depends(get_optional_user)
 ):
     """更新采购订单状态"""
@@ -183,7 +302,12 @@ def update_purchase_status(
     if not purchase:
         raise HTTPException(status_code=404, detail="采购订单不存在")
     
-    purchase = purchase_crud.update_status(db, db_obj=purchase, status=status)
+    try:
+        purchase = purchase_crud.update_status(
+            db, db_obj=purchase, status=status, expected_version=version_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Return flattened version
     flattened_purchase = {
@@ -196,6 +320,7 @@ def update_purchase_status(
         "status": purchase.status,
         "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
         "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
+        "version_id": purchase.version_id,
         "items": []
     }
     return flattened_purchase
\ No newline at end of file
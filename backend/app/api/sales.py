@@ -1,29 +1,35 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.api.deps import get_optional_user, get_db
+from app.api.bulk import BULK_REQUEST_BODY, ndjson_chunks, reject, summarize
+from app.api.idempotency import IDEMPOTENCY_KEY_HEADER, commit_with_key, find_replay
+from app.api.deps import aget_optional_user, get_optional_user, get_db, get_read_db, get_async_db
+from app.config import settings
 from app.crud import sale as sale_crud
 from app.crud import customer as customer_crud
+from app.crud.idempotency import request_hash as idempotency_hash
+from app.group_commit import sale_writer
 from app.models.user import User
-from app.schemas.sale import Sale, SaleCreate, SaleUpdate
+from app.schemas.sale import Sale, SaleCreate, SaleUpdate, SaleStatusBulkUpdate
 
 router = APIRouter()
 
 
-@router.get("/")
-def read_sales(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
-    customer_id: Optional[int] = Query(None),
-    status: Optional[str] = Query(None),
-    search: Optional[str] = Query(None),
-    date: Optional[str] = Query(None),
-    # # current_user: User = Depends(get_optional_user)
+def _read_sales(
+    db: Session,
+    *,
+    skip: int,
+    limit: int,
+    customer_id: Optional[int],
+    status: Optional[str],
+    search: Optional[str],
+    date: Optional[str],
 ):
-    """获取销售订单列表"""
+    """按筛选条件获取销售订单列表"""
     if customer_id:
         sales = sale_crud.get_by_customer_flattened(
             db, customer_id=customer_id, skip=skip, limit=limit
@@ -52,14 +58,101 @@ def read_sales(
     return sales
 
 
+if settings.async_db_enabled:
+    @router.get("/")
+    async def read_sales(
+        db: AsyncSession = Depends(get_async_db),
+        skip: int = 0,
+        limit: int = 100,
+        customer_id: Optional[int] = Query(None),
+        status: Optional[str] = Query(None),
+        search: Optional[str] = Query(None),
+        date: Optional[str] = Query(None),
+        # current_user: User = Depends(aget_optional_user)
+    ):
+        """获取销售订单列表（异步会话）"""
+        if customer_id or status or search or date:
+            # 筛选查询复用同步CRUD，在异步连接上执行
+            return await db.run_sync(
+                lambda session: _read_sales(
+                    session, skip=skip, limit=limit, customer_id=customer_id,
+                    status=status, search=search, date=date
+                )
+            )
+        return await sale_crud.aget_multi_with_items_flattened(
+            db, skip=skip, limit=limit
+        )
+else:
+    @router.get("/")
+    def read_sales(
+        db: Session = Depends(get_read_db),
+        skip: int = 0,
+        limit: int = 100,
+        customer_id: Optional[int] = Query(None),
+        status: Optional[str] = Query(None),
+        search: Optional[str] = Query(None),
+        date: Optional[str] = Query(None),
+        # # current_user: User = Depends(get_optional_user)
+    ):
+        """获取销售订单列表"""
+        return _read_sales(
+            db, skip=skip, limit=limit, customer_id=customer_id,
+            status=status, search=search, date=date
+        )
+
+
+def _post_sale_response(db: Session, sale_in: SaleCreate) -> dict:
+    """写入销售订单并生成扁平化响应；不提交事务"""
+    # Create sale with items (includes inventory check)
+    sale = sale_crud.post_sale(
+        db, sale_in=sale_in, user_id=None# user_id=current_user.id if current_user else None
+    )
+    sale = sale_crud.get_with_items(db, id=sale.id)
+
+    # Return flattened version
+    flattened_sale = {
+        "id": sale.id,
+        "customer_id": sale.customer_id,
+        "user_id": sale.user_id,
+        "sale_number": sale.sale_number,
+        "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
+        "total_amount": float(sale.total_amount) if sale.total_amount else 0,
+        "status": sale.status,
+        "created_at": sale.created_at.isoformat() if sale.created_at else None,
+        "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
+        "version_id": sale.version_id,
+        "items": [
+            {
+                "id": item.id,
+                "sale_id": item.sale_id,
+                "product_id": item.product_id,
+                "warehouse_id": item.warehouse_id,
+                "quantity": item.quantity,
+                "unit_price": float(item.unit_price) if item.unit_price else 0,
+                "total_price": float(item.total_price) if item.total_price else 0,
+                "product_name": item.product.name if item.product else None,
+                "product_sku": item.product.sku if item.product else None
+            }
+            for item in sale.items
+        ]
+    }
+    return flattened_sale
+
+
 @router.post("/")
 def create_sale(
     *,
     db: Session = Depends(get_db),
     sale_in: SaleCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
     # current_user: User = Depends(get_optional_user)
 ):
-    """创建销售订单"""
+    """创建销售订单，携带 Idempotency-Key 的重试请求直接回放首次响应"""
+    request_hash = idempotency_hash(sale_in.model_dump(warnings=False))
+    replayed = find_replay(db, scope="sales", key=idempotency_key, request_hash=request_hash)
+    if replayed:
+        return replayed
+
     # Validate customer exists
     customer = customer_crud.get(db, id=sale_in.customer_id)
     if not customer:
@@ -69,38 +162,64 @@ def create_sale(
     if not sale_in.items:
         raise HTTPException(status_code=400, detail="销售订单必须包含商品")
 
+    # 开启组提交时交给写线程，与同一时间窗口内的其他订单合并提交
+    commit = (
+        (lambda job: sale_writer.submit(job).result())
+        if settings.sale_group_commit_enabled else None
+    )
     try:
-        # Create sale with items (includes inventory check)
-        sale = sale_crud.create_sale_with_items(
-            db, sale_in=sale_in, user_id=None# user_id=current_user.id if current_user else None
+        # 订单与幂等记录同一事务提交
+        return commit_with_key(
+            db, scope="sales", key=idempotency_key, request_hash=request_hash,
+            write=lambda write_db: _post_sale_response(write_db, sale_in),
+            commit=commit
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/bulk", openapi_extra=BULK_REQUEST_BODY)
+async def import_sales(
+    request: Request,
+    db: Session = Depends(get_db),
+    chunk_size: Optional[int] = Query(None, ge=1, le=1000, description="每个事务提交的订单数"),
+    # current_user: User = Depends(get_optional_user)
+):
+    """批量导入销售订单（NDJSON，每行一个订单），返回逐单结果"""
+    chunk_size = chunk_size or settings.bulk_import_chunk_size
+    results = []
+    # 边接收边解析，每凑满一块即校验并提交
+    async for entries in ndjson_chunks(request.stream(), SaleCreate, chunk_size):
+        orders = [order for _, order in entries if not isinstance(order, str)]
+        customer_ids = await run_in_threadpool(
+            customer_crud.get_existing_ids, db, {order.customer_id for order in orders}
         )
-        
-        # Return flattened version
-        flattened_sale = {
-            "id": sale.id,
-            "customer_id": sale.customer_id,
-            "user_id": sale.user_id,
-            "sale_number": sale.sale_number,
-            "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
-            "total_amount": float(sale.total_amount) if sale.total_amount else 0,
-            "status": sale.status,
-            "created_at": sale.created_at.isoformat() if sale.created_at else None,
-            "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
-            "items": [
-                {
-                    "id": item.id,
-                    "sale_id": item.sale_id,
-                    "product_id": item.product_id,
-                    "quantity": item.quantity,
-                    "unit_price": float(item.unit_price) if item.unit_price else 0,
-                    "total_price": float(item.total_price) if item.total_price else 0,
-                    "product_name": item.product.name if item.product else None,
-                    "product_sku": item.product.sku if item.product else None
-                }
-                for item in sale.items
-            ]
-        }
-        return flattened_sale
+        entries = reject(entries, lambda order: (
+            "客户不存在" if order.customer_id not in customer_ids
+            else "销售订单必须包含商品" if not order.items
+            else None
+        ))
+        results.extend(await run_in_threadpool(
+            sale_crud.import_sales,
+            db,
+            orders=entries,
+            user_id=None,  # user_id=current_user.id if current_user else None
+            chunk_size=chunk_size
+        ))
+    return summarize(results)
+
+
+@router.patch("/status")
+def bulk_update_sale_status(
+    *,
+    db: Session = Depends(get_db),
+    status_in: SaleStatusBulkUpdate,
+    # current_user: User = Depends(get_optional_user)
+):
+    """批量变更销售订单状态，返回逐单结果"""
+    try:
+        return sale_crud.bulk_update_status(db, ids=status_in.ids, status=status_in.status)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -128,11 +247,13 @@ def read_sale(
         "status": sale.status,
         "created_at": sale.created_at.isoformat() if sale.created_at else None,
         "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
+        "version_id": sale.version_id,
         "items": [
             {
                 "id": item.id,
                 "sale_id": item.sale_id,
                 "product_id": item.product_id,
+                "warehouse_id": item.warehouse_id,
                 "quantity": item.quantity,
                 "unit_price": float(item.unit_price) if item.unit_price else 0,
                 "total_price": float(item.total_price) if item.total_price else 0,
@@ -158,16 +279,21 @@ def update_sale(
     if not sale:
         raise HTTPException(status_code=404, detail="销售订单不存在")
     
-    # Only allow updating status for completed sales
-    if sale.status == "completed":
-        if sale_in.status and sale_in.status != sale.status:
+    expected_version = sale_in.version_id
+    # 已完成订单只允许变更状态
+    if sale.status != "completed":
+        fields = sale_in.model_dump(exclude_unset=True, exclude={"status"})
+        if set(fields) - {"version_id"}:
+            sale = sale_crud.update(db, db_obj=sale, obj_in=fields)
+            expected_version = None
+    # 状态变更经过流转校验，取消时回补库存
+    if sale_in.status and sale_in.status != sale.status:
+        try:
             sale = sale_crud.update_status(
-                db, db_obj=sale, status=sale_in.status
+                db, db_obj=sale, status=sale_in.status, expected_version=expected_version
             )
-    else:
-        sale = sale_crud.update_sale_with_items(
-            db, db_obj=sale, sale_in=sale_in
-        )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
     db.refresh(sale)
     
@@ -182,6 +308,7 @@ def update_sale(
         "status": sale.status,
         "created_at": sale.created_at.isoformat() if sale.created_at else None,
         "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
+        "version_id": sale.version_id,
         "items": []
     }
     return flattened_sale
@@ -193,6 +320,7 @@ def update_sale_status(
     db: Session = Depends(get_db),
     sale_id: int,
     status: str,
+    version_id: Optional[int] = Query(None, description="读取时的版本号，提供时校验订单是否已被修改"),
     # current_user: User = Depends(get_optional_user)
 ):
     """更新销售订单状态"""
@@ -200,7 +328,12 @@ def update_sale_status(
     if not sale:
         raise HTTPException(status_code=404, detail="销售订单不存在")
     
-    sale = sale_crud.update_status(db, db_obj=sale, status=status)
+    try:
+        sale = sale_crud.update_status(
+            db, db_obj=sale, status=status, expected_version=version_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Return flattened version
     flattened_sale = {
@@ -213,6 +346,7 @@ def update_sale_status(
         "status": sale.status,
         "created_at": sale.created_at.isoformat() if sale.created_at else None,
         "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
+        "version_id": sale.version_id,
         "items": []
     }
     return flattened_sale
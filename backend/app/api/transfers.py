@@ -0,0 +1,50 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.api.deps import get_db
+from app.crud import stock_transfer as transfer_crud
+from app.schemas.stock_transfer import StockTransferCreate
+
+router = APIRouter()
+
+
+@router.get("/")
+def get_transfers(
+    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    warehouse_id: Optional[int] = Query(None, description="按调出或调入仓库筛选")
+):
+    """获取调拨单列表"""
+    return transfer_crud.get_multi_flattened(
+        db, warehouse_id=warehouse_id, skip=skip, limit=limit
+    )
+
+
+@router.post("/")
+def create_transfer(
+    *,
+    db: Session = Depends(get_db),
+    transfer_in: StockTransferCreate,
+    # current_user: User = Depends(get_optional_user)
+):
+    """创建调拨单，创建即在两个仓库间过账库存"""
+    try:
+        return transfer_crud.create_transfer(
+            db, transfer_in=transfer_in, user_id=None  # current_user.id if current_user else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{transfer_id}")
+def get_transfer(
+    *,
+    db: Session = Depends(get_db),
+    transfer_id: int
+):
+    """获取调拨单详情"""
+    transfer = transfer_crud.get_with_items_flattened(db, id=transfer_id)
+    if not transfer:
+        raise HTTPException(status_code=404, detail="调拨单不存在")
+    return transfer
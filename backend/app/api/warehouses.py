@@ -0,0 +1,83 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.api.deps import get_db
+from app.crud import warehouse as warehouse_crud
+from app.schemas.warehouse import Warehouse, WarehouseCreate, WarehouseUpdate
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[Warehouse])
+def get_warehouses(
+    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """获取仓库列表"""
+    return warehouse_crud.get_multi(db=db, skip=skip, limit=limit)
+
+
+@router.post("/", response_model=Warehouse)
+def create_warehouse(
+    *,
+    db: Session = Depends(get_db),
+    warehouse_in: WarehouseCreate
+):
+    """创建新仓库"""
+    # 检查编码是否已存在
+    existing = warehouse_crud.get_by_code(db=db, code=warehouse_in.code)
+    if existing:
+        raise HTTPException(
+            status_code=400,
+            detail="仓库编码已存在"
+        )
+
+    warehouse = warehouse_crud.create(db=db, obj_in=warehouse_in)
+    return warehouse
+
+
+@router.get("/{warehouse_id}", response_model=Warehouse)
+def get_warehouse(
+    *,
+    db: Session = Depends(get_db),
+    warehouse_id: int
+):
+    """获取仓库详情"""
+    warehouse = warehouse_crud.get(db=db, id=warehouse_id)
+    if not warehouse:
+        raise HTTPException(status_code=404, detail="仓库不存在")
+    return warehouse
+
+
+@router.put("/{warehouse_id}", response_model=Warehouse)
+def update_warehouse(
+    *,
+    db: Session = Depends(get_db),
+    warehouse_id: int,
+    warehouse_in: WarehouseUpdate
+):
+    """更新仓库信息；停用后不能再向该仓库出入库，已有库存保留"""
+    warehouse = warehouse_crud.get(db=db, id=warehouse_id)
+    if not warehouse:
+        raise HTTPException(status_code=404, detail="仓库不存在")
+
+    warehouse = warehouse_crud.update(db=db, db_obj=warehouse, obj_in=warehouse_in)
+    return warehouse
+
+
+@router.get("/{warehouse_id}/stock")
+def get_warehouse_stock(
+    *,
+    db: Session = Depends(get_db),
+    warehouse_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """获取仓库内各商品的库存"""
+    warehouse = warehouse_crud.get(db=db, id=warehouse_id)
+    if not warehouse:
+        raise HTTPException(status_code=404, detail="仓库不存在")
+    return warehouse_crud.get_stock_flattened(
+        db, warehouse_id=warehouse_id, skip=skip, limit=limit
+    )
@@ -1,10 +1,74 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./inventory.db"
 
+    # Read replica (只读GET路由使用，为空时与主库相同)
+    replica_database_url: Optional[str] = None
+
+    # Async database (aiosqlite / asyncpg)
+    async_db_enabled: bool = False
+    async_database_url: Optional[str] = None  # 为空时由database_url推导
+
+    # Connection pool
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_pre_ping: bool = True
+    db_strict_loading: bool = False  # 测试用：关系属性懒加载时抛出异常
+
+    # SQLite tuning (applied on every new connection)
+    sqlite_tuning_enabled: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 64000
+    sqlite_mmap_size: int = 268435456  # 256 MB
+
+    # SQL instrumentation
+    sql_instrumentation_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0
+
+    # Document numbers (每个进程一次预留的单据号数量)
+    document_number_block_size: int = 50
+
+    # Group commit (销售订单由单个写线程合并提交)
+    sale_group_commit_enabled: bool = False
+    group_commit_window_ms: float = 2.0
+    group_commit_max_batch: int = 200
+
+    # 库存预警：写入提交后检查改动商品，告警保存在进程内队列
+    stock_alerts_enabled: bool = True
+    stock_alert_queue_size: int = 1000
+
+    # 汇总行数量的批量同步间隔（毫秒），出入库只写分仓库存；为0时每次提交后立即同步
+    inventory_rollup_interval_ms: float = 200.0
+
+    # 库存汇总计数器按商品ID取模分散到的行数，读取时求和，避免并发写入集中在同一行
+    inventory_counter_slots: int = 16
+
+    # 乐观锁冲突时服务端增量操作的最大尝试次数
+    optimistic_retry_attempts: int = 3
+
+    # Bulk import
+    bulk_import_chunk_size: int = 100  # 批量导入时每个事务提交的订单数
+
+    # 平均成本重算任务（每天该整点执行一次，为空时不启用）
+    avg_cost_revaluation_hour: Optional[int] = None
+
+    # 库存快照检查点（每天该整点执行一次，为空时不启用）
+    inventory_snapshot_hour: Optional[int] = None
+
+    # 历史数据归档（每天该整点执行一次，为空时不启用），保留最近N个月在热表
+    archive_hour: Optional[int] = None
+    archive_retention_months: int = 12
+
+    # Idempotency-Key 重放缓存
+    idempotency_ttl_seconds: int = 86400
+    idempotency_purge_interval_seconds: int = 300
+
     # Security
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
@@ -16,6 +80,10 @@ class Settings(BaseSettings):
     # CORS
     backend_cors_origins: list = ["http://localhost:3000", "http://localhost:5173"]
 
+    # Runtime
+    run_migrations_on_startup: bool = False  # 启动时执行 alembic upgrade，仅建议单进程开发环境开启
+    db_warmup_connections: int = 5  # 启动时预建的连接数，不超过 db_pool_size
+
     # Project Info
     PROJECT_NAME: str = "ERP进销存管理系统"
     VERSION: str = "1.0.0"
@@ -7,5 +7,12 @@ from .sale import sale
 from .inventory import inventory, inventory_movement
 from .analytics import analytics
 from .user import user
+from .idempotency import idempotency
+from .costing import cost_revaluation
+from .inventory_snapshot import inventory_snapshot
+from .archive import archive
+from .inventory_counter import inventory_counter
+from .warehouse import warehouse
+from .stock_transfer import stock_transfer
 
-__all__ = ["CRUDBase", "supplier", "customer", "product", "purchase", "sale", "inventory", "inventory_movement", "analytics", "user"]
\ No newline at end of file
+__all__ = ["CRUDBase", "supplier", "customer", "product", "purchase", "sale", "inventory", "inventory_movement", "analytics", "user", "idempotency", "cost_revaluation", "inventory_snapshot", "archive", "inventory_counter", "warehouse", "stock_transfer"]
\ No newline at end of file
@@ -1,6 +1,7 @@
 from typing import List, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, desc, extract, cast, String
+from sqlalchemy import and_, or_, func, desc, extract, cast, String, select
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -8,119 +9,121 @@ from app.models.sale import Sale, SaleItem
 from app.models.purchase import Purchase, PurchaseItem
 from app.models.product import Product
 from app.models.inventory import Inventory
+from app.models.inventory_counter import InventoryCounter
 from app.models.customer import Customer
 from app.models.supplier import Supplier
+from app.crud.archive import archive
+from app.crud.time_bucket import time_bucket
 
 
 class AnalyticsCRUD:
-    def get_dashboard_data(self, db: Session) -> Dict[str, Any]:
-        """获取仪表板数据"""
-        today = datetime.now().date()
+    def _dashboard_statements(self) -> Dict[str, Any]:
+        """构建仪表板所需的统计查询"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        tomorrow = today + timedelta(days=1)
         start_of_month = today.replace(day=1)
         start_of_year = today.replace(month=1, day=1)
 
-        # 今日销售统计
-        today_sales = (
-            db.query(func.coalesce(func.sum(Sale.total_amount), 0))
-            .filter(func.date(Sale.created_at) == today)
-            .scalar()
-        )
-
-        # 本月销售统计
-        month_sales = (
-            db.query(func.coalesce(func.sum(Sale.total_amount), 0))
-            .filter(
-                and_(
-                    func.date(Sale.created_at) >= start_of_month,
-                    func.date(Sale.created_at) <= today
+        # 使用半开区间过滤，可直接走 created_at 索引
+        def sales_between(start):
+            return (
+                select(func.coalesce(func.sum(Sale.total_amount), 0))
+                .where(
+                    and_(
+                        Sale.created_at >= start,
+                        Sale.created_at < tomorrow
+                    )
                 )
             )
-            .scalar()
-        )
 
-        # 本年销售统计
-        year_sales = (
-            db.query(func.coalesce(func.sum(Sale.total_amount), 0))
-            .filter(
-                and_(
-                    func.date(Sale.created_at) >= start_of_year,
-                    func.date(Sale.created_at) <= today
+        def purchases_between(start):
+            return (
+                select(func.coalesce(func.sum(Purchase.total_amount), 0))
+                .where(
+                    and_(
+                        Purchase.created_at >= start,
+                        Purchase.created_at < tomorrow
+                    )
                 )
             )
-            .scalar()
-        )
 
-        # 今日采购统计
-        today_purchases = (
-            db.query(func.coalesce(func.sum(Purchase.total_amount), 0))
-            .filter(func.date(Purchase.created_at) == today)
-            .scalar()
-        )
+        # 库存统计读取汇总计数器（各槽之和），计数器行尚未建立时回退为全表统计
+        def counter_or(column, fallback):
+            return select(func.coalesce(
+                select(func.sum(column)).scalar_subquery(),
+                fallback.scalar_subquery()
+            ))
 
-        # 本月采购统计
-        month_purchases = (
-            db.query(func.coalesce(func.sum(Purchase.total_amount), 0))
-            .filter(
-                and_(
-                    func.date(Purchase.created_at) >= start_of_month,
-                    func.date(Purchase.created_at) <= today
-                )
-            )
-            .scalar()
-        )
-
-        # 总商品数
-        total_products = db.query(Product).count()
-
-        # 低库存商品数
-        low_stock_products = (
-            db.query(Inventory)
-            .join(Inventory.product)
-            .filter(Inventory.quantity <= Product.reorder_level)
-            .count()
-        )
-
-        # 缺货商品数
-        out_of_stock_products = (
-            db.query(Inventory)
-            .filter(Inventory.quantity == 0)
-            .count()
-        )
-
-        # 总客户数
-        total_customers = db.query(Customer).count()
-
-        # 总供应商数
-        total_suppliers = db.query(Supplier).count()
-
-        # 库存总价值
-        inventory_value = (
-            db.query(func.coalesce(func.sum(Inventory.quantity * Inventory.avg_cost), 0))
-            .scalar()
-        )
+        return {
+            # 销售统计
+            "today_sales": sales_between(today),
+            "month_sales": sales_between(start_of_month),
+            "year_sales": sales_between(start_of_year),
+            # 采购统计
+            "today_purchases": purchases_between(today),
+            "month_purchases": purchases_between(start_of_month),
+            # 总商品数
+            "total_products": select(func.count(Product.id)),
+            # 低库存商品数
+            "low_stock_products": counter_or(
+                InventoryCounter.low_stock_items,
+                select(func.count(Inventory.id))
+                .join(Inventory.product)
+                .where(Inventory.quantity <= Product.reorder_level)
+            ),
+            # 缺货商品数
+            "out_of_stock_products": counter_or(
+                InventoryCounter.out_of_stock_items,
+                select(func.count(Inventory.id))
+                .where(Inventory.quantity == 0)
+            ),
+            "total_customers": select(func.count(Customer.id)),
+            "total_suppliers": select(func.count(Supplier.id)),
+            # 库存总价值
+            "inventory_value": counter_or(
+                InventoryCounter.total_value,
+                select(func.coalesce(func.sum(Inventory.quantity * Inventory.avg_cost), 0))
+            ),
+        }
 
+    def _build_dashboard(self, values: Dict[str, Any]) -> Dict[str, Any]:
         return {
             "sales": {
-                "today": float(today_sales),
-                "month": float(month_sales),
-                "year": float(year_sales)
+                "today": float(values["today_sales"]),
+                "month": float(values["month_sales"]),
+                "year": float(values["year_sales"])
             },
             "purchases": {
-                "today": float(today_purchases),
-                "month": float(month_purchases)
+                "today": float(values["today_purchases"]),
+                "month": float(values["month_purchases"])
             },
             "inventory": {
-                "total_products": total_products,
-                "low_stock_products": low_stock_products,
-                "out_of_stock_products": out_of_stock_products,
-                "total_value": float(inventory_value)
+                "total_products": values["total_products"],
+                "low_stock_products": values["low_stock_products"],
+                "out_of_stock_products": values["out_of_stock_products"],
+                "total_value": float(values["inventory_value"])
             },
             "counts": {
-                "customers": total_customers,
-                "suppliers": total_suppliers
+                "customers": values["total_customers"],
+                "suppliers": values["total_suppliers"]
             }
         }
 
+    def get_dashboard_data(self, db: Session) -> Dict[str, Any]:
+        """获取仪表板数据"""
+        values = {
+            name: db.execute(stmt).scalar()
+            for name, stmt in self._dashboard_statements().items()
+        }
+        return self._build_dashboard(values)
+
+    async def aget_dashboard_data(self, db: AsyncSession) -> Dict[str, Any]:
+        """获取仪表板数据（异步）"""
+        values = {}
+        for name, stmt in self._dashboard_statements().items():
+            values[name] = (await db.execute(stmt)).scalar()
+        return self._build_dashboard(values)
+
     def get_sales_report(
         self,
         db: Session,
@@ -130,27 +133,21 @@ class AnalyticsCRUD:
         group_by: str = "day"
     ) -> List[Dict[str, Any]]:
         """获取销售报表"""
-        if group_by == "day":
-            date_col = cast(func.date(Sale.sale_date), String)
-        elif group_by == "week":
-            date_col = cast(func.date_trunc('week', Sale.sale_date), String)
-        elif group_by == "month":
-            date_col = cast(func.date_trunc('month', Sale.sale_date), String)
-        else:
-            date_col = cast(func.date(Sale.sale_date), String)
+        sale = archive.tiered(db, Sale, since=start_date)
+        date_col = time_bucket(group_by, sale.sale_date)
 
         sales_data = (
             db.query(
                 date_col.label('period'),
-                func.count(Sale.id).label('order_count'),
-                func.sum(Sale.total_amount).label('total_amount'),
-                func.avg(Sale.total_amount).label('avg_amount')
+                func.count(sale.id).label('order_count'),
+                func.sum(sale.total_amount).label('total_amount'),
+                func.avg(sale.total_amount).label('avg_amount')
             )
             .filter(
                 and_(
-                    Sale.sale_date >= start_date,
-                    Sale.sale_date <= end_date,
-                    Sale.status == "completed"
+                    sale.sale_date >= start_date,
+                    sale.sale_date <= end_date,
+                    sale.status == "completed"
                 )
             )
             .group_by(date_col)
@@ -177,27 +174,21 @@ class AnalyticsCRUD:
         group_by: str = "day"
     ) -> List[Dict[str, Any]]:
         """获取采购报表"""
-        if group_by == "day":
-            date_format = func.date(Purchase.purchase_date)
-        elif group_by == "week":
-            date_format = func.date_trunc('week', Purchase.purchase_date)
-        elif group_by == "month":
-            date_format = func.date_trunc('month', Purchase.purchase_date)
-        else:
-            date_format = func.date(Purchase.purchase_date)
+        purchase = archive.tiered(db, Purchase, since=start_date)
+        date_format = time_bucket(group_by, purchase.purchase_date)
 
         purchase_data = (
             db.query(
                 date_format.label('period'),
-                func.count(Purchase.id).label('order_count'),
-                func.sum(Purchase.total_amount).label('total_amount'),
-                func.avg(Purchase.total_amount).label('avg_amount')
+                func.count(purchase.id).label('order_count'),
+                func.sum(purchase.total_amount).label('total_amount'),
+                func.avg(purchase.total_amount).label('avg_amount')
             )
             .filter(
                 and_(
-                    Purchase.purchase_date >= start_date,
-                    Purchase.purchase_date <= end_date,
-                    Purchase.status == "completed"
+                    purchase.purchase_date >= start_date,
+                    purchase.purchase_date <= end_date,
+                    purchase.status == "completed"
                 )
             )
             .group_by(date_format)
@@ -207,7 +198,7 @@ class AnalyticsCRUD:
 
         return [
             {
-                "period": str(item.period),
+                "period": item.period,
                 "order_count": item.order_count,
                 "total_amount": float(item.total_amount or 0),
                 "avg_amount": float(item.avg_amount or 0)
@@ -224,25 +215,27 @@ class AnalyticsCRUD:
         limit: int = 10
     ) -> List[Dict[str, Any]]:
         """获取热销商品排行"""
+        sale = archive.tiered(db, Sale, since=start_date)
+        sale_item = archive.tiered(db, SaleItem, since=start_date)
         top_products = (
             db.query(
                 Product.id,
                 Product.name,
                 Product.sku,
-                func.sum(SaleItem.quantity).label('total_quantity'),
-                func.sum(SaleItem.total_price).label('total_revenue')
+                func.sum(sale_item.quantity).label('total_quantity'),
+                func.sum(sale_item.total_price).label('total_revenue')
             )
-            .join(SaleItem, Product.id == SaleItem.product_id)
-            .join(Sale, SaleItem.sale_id == Sale.id)
+            .join(sale_item, Product.id == sale_item.product_id)
+            .join(sale, sale_item.sale_id == sale.id)
             .filter(
                 and_(
-                    Sale.created_at >= start_date,
-                    Sale.created_at <= end_date,
-                    Sale.status == "completed"
+                    sale.created_at >= start_date,
+                    sale.created_at <= end_date,
+                    sale.status == "completed"
                 )
             )
             .group_by(Product.id, Product.name, Product.sku)
-            .order_by(desc(func.sum(SaleItem.quantity)))
+            .order_by(desc(func.sum(sale_item.quantity)))
             .limit(limit)
             .all()
         )
@@ -267,24 +260,25 @@ class AnalyticsCRUD:
         limit: int = 10
     ) -> List[Dict[str, Any]]:
         """获取重要客户排行"""
+        sale = archive.tiered(db, Sale, since=start_date)
         top_customers = (
             db.query(
                 Customer.id,
                 Customer.name,
                 Customer.contact_person,
-                func.sum(Sale.total_amount).label('total_spent'),
-                func.count(Sale.id).label('order_count')
+                func.sum(sale.total_amount).label('total_spent'),
+                func.count(sale.id).label('order_count')
             )
-            .join(Sale, Customer.id == Sale.customer_id)
+            .join(sale, Customer.id == sale.customer_id)
             .filter(
                 and_(
-                    Sale.created_at >= start_date,
-                    Sale.created_at <= end_date,
-                    Sale.status == "completed"
+                    sale.created_at >= start_date,
+                    sale.created_at <= end_date,
+                    sale.status == "completed"
                 )
             )
             .group_by(Customer.id, Customer.name, Customer.contact_person)
-            .order_by(desc(func.sum(Sale.total_amount)))
+            .order_by(desc(func.sum(sale.total_amount)))
             .limit(limit)
             .all()
         )
@@ -308,14 +302,17 @@ class AnalyticsCRUD:
         end_date: datetime
     ) -> Dict[str, Any]:
         """获取利润分析"""
+        sale = archive.tiered(db, Sale, since=start_date)
+        sale_item = archive.tiered(db, SaleItem, since=start_date)
+        purchase = archive.tiered(db, Purchase, since=start_date)
         # 销售收入
         sales_revenue = (
-            db.query(func.coalesce(func.sum(Sale.total_amount), 0))
+            db.query(func.coalesce(func.sum(sale.total_amount), 0))
             .filter(
                 and_(
-                    Sale.created_at >= start_date,
-                    Sale.created_at <= end_date,
-                    Sale.status == "completed"
+                    sale.created_at >= start_date,
+                    sale.created_at <= end_date,
+                    sale.status == "completed"
                 )
             )
             .scalar()
@@ -325,16 +322,16 @@ class AnalyticsCRUD:
         sales_cost = (
             db.query(
                 func.coalesce(
-                    func.sum(SaleItem.quantity * Product.cost_price), 0
+                    func.sum(sale_item.quantity * Product.cost_price), 0
                 )
             )
-            .join(Sale, SaleItem.sale_id == Sale.id)
-            .join(Product, SaleItem.product_id == Product.id)
+            .join(sale, sale_item.sale_id == sale.id)
+            .join(Product, sale_item.product_id == Product.id)
             .filter(
                 and_(
-                    Sale.created_at >= start_date,
-                    Sale.created_at <= end_date,
-                    Sale.status == "completed"
+                    sale.created_at >= start_date,
+                    sale.created_at <= end_date,
+                    sale.status == "completed"
                 )
             )
             .scalar()
@@ -342,12 +339,12 @@ class AnalyticsCRUD:
 
         # 采购成本
         purchase_cost = (
-            db.query(func.coalesce(func.sum(Purchase.total_amount), 0))
+            db.query(func.coalesce(func.sum(purchase.total_amount), 0))
             .filter(
                 and_(
-                    Purchase.created_at >= start_date,
-                    Purchase.created_at <= end_date,
-                    Purchase.status == "completed"
+                    purchase.created_at >= start_date,
+                    purchase.created_at <= end_date,
+                    purchase.status == "completed"
                 )
             )
             .scalar()
@@ -374,20 +371,22 @@ class AnalyticsCRUD:
         end_date: datetime
     ) -> List[Dict[str, Any]]:
         """获取库存周转率分析"""
+        sale = archive.tiered(db, Sale, since=start_date)
+        sale_item = archive.tiered(db, SaleItem, since=start_date)
         # 计算销售数量
         sales_by_product = (
             db.query(
                 Product.id,
                 Product.name,
-                func.sum(SaleItem.quantity).label('total_sold')
+                func.sum(sale_item.quantity).label('total_sold')
             )
-            .join(SaleItem, Product.id == SaleItem.product_id)
-            .join(Sale, SaleItem.sale_id == Sale.id)
+            .join(sale_item, Product.id == sale_item.product_id)
+            .join(sale, sale_item.sale_id == sale.id)
             .filter(
                 and_(
-                    Sale.created_at >= start_date,
-                    Sale.created_at <= end_date,
-                    Sale.status == "completed"
+                    sale.created_at >= start_date,
+                    sale.created_at <= end_date,
+                    sale.status == "completed"
                 )
             )
             .group_by(Product.id, Product.name)
@@ -0,0 +1,143 @@
+import time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import and_, delete, func, insert, select, union_all
+from sqlalchemy.orm import Session, aliased
+from app.models.archive import (
+    ArchiveBoundary,
+    inventory_movements_archive,
+    purchase_items_archive,
+    purchases_archive,
+    sale_items_archive,
+    sales_archive,
+)
+from app.models.inventory import InventoryMovement
+from app.models.purchase import Purchase, PurchaseItem
+from app.models.sale import Sale, SaleItem
+
+MOVEMENTS, SALES, PURCHASES = "inventory_movements", "sales", "purchases"
+
+# 热表模型 -> (所属数据族, 归档表)；明细随订单头一起归档
+ARCHIVE_TABLES = {
+    InventoryMovement: (MOVEMENTS, inventory_movements_archive),
+    Sale: (SALES, sales_archive),
+    SaleItem: (SALES, sale_items_archive),
+    Purchase: (PURCHASES, purchases_archive),
+    PurchaseItem: (PURCHASES, purchase_items_archive),
+}
+
+# 只归档已关闭的订单
+CLOSED_STATUSES = ("completed", "cancelled")
+
+
+def archive_cutoff(retention_months: int, now: Optional[datetime] = None) -> datetime:
+    """保留最近 retention_months 个整月的截止时间
+
+    不晚于今年1月1日：仪表盘的本年统计只查询热表。
+    """
+    now = now or datetime.now()
+    month_index = now.year * 12 + now.month - 1 - max(retention_months, 0)
+    cutoff = datetime(month_index // 12, month_index % 12 + 1, 1)
+    return min(cutoff, datetime(now.year, 1, 1))
+
+
+class ArchiveTiers:
+    """热数据表与归档表的分层读写
+
+    定期把早于截止时间的库存变动、已关闭的销售/采购订单（连同明细）移入同结构的
+    归档表，并在 archive_boundaries 中记录各数据族的归档边界。按日期范围查询时
+    通过 tiered() 取得查询实体：起始时间不早于边界时直接查热表，
+    否则查热表与归档表的 UNION ALL，调用方无需关心数据位于哪一层。
+    """
+
+    def boundary(self, db: Session, family: str) -> Optional[datetime]:
+        """返回该数据族的归档边界，从未归档时为None"""
+        return db.execute(
+            select(ArchiveBoundary.archived_before).where(ArchiveBoundary.family == family)
+        ).scalar()
+
+    def tiered(self, db: Session, model, *, since: Optional[datetime] = None):
+        """返回查询 since 之后数据所用的实体
+
+        since 为None表示需要全部历史。需要读取归档数据时返回热表与归档表合并后
+        的别名实体，列名与模型一致，查询写法不变。
+        """
+        family, archive_table = ARCHIVE_TABLES[model]
+        boundary = self.boundary(db, family)
+        if boundary is None or (since is not None and since >= boundary):
+            return model
+        combined = union_all(
+            select(*model.__table__.columns),
+            select(*archive_table.columns)
+        ).subquery(archive_table.name)
+        return aliased(model, combined)
+
+    def archive_closed_periods(self, db: Session, *, before: datetime) -> dict:
+        """把早于 before 的数据移入归档表，在一个事务中提交
+
+        订单须已关闭，且业务日期与创建时间都早于 before。各表最新的一行保留在热表，
+        避免表被清空后SQLite重新从1分配主键，与归档行冲突。
+        """
+        from app.crud.inventory_snapshot import inventory_snapshot
+
+        started = time.perf_counter()
+        # 先写检查点，归档后查询当前附近时点的库存无需回读归档流水
+        inventory_snapshot.take_snapshot(db)
+
+        movements = and_(
+            InventoryMovement.created_at < before,
+            InventoryMovement.id < self._max_id(db, InventoryMovement)
+        )
+        moved = {MOVEMENTS: self._move(db, InventoryMovement, movements)}
+
+        for header, item, item_parent, date_column in (
+            (Sale, SaleItem, SaleItem.sale_id, Sale.sale_date),
+            (Purchase, PurchaseItem, PurchaseItem.purchase_id, Purchase.purchase_date),
+        ):
+            family = ARCHIVE_TABLES[header][0]
+            # 先取出待归档订单ID，明细与订单头使用同一批ID
+            ids = db.execute(
+                select(header.id).where(
+                    header.status.in_(CLOSED_STATUSES),
+                    date_column < before,
+                    header.created_at < before,
+                    header.id < self._max_id(db, header)
+                )
+            ).scalars().all()
+            moved[family] = 0
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                self._move(db, item, item_parent.in_(chunk))
+                moved[family] += self._move(db, header, header.id.in_(chunk))
+
+        for family in (MOVEMENTS, SALES, PURCHASES):
+            boundary = db.get(ArchiveBoundary, family)
+            if boundary is None:
+                db.add(ArchiveBoundary(family=family, archived_before=before))
+            elif boundary.archived_before < before:
+                boundary.archived_before = before
+        db.commit()
+
+        return {
+            "archived_before": before.isoformat(),
+            **moved,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def _max_id(self, db: Session, model) -> int:
+        return db.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+
+    def _move(self, db: Session, model, condition) -> int:
+        """INSERT ... SELECT 复制到归档表后删除热表中的行，返回移动行数"""
+        table = model.__table__
+        archive_table = ARCHIVE_TABLES[model][1]
+        db.execute(
+            insert(archive_table).from_select(
+                [column.name for column in table.columns],
+                select(*table.columns).where(condition)
+            )
+        )
+        return db.execute(delete(table).where(condition)).rowcount
+
+
+archive = ArchiveTiers()
@@ -1,12 +1,71 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import random
+import time
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Set, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from app.config import settings
 from app.database import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+T = TypeVar("T")
+
+# 支持 INSERT ... ON CONFLICT DO UPDATE 的方言
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_insert(bind):
+    """按连接的数据库方言返回支持 ON CONFLICT 的 insert 构造器
+
+    bind 为 Engine/Connection；配置了不支持的数据库时抛出RuntimeError。
+    """
+    dialect = bind.dialect.name
+    if dialect not in UPSERT_INSERTS:
+        raise RuntimeError(f"不支持的数据库类型: {dialect}，请配置 PostgreSQL 或 SQLite")
+    return UPSERT_INSERTS[dialect]
+
+
+class VersionConflict(StaleDataError):
+    """客户端提交的版本号与数据库中的当前版本不一致"""
+
+
+def check_version(db_obj, expected: Optional[int]) -> None:
+    """expected 为客户端读取数据时的版本号，为空时不校验"""
+    if expected is not None and db_obj.version_id != expected:
+        raise VersionConflict(
+            f"{type(db_obj).__name__} {db_obj.id} 版本已变更: 提交 {expected}，当前 {db_obj.version_id}"
+        )
+
+
+def retry_on_conflict(db: Session, operation: Callable[[], T], *, attempts: Optional[int] = None) -> T:
+    """执行读-改-写并提交的 operation，遇到并发版本冲突时回滚并重新执行
+
+    只用于新值由服务端根据最新数据计算的操作（如库存增减）：回滚后会话中的对象全部过期，
+    重新执行时读到最新版本。客户端版本冲突（VersionConflict）不重试；
+    超过次数后抛出最后一次的 StaleDataError。
+    """
+    attempts = attempts or settings.optimistic_retry_attempts
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation()
+        except VersionConflict:
+            db.rollback()
+            raise
+        except StaleDataError:
+            db.rollback()
+            if attempt == attempts:
+                raise
+            # 随机退避，错开同时重试的请求
+            time.sleep(random.uniform(0, 0.005 * attempt))
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
@@ -18,15 +77,37 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         * `schema`: A Pydantic model (schema) class
         """
         self.model = model
+        # 预构建主键查询，复用SQLAlchemy编译缓存
+        self._get_stmt = select(model).where(model.id == bindparam("id"))
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+        return db.execute(self._get_stmt, {"id": id}).scalars().first()
 
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
         return db.query(self.model).offset(skip).limit(limit).all()
 
+    def get_existing_ids(self, db: Session, ids: Iterable[int]) -> Set[int]:
+        """一次IN查询返回ids中实际存在的主键"""
+        ids = set(ids)
+        if not ids:
+            return set()
+        return set(db.execute(
+            select(self.model.id).where(self.model.id.in_(ids))
+        ).scalars())
+
+    async def aget(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def aget_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.execute(
+            select(self.model).offset(skip).limit(limit)
+        )
+        return list(result.scalars().all())
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
@@ -47,6 +128,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
+        update_data = dict(update_data)
+        check_version(db_obj, update_data.pop("version_id", None))
         for field in obj_data:
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
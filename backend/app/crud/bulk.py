@@ -0,0 +1,69 @@
+from typing import Any, Callable, List, Optional, Tuple, Union
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+# (行号, 已校验的订单或校验错误信息)
+BulkEntry = Tuple[int, Union[Any, str]]
+
+
+def _result(line: int, *, status: str, id: Optional[int] = None,
+            number: Optional[str] = None, error: Optional[str] = None) -> dict:
+    return {"line": line, "status": status, "id": id, "number": number, "error": error}
+
+
+def _error_message(error: Exception) -> str:
+    return str(error.orig) if isinstance(error, DBAPIError) else str(error)
+
+
+def post_in_chunks(
+    db: Session,
+    entries: List[BulkEntry],
+    post: Callable[[Any], Any],
+    *,
+    number_of: Callable[[Any], str],
+    chunk_size: int,
+    before_chunk: Optional[Callable[[int], None]] = None
+) -> List[dict]:
+    """按块提交订单：块内每单使用保存点，失败的订单单独回滚，每块提交一次事务
+
+    before_chunk 在每块开始前（事务外）以块内订单数调用。返回与entries顺序一致的逐单结果。
+    单个订单的校验错误和数据库错误（包括版本冲突、数据库忙）只使该订单失败；
+    块无法继续或提交失败时回滚整块，块内订单全部记为失败，之前已提交的块不受影响，
+    始终返回全部逐单结果。
+    """
+    results = []
+    for start in range(0, len(entries), chunk_size):
+        chunk = entries[start:start + chunk_size]
+        chunk_results = []
+        try:
+            if before_chunk:
+                before_chunk(sum(1 for _, order in chunk if not isinstance(order, str)))
+            for line, order in chunk:
+                if isinstance(order, str):
+                    chunk_results.append(_result(line, status="failed", error=order))
+                    continue
+                savepoint = db.begin_nested()
+                try:
+                    db_obj = post(order)
+                    savepoint.commit()
+                except (ValueError, SQLAlchemyError) as e:
+                    savepoint.rollback()
+                    chunk_results.append(_result(line, status="failed", error=_error_message(e)))
+                    continue
+                chunk_results.append(
+                    _result(line, status="created", id=db_obj.id, number=number_of(db_obj))
+                )
+            db.commit()
+        except SQLAlchemyError as e:
+            # 整块回滚，块内已写入的订单和尚未处理的订单全部视为失败
+            db.rollback()
+            error = _error_message(e)
+            for result in chunk_results:
+                if result["status"] == "created":
+                    result.update(status="failed", id=None, number=None, error=error)
+            for line, order in chunk[len(chunk_results):]:
+                chunk_results.append(_result(
+                    line, status="failed", error=order if isinstance(order, str) else error
+                ))
+        results.extend(chunk_results)
+    return results
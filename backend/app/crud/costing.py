@@ -0,0 +1,169 @@
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import Float, bindparam, cast, literal, null, select, union_all, update
+from sqlalchemy.orm import Session
+from app.models.inventory import Inventory, InventoryMovement
+from app.models.purchase import Purchase, PurchaseItem
+from app.models.sale import Sale, SaleItem
+from app.crud.archive import archive
+from app.crud.inventory_counter import inventory_counter
+
+# 同一时刻的事件先入库后出库
+_INFLOW, _OUTFLOW, _ADJUSTMENT = 0, 1, 2
+
+_inventory_table = Inventory.__table__
+
+_SET_AVG_COST = (
+    update(_inventory_table)
+    .where(_inventory_table.c.product_id == bindparam("b_product_id"))
+    .values(
+        avg_cost=bindparam("b_avg_cost"),
+        last_updated=bindparam("b_last_updated"),
+        version_id=_inventory_table.c.version_id + 1
+    )
+)
+
+
+def _cost_events(db: Session, product_ids: Optional[List[int]] = None):
+    """未取消的采购入库、销售出库与手工调整，按商品、发生时间排序
+
+    需要全部历史，存在归档数据时合并查询归档表。
+    """
+    purchase = archive.tiered(db, Purchase)
+    purchase_item = archive.tiered(db, PurchaseItem)
+    sale = archive.tiered(db, Sale)
+    sale_item = archive.tiered(db, SaleItem)
+    movement = archive.tiered(db, InventoryMovement)
+    purchases = (
+        select(
+            purchase_item.product_id,
+            purchase.purchase_date.label("event_date"),
+            literal(_INFLOW).label("kind"),
+            purchase_item.quantity,
+            # 以浮点数读取，避免逐行构造Decimal
+            cast(purchase_item.unit_price, Float).label("unit_price")
+        )
+        .join(purchase, purchase_item.purchase_id == purchase.id)
+        .where(purchase.status != "cancelled")
+    )
+    sales = (
+        select(
+            sale_item.product_id,
+            sale.sale_date.label("event_date"),
+            literal(_OUTFLOW).label("kind"),
+            -sale_item.quantity,
+            null()
+        )
+        .join(sale, sale_item.sale_id == sale.id)
+        .where(sale.status != "cancelled")
+    )
+    adjustments = (
+        select(
+            movement.product_id,
+            movement.created_at.label("event_date"),
+            literal(_ADJUSTMENT).label("kind"),
+            movement.quantity,
+            cast(movement.unit_cost, Float)
+        )
+        .where(movement.reference_type == "adjustment")
+    )
+    if product_ids is not None:
+        purchases = purchases.where(purchase_item.product_id.in_(product_ids))
+        sales = sales.where(sale_item.product_id.in_(product_ids))
+        adjustments = adjustments.where(movement.product_id.in_(product_ids))
+    events = union_all(purchases, sales, adjustments).subquery()
+    return select(
+        events.c.product_id, events.c.kind, events.c.quantity, events.c.unit_price
+    ).order_by(events.c.product_id, events.c.event_date, events.c.kind)
+
+
+def replay_average_costs(events: Iterable) -> Dict[int, float]:
+    """按时间顺序重放 (商品ID, 类型, 数量, 单价) 事件，返回 {商品ID: 移动加权平均成本}
+
+    入库时 新成本 = (结存数量 × 成本 + 入库数量 × 单价) / 新结存数量；
+    结存为零或负数后再入库，成本取本次入库单价。出库只改变结存数量；
+    调整指定了成本时与调整接口一致，平均成本直接取该值，未指定时按当前成本增减数量。
+    结存为零或负数时由未指定成本的调整入库，成本无从确定，直到下次确定成本前
+    该商品不返回结果。事件须已按商品ID分组。
+    """
+    costs: Dict[int, float] = {}
+    current_id = None
+    quantity = 0
+    cost = 0.0
+    known = True
+    for product_id, kind, delta, unit_price in events:
+        if product_id != current_id:
+            if current_id is not None and known:
+                costs[current_id] = cost
+            current_id, quantity, cost, known = product_id, 0, 0.0, True
+        if kind == _INFLOW and delta > 0:
+            if quantity > 0:
+                cost = (quantity * cost + delta * unit_price) / (quantity + delta)
+            else:
+                cost, known = unit_price, True
+        elif kind == _ADJUSTMENT:
+            if unit_price is not None:
+                cost, known = unit_price, True
+            elif delta > 0 and quantity <= 0:
+                known = False
+        quantity += delta
+    if current_id is not None and known:
+        costs[current_id] = cost
+    return costs
+
+
+class CostRevaluation:
+    """按采购、销售及调整流水重算库存的移动加权平均成本
+
+    采购补录、修改或取消后，增量维护的 avg_cost 会与流水不一致，由本任务整体重建。
+    一次按商品、时间排序的查询流式读取全部事件，在内存中逐商品重放，
+    只对结果有变化的库存行以executemany批量更新，在一个事务中提交。
+    手工调整及直接设置库存（create_or_update）指定的成本记在调整流水上，重放时同样生效；
+    没有任何流水或成本无法由流水确定（如由未指定成本的调整入库）的商品保持不变。
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    def revalue(self, db: Session, *, product_ids: Optional[List[int]] = None) -> dict:
+        """重算并提交，product_ids 为空时处理全部商品"""
+        started = time.perf_counter()
+        if product_ids is not None:
+            product_ids = sorted(set(product_ids))
+
+        # 直接在会话的连接上执行，省去ORM结果包装
+        conn = db.connection()
+        result = conn.execute(
+            _cost_events(db, product_ids).execution_options(yield_per=self.batch_size)
+        )
+        costs = replay_average_costs(result.tuples())
+
+        current = select(Inventory.product_id, Inventory.avg_cost)
+        if product_ids is not None:
+            current = current.where(Inventory.product_id.in_(product_ids))
+        now = datetime.now()
+        updates = []
+        for product_id, avg_cost in conn.execute(current):
+            if product_id not in costs:
+                continue
+            new_cost = round(costs[product_id], 2)
+            if avg_cost is None or abs(float(avg_cost) - new_cost) >= 0.005:
+                updates.append({
+                    "b_product_id": product_id,
+                    "b_avg_cost": new_cost,
+                    "b_last_updated": now
+                })
+        for start in range(0, len(updates), self.batch_size):
+            conn.execute(_SET_AVG_COST, updates[start:start + self.batch_size])
+        inventory_counter.touch(db, [update["b_product_id"] for update in updates])
+        db.commit()
+
+        return {
+            "products": len(costs),
+            "updated": len(updates),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+
+cost_revaluation = CostRevaluation()
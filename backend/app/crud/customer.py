@@ -3,12 +3,15 @@ from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
 from app.models.customer import Customer
 from app.schemas.customer import CustomerCreate, CustomerUpdate
-from sqlalchemy import or_
+from sqlalchemy import or_, bindparam, select
+
+# 预构建的热点查询语句
+_GET_BY_NAME = select(Customer).where(Customer.name == bindparam("name")).limit(1)
 
 
 class CRUDCustomer(CRUDBase[Customer, CustomerCreate, CustomerUpdate]):
     def get_by_name(self, db: Session, *, name: str) -> Optional[Customer]:
-        return db.query(Customer).filter(Customer.name == name).first()
+        return db.execute(_GET_BY_NAME, {"name": name}).scalars().first()
 
     def get_by_email(self, db: Session, *, email: str) -> Optional[Customer]:
         return db.query(Customer).filter(Customer.email == email).first()
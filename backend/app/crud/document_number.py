@@ -0,0 +1,126 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.crud.base import upsert_insert
+from app.models.document_sequence import DocumentSequence
+
+SALE_PREFIX = "SO"
+PURCHASE_PREFIX = "PO"
+TRANSFER_PREFIX = "TR"
+
+
+# 会话中预留给本会话的号段：{(前缀, 日期): [[下一个可用号码, 本段最后一个号码], ...]}
+_RESERVED_KEY = "document_number_reserved"
+
+
+def _take(blocks: List[list], count: int = 1) -> List[list]:
+    """从号段列表头部取出最多 count 个号码，返回取出的号段"""
+    taken = []
+    while count > 0 and blocks:
+        block = blocks[0]
+        size = min(count, block[1] - block[0] + 1)
+        taken.append([block[0], block[0] + size - 1])
+        block[0] += size
+        count -= size
+        if block[0] > block[1]:
+            blocks.pop(0)
+    return taken
+
+
+def _available(blocks: List[list]) -> int:
+    return sum(end - start + 1 for start, end in blocks)
+
+
+def _holds_sqlite_write(db: Session) -> bool:
+    """会话是否已在 SQLite 上开始事务：此时另开连接预留号段可能要等待本会话释放写锁"""
+    if db.get_bind().dialect.name != "sqlite" or not db.in_transaction():
+        return False
+    return db.connection().connection.dbapi_connection.in_transaction
+
+
+class DocumentNumberAllocator:
+    """按天递增的单据号分配器（hi/lo）
+
+    每个进程一次向 document_sequences 预留一段号码（block_size 个），之后在内存中分配，
+    号段用完才访问数据库。预留在独立的短事务中完成，不随订单事务回滚；
+    进程重启或订单失败会留下空号，号码只保证唯一和按天递增，不保证连续。
+    访问数据库时不持有进程内的锁，其他线程照常从已有号段分配。
+    """
+
+    def __init__(self, block_size: Optional[int] = None):
+        self.block_size = block_size or settings.document_number_block_size
+        self._lock = threading.Lock()
+        # (前缀, 日期) -> 可用号段列表 [[下一个可用号码, 本段最后一个号码], ...]
+        self._blocks: Dict[Tuple[str, str], List[list]] = {}
+
+    def _reserve(self, db: Session, prefix: str, day: str, count: int) -> list:
+        """在独立连接中预留 count 个号码，返回 [起始号码, 结束号码]"""
+        bind = db.get_bind()
+        insert = upsert_insert(bind)
+        stmt = insert(DocumentSequence).values(prefix=prefix, day=day, next_value=count + 1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DocumentSequence.prefix, DocumentSequence.day],
+            set_={"next_value": DocumentSequence.next_value + count}
+        ).returning(DocumentSequence.next_value)
+        with bind.connect() as conn:
+            next_value = conn.execute(stmt).scalar_one()
+            conn.commit()
+        return [next_value - count, next_value - 1]
+
+    def _refill(self, db: Session, prefix: str, day: str, count: int) -> None:
+        """在锁外向数据库预留号段，返回后再放入进程内的可用号段
+
+        SQLite 会话已开始事务时直接抛出RuntimeError，而不是等到 busy_timeout。
+        """
+        if _holds_sqlite_write(db):
+            raise RuntimeError(
+                f"{prefix} 单据号段已用完且会话已开始 SQLite 事务，"
+                "另开连接预留号段会等待本会话释放写锁；请在写入前调用 reserve()"
+            )
+        block = self._reserve(db, prefix, day, count)
+        with self._lock:
+            # 跨天时旧号段自然作废
+            self._blocks = {k: v for k, v in self._blocks.items() if k[1] == day}
+            self._blocks.setdefault((prefix, day), []).append(block)
+
+    def reserve(self, db: Session, prefix: str, count: int) -> None:
+        """在写入前为本会话预留至少 count 个号码，之后本会话的 allocate 不再访问数据库
+
+        预留的号码只供本会话使用，不会被其他线程取走；批量写入（导入、组提交）
+        须在事务开始前调用。
+        """
+        day = datetime.now().strftime("%Y%m%d")
+        key = (prefix, day)
+        reserved = db.info.setdefault(_RESERVED_KEY, {})
+        # 跨天后旧的预留作废
+        for stale in [k for k in reserved if k[1] != day]:
+            del reserved[stale]
+        blocks = reserved.setdefault(key, [])
+        needed = count - _available(blocks)
+        while needed > 0:
+            with self._lock:
+                taken = _take(self._blocks.get(key, []), needed)
+            blocks.extend(taken)
+            needed -= _available(taken)
+            if needed > 0:
+                self._refill(db, prefix, day, max(needed, self.block_size))
+
+    def allocate(self, db: Session, prefix: str) -> str:
+        """分配一个单据号，格式为 前缀 + YYYYMMDD + 6位序号
+
+        优先使用本会话预留的号码，其次从进程内号段分配，号段用完时在锁外补充。
+        """
+        day = datetime.now().strftime("%Y%m%d")
+        key = (prefix, day)
+        taken = _take(db.info.get(_RESERVED_KEY, {}).get(key, []))
+        while not taken:
+            with self._lock:
+                taken = _take(self._blocks.get(key, []))
+            if not taken:
+                self._refill(db, prefix, day, self.block_size)
+        return f"{prefix}{day}{taken[0][0]:06d}"
+
+
+document_number = DocumentNumberAllocator()
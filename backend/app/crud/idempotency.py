@@ -0,0 +1,78 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.idempotency import IdempotencyKey
+
+_GET_BY_KEY = select(IdempotencyKey).where(
+    IdempotencyKey.scope == bindparam("scope"),
+    IdempotencyKey.key == bindparam("key"),
+    IdempotencyKey.expires_at > bindparam("now")
+)
+
+
+def request_hash(payload) -> str:
+    """请求体指纹，用于识别同一幂等键被用于不同请求"""
+    body = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class IdempotencyCRUD:
+    def __init__(self):
+        self._last_purge = 0.0
+
+    def get_active(self, db: Session, *, scope: str, key: str) -> Optional[IdempotencyKey]:
+        """获取未过期的幂等记录"""
+        return db.execute(
+            _GET_BY_KEY, {"scope": scope, "key": key, "now": datetime.now()}
+        ).scalars().first()
+
+    def record(
+        self,
+        db: Session,
+        *,
+        scope: str,
+        key: str,
+        request_hash: str,
+        status_code: int,
+        response: dict
+    ) -> None:
+        """保存首次响应，与业务数据在同一事务中提交；不提交事务
+
+        同一键已有过期但尚未清理的记录时先删除，过期后重用该键视为新请求。
+        """
+        self.purge_expired(db)
+        now = datetime.now()
+        db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at <= now
+            )
+        )
+        db.add(IdempotencyKey(
+            scope=scope,
+            key=key,
+            request_hash=request_hash,
+            status_code=status_code,
+            response_body=json.dumps(response, ensure_ascii=False, default=str),
+            expires_at=now + timedelta(seconds=settings.idempotency_ttl_seconds)
+        ))
+        db.flush()
+
+    def purge_expired(self, db: Session, *, force: bool = False) -> int:
+        """删除过期记录，默认每个进程每隔 idempotency_purge_interval_seconds 最多执行一次；不提交事务"""
+        if not force and time.monotonic() - self._last_purge < settings.idempotency_purge_interval_seconds:
+            return 0
+        self._last_purge = time.monotonic()
+        result = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now())
+        )
+        return result.rowcount
+
+
+idempotency = IdempotencyCRUD()
@@ -1,15 +1,107 @@
-from typing import List, Optional
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, desc
+from sqlalchemy import Float, and_, bindparam, case, cast, desc, event, func, or_, select, update
 from app.models.inventory import Inventory, InventoryMovement
 from app.models.product import Product
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID, Warehouse, WarehouseStock
 from app.schemas.inventory import InventoryCreate, InventoryUpdate, InventoryMovementCreate
-from app.crud.base import CRUDBase
+from app.crud.archive import archive
+from app.crud.base import CRUDBase, retry_on_conflict, upsert_insert
+from app.crud.inventory_counter import inventory_counter
+from app.stock_alerts import stock_alerts
 from datetime import datetime
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# 预构建的热点查询语句
+_GET_BY_PRODUCT = select(Inventory).where(Inventory.product_id == bindparam("product_id"))
+_GET_BY_PRODUCT_WITH_PRODUCT = _GET_BY_PRODUCT.options(joinedload(Inventory.product))
+
+_inventory_table = Inventory.__table__
+_location_table = WarehouseStock.__table__
+
+# 条件扣减：仅在该仓库库存充足时扣减，由影响行数判断是否成功
+_DEDUCT_STOCK = (
+    update(_location_table)
+    .where(
+        _location_table.c.product_id == bindparam("deduct_product_id"),
+        _location_table.c.warehouse_id == bindparam("deduct_warehouse_id"),
+        _location_table.c.quantity >= bindparam("deduct_quantity")
+    )
+    .values(
+        quantity=_location_table.c.quantity - bindparam("deduct_quantity"),
+        last_updated=bindparam("deduct_time")
+    )
+)
+
+# 一次IN查询锁定并读取相关商品的分仓库存，按商品、仓库顺序加锁
+_LOCK_LOCATIONS = (
+    select(_location_table.c.product_id, _location_table.c.warehouse_id, _location_table.c.quantity)
+    .where(_location_table.c.product_id.in_(bindparam("product_ids", expanding=True)))
+    .order_by(_location_table.c.product_id, _location_table.c.warehouse_id)
+    .with_for_update()
+)
+
+# 汇总行数量 = 各仓库数量之和
+_LOCATION_TOTAL = (
+    select(func.coalesce(func.sum(_location_table.c.quantity), 0))
+    .where(_location_table.c.product_id == _inventory_table.c.product_id)
+    .scalar_subquery()
+)
+
+# 会话中记录本事务改动过分仓库存、提交后需同步汇总行的商品ID
+_ROLLUP_KEY = "inventory_rollup_touched"
+
+# 各商品的可用数量 = 分仓库存之和
+_TOTALS_BY_PRODUCTS = (
+    select(_location_table.c.product_id, func.sum(_location_table.c.quantity))
+    .where(_location_table.c.product_id.in_(bindparam("product_ids", expanding=True)))
+    .group_by(_location_table.c.product_id)
+)
+
+# 批量入库：一次IN查询锁定汇总行并读取分仓库存之和，按商品ID排序保证加锁顺序
+_LOCK_BY_PRODUCTS = (
+    select(Inventory.product_id, _LOCATION_TOTAL.label("quantity"), Inventory.avg_cost)
+    .where(Inventory.product_id.in_(bindparam("product_ids", expanding=True)))
+    .order_by(Inventory.product_id)
+    .with_for_update()
+)
+
+# 入库只更新平均成本，数量由汇总同步写入
+_SET_AVG_COST = (
+    update(_inventory_table)
+    .where(_inventory_table.c.product_id == bindparam("b_product_id"))
+    .values(
+        avg_cost=bindparam("b_avg_cost"),
+        last_updated=bindparam("b_last_updated"),
+        version_id=_inventory_table.c.version_id + 1
+    )
+)
+
+
+def _touch(db: Session, product_ids) -> None:
+    """登记本事务改动过分仓库存的商品，提交后同步汇总行"""
+    db.info.setdefault(_ROLLUP_KEY, set()).update(product_ids)
+
+
+def _touch_summaries(db: Session, product_ids) -> None:
+    """汇总行有变化的商品：提交前计入汇总计数器，提交后检查库存预警"""
+    inventory_counter.touch(db, product_ids)
+    stock_alerts.touch(db, product_ids)
+
 
 class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
     def get_by_product(self, db: Session, *, product_id: int) -> Optional[Inventory]:
-        return db.query(Inventory).filter(Inventory.product_id == product_id).first()
+        return db.execute(_GET_BY_PRODUCT, {"product_id": product_id}).scalars().first()
+
+    def get_by_product_with_product(self, db: Session, *, product_id: int) -> Optional[Inventory]:
+        """获取库存记录并一并加载商品"""
+        return db.execute(
+            _GET_BY_PRODUCT_WITH_PRODUCT, {"product_id": product_id}
+        ).scalars().first()
 
     def get_with_product(self, db: Session, *, skip: int = 0, limit: int = 100):
         return (
@@ -22,7 +114,7 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
         )
 
     def get_with_product_flattened(self, db: Session, *, skip: int = 0, limit: int = 100):
-        """获取库存信息并扁平化产品字段"""
+        """获取库存信息并扁平化产品字段，数量取各仓库之和"""
         results = (
             db.query(Inventory, Product)
             .join(Product, Inventory.product_id == Product.id)
@@ -31,6 +123,7 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
             .limit(limit)
             .all()
         )
+        totals = self.total_quantities(db, product_ids=[inventory.product_id for inventory, _ in results])
         
         flattened_results = []
         for inventory, product in results:
@@ -38,7 +131,7 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
             flattened_item = {
                 "id": inventory.id,
                 "product_id": inventory.product_id,
-                "quantity": inventory.quantity,
+                "quantity": totals.get(inventory.product_id, 0),
                 "avg_cost": float(inventory.avg_cost) if inventory.avg_cost else 0,
                 "last_updated": inventory.last_updated.isoformat() if inventory.last_updated else None,
                 "product_name": product.name,
@@ -54,18 +147,13 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
         return flattened_results
 
     def get_low_stock_items(self, db: Session, *, skip: int = 0, limit: int = 100):
-        """获取库存不足的商品"""
+        """获取库存不足的商品（库存余量<=0，按余量索引范围扫描）"""
         return (
             db.query(self.model)
             .options(joinedload(Inventory.product))
             .join(Inventory.product)
-            .filter(
-                or_(
-                    Inventory.quantity <= Product.reorder_level,
-                    Inventory.quantity == 0
-                )
-            )
-            .order_by(Inventory.quantity.asc())
+            .filter(Inventory.shortage_margin <= 0)
+            .order_by(Inventory.shortage_margin.asc())
             .offset(skip)
             .limit(limit)
             .all()
@@ -76,13 +164,8 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
         results = (
             db.query(Inventory, Product)
             .join(Product, Inventory.product_id == Product.id)
-            .filter(
-                or_(
-                    Inventory.quantity <= Product.reorder_level,
-                    Inventory.quantity == 0
-                )
-            )
-            .order_by(Inventory.quantity.asc())
+            .filter(Inventory.shortage_margin <= 0)
+            .order_by(Inventory.shortage_margin.asc())
             .offset(skip)
             .limit(limit)
             .all()
@@ -110,12 +193,12 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
         return flattened_results
 
     def get_out_of_stock_items(self, db: Session, *, skip: int = 0, limit: int = 100):
-        """获取缺货商品"""
+        """获取缺货商品（缺货时余量必<=0，同一索引范围扫描）"""
         return (
             db.query(self.model)
             .options(joinedload(Inventory.product))
-            .filter(Inventory.quantity == 0)
-            .order_by(Inventory.last_updated.desc())
+            .filter(Inventory.shortage_margin <= 0, Inventory.quantity == 0)
+            .order_by(Inventory.shortage_margin.asc())
             .offset(skip)
             .limit(limit)
             .all()
@@ -126,8 +209,8 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
         results = (
             db.query(Inventory, Product)
             .join(Product, Inventory.product_id == Product.id)
-            .filter(Inventory.quantity == 0)
-            .order_by(Inventory.last_updated.desc())
+            .filter(Inventory.shortage_margin <= 0, Inventory.quantity == 0)
+            .order_by(Inventory.shortage_margin.asc())
             .offset(skip)
             .limit(limit)
             .all()
@@ -154,29 +237,280 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
         
         return flattened_results
 
-    def create_or_update(self, db: Session, *, product_id: int, quantity: int, avg_cost: float = 0):
-        """创建或更新库存记录"""
-        inventory = self.get_by_product(db, product_id=product_id)
+    def _reload_by_product(self, db: Session, *, product_id: int) -> Inventory:
+        """重新读取库存记录，覆盖会话中的旧状态"""
+        return db.execute(
+            _GET_BY_PRODUCT.execution_options(populate_existing=True),
+            {"product_id": product_id}
+        ).scalar_one()
 
-        if inventory:
-            inventory.quantity = quantity
-            if avg_cost > 0:
-                inventory.avg_cost = avg_cost
-            inventory.last_updated = datetime.now()
-            db.commit()
-            db.refresh(inventory)
-            return inventory
-        else:
-            inventory = Inventory(
+    def create_or_update(
+        self, db: Session, *, product_id: int, quantity: int, avg_cost: float = 0,
+        warehouse_id: int = DEFAULT_WAREHOUSE_ID
+    ):
+        """设置某仓库的库存数量（单条UPSERT），并把汇总行数量同步为各仓库之和
+
+        数量变化与指定的平均成本记为一条调整流水，历史时点库存与平均成本重算据此重放。
+        """
+        now = datetime.now()
+        change = quantity - self.location_quantity(db, product_id=product_id, warehouse_id=warehouse_id)
+        insert = upsert_insert(db.get_bind())
+        location = insert(WarehouseStock).values(
+            product_id=product_id,
+            warehouse_id=warehouse_id,
+            quantity=quantity,
+            last_updated=now
+        )
+        db.execute(location.on_conflict_do_update(
+            index_elements=[WarehouseStock.product_id, WarehouseStock.warehouse_id],
+            set_={
+                "quantity": location.excluded.quantity,
+                "last_updated": location.excluded.last_updated,
+            }
+        ))
+
+        stmt = insert(Inventory).values(
+            product_id=product_id,
+            quantity=quantity,
+            avg_cost=avg_cost,
+            last_updated=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Inventory.product_id],
+            set_={
+                "quantity": _LOCATION_TOTAL,
+                "avg_cost": case(
+                    (stmt.excluded.avg_cost > 0, stmt.excluded.avg_cost),
+                    else_=Inventory.avg_cost
+                ),
+                "last_updated": stmt.excluded.last_updated,
+                "version_id": Inventory.version_id + 1,
+            }
+        )
+        db.execute(stmt)
+        if change or avg_cost > 0:
+            db.add(InventoryMovement(
                 product_id=product_id,
-                quantity=quantity,
-                avg_cost=avg_cost,
-                last_updated=datetime.now()
+                warehouse_id=warehouse_id,
+                movement_type="in" if change > 0 else "out" if change < 0 else "adjustment",
+                quantity=change,
+                reference_type="adjustment",
+                reason="设置库存数量",
+                unit_cost=avg_cost if avg_cost > 0 else None
+            ))
+        _touch_summaries(db, [product_id])
+        db.commit()
+        return self._reload_by_product(db, product_id=product_id)
+
+    def _receive_rollup(
+        self, db: Session, *, product_id: int, quantity: int, unit_cost
+    ) -> None:
+        """汇总行入库：单条UPSERT累加数量并重算加权平均成本，不提交事务"""
+        insert = upsert_insert(db.get_bind())
+        stmt = insert(Inventory).values(
+            product_id=product_id,
+            quantity=quantity,
+            avg_cost=unit_cost,
+            last_updated=datetime.now()
+        )
+        new_quantity = Inventory.quantity + stmt.excluded.quantity
+        # 转为浮点避免SQLite整数除法
+        total_cost = cast(
+            Inventory.quantity * Inventory.avg_cost
+            + stmt.excluded.quantity * stmt.excluded.avg_cost,
+            Float
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Inventory.product_id],
+            set_={
+                "quantity": new_quantity,
+                "avg_cost": case(
+                    (new_quantity > 0, total_cost / new_quantity),
+                    else_=stmt.excluded.avg_cost
+                ),
+                "last_updated": stmt.excluded.last_updated,
+                "version_id": Inventory.version_id + 1,
+            }
+        )
+        db.execute(stmt)
+
+    def apply_receipts(
+        self, db: Session, *, receipts: Dict[Tuple[int, int], Tuple[int, Decimal]]
+    ) -> None:
+        """批量入库：receipts 为 {(商品ID, 仓库ID): (数量, 总成本)}，不提交事务
+
+        加权平均成本按商品计算：一次IN查询锁定汇总行并读取各仓库数量之和，
+        在内存中计算新平均成本后executemany批量更新；无库存记录的商品逐条UPSERT创建。
+        最后累加各仓库的库存行，汇总行数量在提交后同步。
+        """
+        if not receipts:
+            return
+        by_product: Dict[int, Tuple[int, Decimal]] = {}
+        for (product_id, _), (quantity, total_cost) in receipts.items():
+            old_quantity, old_cost = by_product.get(product_id, (0, Decimal(0)))
+            by_product[product_id] = (old_quantity + quantity, old_cost + total_cost)
+
+        product_ids = sorted(by_product)
+        current = {
+            row.product_id: row
+            for row in db.execute(_LOCK_BY_PRODUCTS, {"product_ids": product_ids})
+        }
+
+        now = datetime.now()
+        updates = []
+        for product_id in product_ids:
+            quantity, total_cost = by_product[product_id]
+            row = current.get(product_id)
+            if row is None:
+                self._receive_rollup(
+                    db, product_id=product_id, quantity=quantity,
+                    unit_cost=total_cost / quantity
+                )
+                continue
+            old_quantity = row.quantity or 0
+            old_avg_cost = row.avg_cost or Decimal(0)
+            new_quantity = old_quantity + quantity
+            if new_quantity > 0:
+                avg_cost = (old_quantity * old_avg_cost + total_cost) / new_quantity
+            else:
+                avg_cost = total_cost / quantity
+            updates.append({
+                "b_product_id": product_id,
+                "b_avg_cost": avg_cost,
+                "b_last_updated": now
+            })
+        if updates:
+            db.execute(_SET_AVG_COST, updates)
+        self._shift_locations(
+            db, {key: quantity for key, (quantity, _) in receipts.items()}, now
+        )
+        _touch(db, product_ids)
+
+    def lock_quantities(self, db: Session, *, keys) -> Dict[Tuple[int, int], int]:
+        """一次IN查询读取并锁定相关商品的分仓库存行，返回 {(商品ID, 仓库ID): 数量}"""
+        keys = set(keys)
+        product_ids = sorted({product_id for product_id, _ in keys})
+        if not product_ids:
+            return {}
+        return {
+            (row.product_id, row.warehouse_id): row.quantity or 0
+            for row in db.execute(_LOCK_LOCATIONS, {"product_ids": product_ids})
+            if (row.product_id, row.warehouse_id) in keys
+        }
+
+    def shift_stock(self, db: Session, *, deltas: Dict[Tuple[int, int], int]) -> None:
+        """按 {(商品ID, 仓库ID): 变化量} 批量累加分仓库存，汇总行提交后同步，不提交事务"""
+        if self._shift_locations(db, deltas, datetime.now()):
+            _touch(db, {product_id for product_id, _ in deltas})
+
+    def _shift_locations(
+        self, db: Session, deltas: Dict[Tuple[int, int], int], now: datetime
+    ) -> bool:
+        """以executemany UPSERT累加分仓库存，无记录时创建，按(商品, 仓库)顺序写入"""
+        rows = [
+            {"product_id": product_id, "warehouse_id": warehouse_id,
+             "quantity": delta, "last_updated": now}
+            for (product_id, warehouse_id), delta in sorted(deltas.items()) if delta
+        ]
+        if not rows:
+            return False
+        stmt = upsert_insert(db.get_bind())(WarehouseStock)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WarehouseStock.product_id, WarehouseStock.warehouse_id],
+            set_={
+                "quantity": WarehouseStock.quantity + stmt.excluded.quantity,
+                "last_updated": stmt.excluded.last_updated,
+            }
+        )
+        db.execute(stmt, rows)
+        return True
+
+    def deduct_stock(
+        self, db: Session, *, product_id: int, quantity: int,
+        warehouse_id: int = DEFAULT_WAREHOUSE_ID
+    ) -> bool:
+        """出库：单条UPDATE条件扣减该仓库库存，库存不足时不做修改并返回False，不提交事务
+
+        只更新分仓库存行，汇总行在提交后同步，并发出库只在各自仓库的行上竞争。
+        """
+        result = db.execute(_DEDUCT_STOCK, {
+            "deduct_product_id": product_id,
+            "deduct_warehouse_id": warehouse_id,
+            "deduct_quantity": quantity,
+            "deduct_time": datetime.now()
+        })
+        if result.rowcount != 1:
+            return False
+        _touch(db, [product_id])
+        return True
+
+    def sync_rollup(self, db: Session, product_ids: Optional[List[int]] = None) -> int:
+        """把汇总行数量同步为各仓库数量之和，不提交事务，返回修正的行数
+
+        同一事务中把这些商品计入汇总计数器，提交后检查库存预警。
+        product_ids 为None时同步全部商品（对账）。
+        """
+        db.flush()
+        stmt = (
+            update(_inventory_table)
+            .where(func.coalesce(_inventory_table.c.quantity, 0) != _LOCATION_TOTAL)
+            .values(
+                quantity=_LOCATION_TOTAL,
+                last_updated=datetime.now(),
+                version_id=_inventory_table.c.version_id + 1
             )
-            db.add(inventory)
-            db.commit()
-            db.refresh(inventory)
-            return inventory
+        )
+        if product_ids is None:
+            return db.execute(stmt).rowcount
+        product_ids = sorted(set(product_ids))
+        _touch_summaries(db, product_ids)
+        synced = 0
+        for start in range(0, len(product_ids), 500):
+            synced += db.execute(
+                stmt.where(_inventory_table.c.product_id.in_(product_ids[start:start + 500]))
+            ).rowcount
+        return synced
+
+    def total_quantities(self, db: Session, *, product_ids: Iterable[int]) -> Dict[int, int]:
+        """返回 {商品ID: 各仓库数量之和}，即当前可用数量，不依赖汇总行是否已同步"""
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return {}
+        return {
+            product_id: quantity or 0
+            for product_id, quantity in db.execute(_TOTALS_BY_PRODUCTS, {"product_ids": product_ids})
+        }
+
+    def location_quantity(self, db: Session, *, product_id: int, warehouse_id: int) -> int:
+        """返回商品在某仓库的库存数量，无记录时为0"""
+        return db.execute(
+            select(WarehouseStock.quantity).where(
+                WarehouseStock.product_id == product_id,
+                WarehouseStock.warehouse_id == warehouse_id
+            )
+        ).scalar() or 0
+
+    def get_locations_flattened(self, db: Session, *, product_id: int) -> List[dict]:
+        """获取商品在各仓库的库存并扁平化仓库字段"""
+        results = (
+            db.query(WarehouseStock, Warehouse)
+            .join(Warehouse, WarehouseStock.warehouse_id == Warehouse.id)
+            .filter(WarehouseStock.product_id == product_id)
+            .order_by(WarehouseStock.warehouse_id)
+            .all()
+        )
+        return [
+            {
+                "id": stock.id,
+                "product_id": stock.product_id,
+                "warehouse_id": stock.warehouse_id,
+                "warehouse_code": warehouse.code,
+                "warehouse_name": warehouse.name,
+                "quantity": stock.quantity,
+                "last_updated": stock.last_updated.isoformat() if stock.last_updated else None
+            }
+            for stock, warehouse in results
+        ]
 
     def adjust_inventory(
         self,
@@ -186,16 +520,36 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
         adjustment_quantity: int,
         reason: str,
         user_id: int,
-        new_avg_cost: Optional[float] = None
+        new_avg_cost: Optional[float] = None,
+        warehouse_id: int = DEFAULT_WAREHOUSE_ID
+    ) -> Inventory:
+        """调整库存数量，与其他请求并发修改同一库存行时自动重试"""
+        return retry_on_conflict(db, lambda: self._adjust_inventory(
+            db,
+            product_id=product_id,
+            adjustment_quantity=adjustment_quantity,
+            reason=reason,
+            new_avg_cost=new_avg_cost,
+            warehouse_id=warehouse_id
+        ))
+
+    def _adjust_inventory(
+        self,
+        db: Session,
+        *,
+        product_id: int,
+        adjustment_quantity: int,
+        reason: str,
+        new_avg_cost: Optional[float] = None,
+        warehouse_id: int = DEFAULT_WAREHOUSE_ID
     ) -> Inventory:
-        """调整库存数量"""
         inventory = self.get_by_product(db, product_id=product_id)
 
         if not inventory:
             # Create new inventory record if doesn't exist
             inventory = Inventory(
                 product_id=product_id,
-                quantity=adjustment_quantity,
+                quantity=0,
                 avg_cost=new_avg_cost or 0,
                 last_updated=datetime.now()
             )
@@ -203,20 +557,24 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
             db.flush()
         else:
             # Update existing inventory
-            old_quantity = inventory.quantity
-            inventory.quantity += adjustment_quantity
             if new_avg_cost and new_avg_cost > 0:
                 inventory.avg_cost = new_avg_cost
             inventory.last_updated = datetime.now()
 
+        # 汇总行的版本号保证并发调整时重试；手工调整频率低，汇总行数量随调整立即同步
+        self._shift_locations(db, {(product_id, warehouse_id): adjustment_quantity}, datetime.now())
+        self.sync_rollup(db, [product_id])
+
         # Record inventory movement
         movement_type = "in" if adjustment_quantity > 0 else "out" if adjustment_quantity < 0 else "adjustment"
         movement = InventoryMovement(
             product_id=product_id,
+            warehouse_id=warehouse_id,
             movement_type=movement_type,
             quantity=adjustment_quantity,
             reference_type="adjustment",
-            reason=reason
+            reason=reason,
+            unit_cost=new_avg_cost if new_avg_cost and new_avg_cost > 0 else None
         )
         db.add(movement)
 
@@ -251,26 +609,12 @@ class InventoryCRUD(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
         )
 
     def get_total_inventory_value(self, db: Session) -> float:
-        """获取库存总价值"""
-        result = db.query(Inventory).all()
-        total_value = sum(item.quantity * float(item.avg_cost) for item in result)
-        return total_value
+        """获取库存总价值（读取汇总计数器）"""
+        return inventory_counter.get_summary(db)["total_inventory_value"]
 
     def get_inventory_summary(self, db: Session) -> dict:
-        """获取库存汇总信息"""
-        total_items = db.query(Inventory).count()
-        low_stock_items = db.query(Inventory).join(Inventory.product).filter(
-            Inventory.quantity <= Product.reorder_level
-        ).count()
-        out_of_stock_items = db.query(Inventory).filter(Inventory.quantity == 0).count()
-        total_value = self.get_total_inventory_value(db)
-
-        return {
-            "total_items": total_items,
-            "low_stock_items": low_stock_items,
-            "out_of_stock_items": out_of_stock_items,
-            "total_inventory_value": total_value
-        }
+        """获取库存汇总信息（读取随库存写入增量维护的汇总计数器）"""
+        return inventory_counter.get_summary(db)
 
 
 class InventoryMovementCRUD(CRUDBase[InventoryMovement, InventoryMovementCreate, dict]):
@@ -322,17 +666,18 @@ class InventoryMovementCRUD(CRUDBase[InventoryMovement, InventoryMovementCreate,
         skip: int = 0,
         limit: int = 100
     ) -> List[InventoryMovement]:
-        """获取指定日期范围内的库存变动记录"""
+        """获取指定日期范围内的库存变动记录，范围早于归档边界时同时查询归档表"""
+        movement = archive.tiered(db, InventoryMovement, since=start_date)
         return (
-            db.query(self.model)
-            .options(joinedload(InventoryMovement.product))
+            db.query(movement)
+            .options(joinedload(movement.product))
             .filter(
                 and_(
-                    InventoryMovement.created_at >= start_date,
-                    InventoryMovement.created_at <= end_date
+                    movement.created_at >= start_date,
+                    movement.created_at <= end_date
                 )
             )
-            .order_by(desc(InventoryMovement.created_at))
+            .order_by(desc(movement.created_at))
             .offset(skip)
             .limit(limit)
             .all()
@@ -341,4 +686,74 @@ class InventoryMovementCRUD(CRUDBase[InventoryMovement, InventoryMovementCreate,
 
 # Create singleton instances
 inventory = InventoryCRUD(Inventory)
-inventory_movement = InventoryMovementCRUD(InventoryMovement)
\ No newline at end of file
+inventory_movement = InventoryMovementCRUD(InventoryMovement)
+
+class RollupSync:
+    """汇总行数量的提交后同步
+
+    出入库事务只写分仓库存行，提交后把改动的商品登记到这里；汇总行数量、汇总计数器
+    与库存预警在独立的短事务中更新，不再与出入库事务争用同一汇总行。
+    服务进程由 lifespan 每隔 INVENTORY_ROLLUP_INTERVAL_MS 批量同步一次，
+    同一商品在一个周期内的多次出入库合并为一次更新；未启用批量同步时（脚本、测试）
+    每次提交后立即同步。汇总行可能短暂落后于分仓库存，可用数量以 warehouse_stock 为准。
+    """
+
+    def __init__(self):
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.deferred = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def after_commit(self, bind, product_ids: Iterable[int]) -> None:
+        if self.deferred:
+            with self._lock:
+                self._pending.update(product_ids)
+            return
+        try:
+            self._sync(bind, product_ids)
+        except Exception:
+            # 提交已完成，同步失败由下次同步或对账修正
+            logger.exception("inventory rollup sync failed")
+
+    def flush(self, bind) -> int:
+        """同步全部待同步商品并提交，返回修正的汇总行数"""
+        with self._lock:
+            product_ids, self._pending = self._pending, set()
+        if not product_ids:
+            return 0
+        try:
+            return self._sync(bind, product_ids)
+        except Exception:
+            with self._lock:
+                self._pending.update(product_ids)
+            raise
+
+    def _sync(self, bind, product_ids: Iterable[int]) -> int:
+        db = Session(bind=bind)
+        try:
+            synced = inventory.sync_rollup(db, list(product_ids))
+            db.commit()
+            return synced
+        finally:
+            db.close()
+
+
+rollup_sync = RollupSync()
+
+
+def _sync_rollup_after_commit(session: Session) -> None:
+    product_ids = session.info.pop(_ROLLUP_KEY, None)
+    if product_ids:
+        rollup_sync.after_commit(session.get_bind(), product_ids)
+
+
+def _discard_rollup_after_rollback(session: Session) -> None:
+    session.info.pop(_ROLLUP_KEY, None)
+
+
+if not event.contains(Session, "after_commit", _sync_rollup_after_commit):
+    event.listen(Session, "after_commit", _sync_rollup_after_commit)
+    event.listen(Session, "after_rollback", _discard_rollup_after_rollback)
@@ -0,0 +1,312 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import Float, bindparam, case, cast, delete, event, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.inventory import Inventory
+from app.models.inventory_counter import InventoryCounter
+from app.models.product import Product
+from app.crud.base import CRUDBase, upsert_insert
+
+# 会话中记录本事务改动过库存或预警值的商品ID
+_TOUCHED_KEY = "inventory_counter_touched"
+# 会话中按槽累计的已删除库存行的扣减量
+_REMOVED_KEY = "inventory_counter_removed"
+
+_CHUNK = 500
+
+# 槽内增量：(商品数, 库存不足数, 缺货数, 库存价值)
+Delta = Tuple[int, int, int, Decimal]
+_ZERO: Delta = (0, 0, 0, Decimal(0))
+
+_SUM_COUNTERS = select(
+    func.count(InventoryCounter.id),
+    func.coalesce(func.sum(InventoryCounter.total_items), 0),
+    func.coalesce(func.sum(InventoryCounter.low_stock_items), 0),
+    func.coalesce(func.sum(InventoryCounter.out_of_stock_items), 0),
+    func.coalesce(func.sum(InventoryCounter.total_value), 0)
+)
+
+_inventory_table = Inventory.__table__
+
+# 单行库存对汇总的贡献：与库存汇总原有的统计口径一致
+_QUANTITY = func.coalesce(Inventory.quantity, 0)
+_REORDER_LEVEL = (
+    select(Product.reorder_level)
+    .where(Product.id == Inventory.product_id)
+    .scalar_subquery()
+)
+_VALUE = func.round(cast(_QUANTITY * func.coalesce(Inventory.avg_cost, 0), Float), 4)
+_LOW = func.coalesce(_QUANTITY <= _REORDER_LEVEL, False)
+_OUT = _QUANTITY == 0
+_MARGIN = _QUANTITY - func.coalesce(_REORDER_LEVEL, 0)
+
+_CONTRIBUTIONS = (
+    select(
+        Inventory.product_id,
+        _VALUE.label("value"), _LOW.label("low"), _OUT.label("out"), _MARGIN.label("margin"),
+        Inventory.counted_value, Inventory.counted_low, Inventory.counted_out,
+        Inventory.shortage_margin
+    )
+    .where(Inventory.product_id.in_(bindparam("product_ids", expanding=True)))
+)
+
+# 记录已计入的贡献并同步库存余量；保留 last_updated，避免触发其 onupdate
+_SET_COUNTED = (
+    update(_inventory_table)
+    .where(_inventory_table.c.product_id == bindparam("b_product_id"))
+    .values(
+        counted_value=bindparam("b_value"),
+        counted_low=bindparam("b_low"),
+        counted_out=bindparam("b_out"),
+        shortage_margin=bindparam("b_margin"),
+        last_updated=_inventory_table.c.last_updated
+    )
+)
+
+
+def _as_decimal(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _slot(product_id: int) -> int:
+    return product_id % settings.inventory_counter_slots
+
+
+def _add(deltas: Dict[int, Delta], slot: int, items: int, low: int, out: int, value: Decimal) -> None:
+    current = deltas.get(slot, _ZERO)
+    deltas[slot] = (current[0] + items, current[1] + low, current[2] + out, current[3] + value)
+
+
+class InventoryCounterCRUD(CRUDBase[InventoryCounter, dict, dict]):
+    """库存汇总计数器：商品数、库存不足数、缺货数、库存总价值
+
+    每个库存行记录自己已计入汇总的贡献（counted_* 列）。事务提交前，
+    对本事务改动过的商品重新计算贡献，与已计入值之差累加到计数器行，
+    计数器与库存在同一事务中提交；同时同步库存行的 shortage_margin（数量减预警值），
+    供库存不足列表走索引。ORM 对库存、商品的修改与删除自动识别，
+    Core 语句写入的库存需调用 touch() 登记。rebuild() 从库存表全量重建。
+
+    计数器分为多行（槽），商品的增量写入 商品ID % 槽数 对应的行，读取时对各行求和，
+    改动不同商品的并发事务不再争用同一行锁；调整槽数后无需迁移，新槽行在首次写入时创建。
+    """
+
+    def touch(self, db: Session, product_ids: Iterable[int]) -> None:
+        """登记本事务改动过库存的商品，提交前计入汇总"""
+        db.info.setdefault(_TOUCHED_KEY, set()).update(product_ids)
+
+    def apply_pending(self, db: Session) -> None:
+        """把本事务登记商品的贡献变化按槽累加到计数器，不提交事务"""
+        self._collect_orm_changes(db)
+        db.flush()
+        product_ids = sorted(db.info.pop(_TOUCHED_KEY, ()))
+        deltas: Dict[int, Delta] = db.info.pop(_REMOVED_KEY, {})
+
+        for start in range(0, len(product_ids), _CHUNK):
+            params = []
+            rows = db.execute(
+                _CONTRIBUTIONS, {"product_ids": product_ids[start:start + _CHUNK]}
+            )
+            for row in rows:
+                new_value = _as_decimal(row.value)
+                if row.counted_value is None:
+                    items = 1
+                elif (
+                    new_value == _as_decimal(row.counted_value)
+                    and row.low == bool(row.counted_low)
+                    and row.out == bool(row.counted_out)
+                    and row.margin == row.shortage_margin
+                ):
+                    continue
+                else:
+                    items = 0
+                _add(
+                    deltas, _slot(row.product_id), items,
+                    int(row.low) - int(bool(row.counted_low)),
+                    int(row.out) - int(bool(row.counted_out)),
+                    new_value - _as_decimal(row.counted_value)
+                )
+                params.append({
+                    "b_product_id": row.product_id,
+                    "b_value": new_value,
+                    "b_low": row.low,
+                    "b_out": row.out,
+                    "b_margin": row.margin
+                })
+            if params:
+                db.execute(_SET_COUNTED, params)
+
+        now = datetime.now()
+        # 按槽号顺序加锁，避免并发事务相互等待
+        for slot in sorted(deltas):
+            items, low, out, value = deltas[slot]
+            if not (items or low or out or value):
+                continue
+            result = db.execute(
+                update(InventoryCounter)
+                .where(InventoryCounter.id == slot)
+                .values(
+                    total_items=InventoryCounter.total_items + items,
+                    low_stock_items=InventoryCounter.low_stock_items + low,
+                    out_of_stock_items=InventoryCounter.out_of_stock_items + out,
+                    total_value=InventoryCounter.total_value + value,
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                continue
+            if not db.execute(_SUM_COUNTERS).one()[0]:
+                # 计数器行不存在（如直接建表的新库），全量重建
+                self._recount(db)
+                return
+            self._insert_slot(db, slot, (items, low, out, value), now)
+
+    def _insert_slot(self, db: Session, slot: int, delta: Delta, now: datetime) -> None:
+        """创建槽行；并发事务已先创建时改为累加"""
+        insert_stmt = upsert_insert(db.get_bind())
+        stmt = insert_stmt(InventoryCounter).values(
+            id=slot,
+            total_items=delta[0],
+            low_stock_items=delta[1],
+            out_of_stock_items=delta[2],
+            total_value=delta[3],
+            updated_at=now
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[InventoryCounter.id],
+            set_={
+                "total_items": InventoryCounter.total_items + stmt.excluded.total_items,
+                "low_stock_items": InventoryCounter.low_stock_items + stmt.excluded.low_stock_items,
+                "out_of_stock_items": InventoryCounter.out_of_stock_items + stmt.excluded.out_of_stock_items,
+                "total_value": InventoryCounter.total_value + stmt.excluded.total_value,
+                "updated_at": now
+            }
+        ))
+
+    def _collect_orm_changes(self, db: Session) -> None:
+        """登记会话中待写入的库存/商品修改，并扣除待删除库存行的贡献"""
+        product_ids = set()
+        for obj in list(db.new) + list(db.dirty):
+            if isinstance(obj, Inventory):
+                product_ids.add(obj.product_id)
+            elif isinstance(obj, Product) and obj.id is not None:
+                product_ids.add(obj.id)
+        if product_ids:
+            self.touch(db, product_ids)
+
+        for obj in db.deleted:
+            if isinstance(obj, Inventory) and obj.counted_value is not None:
+                _add(
+                    db.info.setdefault(_REMOVED_KEY, {}), _slot(obj.product_id),
+                    -1, -int(bool(obj.counted_low)), -int(bool(obj.counted_out)),
+                    -_as_decimal(obj.counted_value)
+                )
+
+    def discard_pending(self, db: Session) -> None:
+        db.info.pop(_TOUCHED_KEY, None)
+        db.info.pop(_REMOVED_KEY, None)
+
+    def _recount(self, db: Session) -> dict:
+        """重新计算全部库存行的贡献与余量并按槽重写计数器行，不提交事务"""
+        db.execute(
+            update(_inventory_table)
+            .values(
+                counted_value=_VALUE,
+                counted_low=_LOW,
+                counted_out=_OUT,
+                shortage_margin=_MARGIN,
+                last_updated=_inventory_table.c.last_updated
+            )
+        )
+        slot = Inventory.product_id % settings.inventory_counter_slots
+        totals = db.execute(
+            select(
+                slot,
+                func.count(Inventory.id),
+                func.coalesce(func.sum(case((Inventory.counted_low, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Inventory.counted_out, 1), else_=0)), 0),
+                func.coalesce(func.sum(Inventory.counted_value), 0)
+            )
+            .group_by(slot)
+        ).all()
+        now = datetime.now()
+        db.execute(delete(InventoryCounter).execution_options(synchronize_session=False))
+        # 至少保留一行，区分“汇总为零”与“计数器尚未建立”
+        rows = [
+            {
+                "id": row[0],
+                "total_items": row[1],
+                "low_stock_items": row[2],
+                "out_of_stock_items": row[3],
+                "total_value": _as_decimal(row[4]),
+                "updated_at": now
+            }
+            for row in totals
+        ] or [{
+            "id": 0, "total_items": 0, "low_stock_items": 0, "out_of_stock_items": 0,
+            "total_value": Decimal(0), "updated_at": now
+        }]
+        db.execute(insert(InventoryCounter), rows)
+        return self._as_summary(db.execute(_SUM_COUNTERS).one())
+
+    def rebuild(self, db: Session) -> dict:
+        """从库存表全量重建计数器（对账），返回重建后的汇总及重建前的偏差"""
+        before = self.get_summary(db)
+        self.discard_pending(db)
+        summary = self._recount(db)
+        db.commit()
+        return {
+            **summary,
+            "drift": {
+                field: round(before[field] - summary[field], 4)
+                for field in summary
+            }
+        }
+
+    def get_summary(self, db: Session) -> dict:
+        """读取库存汇总（各槽之和）；计数器行尚未建立时按库存表统计"""
+        counters = db.execute(_SUM_COUNTERS).one()
+        if counters[0]:
+            return self._as_summary(counters)
+        totals = db.execute(
+            select(
+                func.count(Inventory.id),
+                func.coalesce(func.sum(case((_LOW, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((_OUT, 1), else_=0)), 0),
+                func.coalesce(func.sum(_VALUE), 0)
+            )
+        ).one()
+        return {
+            "total_items": totals[0],
+            "low_stock_items": totals[1],
+            "out_of_stock_items": totals[2],
+            "total_inventory_value": round(float(totals[3]), 2)
+        }
+
+    def _as_summary(self, counters) -> dict:
+        """counters 为 _SUM_COUNTERS 的结果行：(行数, 商品数, 库存不足数, 缺货数, 总价值)"""
+        return {
+            "total_items": int(counters[1]),
+            "low_stock_items": int(counters[2]),
+            "out_of_stock_items": int(counters[3]),
+            "total_inventory_value": round(float(counters[4]), 2)
+        }
+
+
+inventory_counter = InventoryCounterCRUD(InventoryCounter)
+
+
+def _apply_before_commit(session: Session) -> None:
+    inventory_counter.apply_pending(session)
+
+
+def _discard_after_rollback(session: Session) -> None:
+    inventory_counter.discard_pending(session)
+
+
+# 计数器须与库存写入同事务提交，始终注册
+if not event.contains(Session, "before_commit", _apply_before_commit):
+    event.listen(Session, "before_commit", _apply_before_commit)
+    event.listen(Session, "after_rollback", _discard_after_rollback)
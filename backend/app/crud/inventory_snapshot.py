@@ -0,0 +1,138 @@
+from datetime import datetime
+from typing import Dict, Iterable
+from sqlalchemy import and_, func, insert, select, text
+from sqlalchemy.orm import Session
+from app.models.inventory import InventoryMovement
+from app.models.inventory_snapshot import InventorySnapshot
+from app.models.warehouse import WarehouseStock
+from app.crud.archive import archive
+from app.crud.base import CRUDBase
+from app.crud.inventory import inventory as inventory_crud
+
+
+class InventorySnapshotCRUD(CRUDBase[InventorySnapshot, dict, dict]):
+    """库存快照与历史时点库存查询
+
+    检查点只为上次检查点之后有变动的商品（首次为全部商品）写入快照行，
+    查询某时点库存时取该时点之前最近的快照，再加上快照之后、该时点之前的变动，
+    读取的流水行数只与两次检查点之间的变动有关，不随历史长度增长。
+    """
+
+    def take_snapshot(self, db: Session, *, min_new_movements: int = 0) -> dict:
+        """写入一个检查点并提交
+
+        自上次检查点以来新增的变动记录少于 min_new_movements 条时跳过，
+        定时频繁调用即可实现“每N条变动一个检查点”。
+
+        水位线须按提交顺序：PostgreSQL 上 ID 较小的流水可能在更大的 ID 之后才提交，
+        若在其提交前取 max(id) 作为水位线，这条流水既不在快照中也不在之后的增量中。
+        因此先以 SHARE 模式锁定流水表，等待正在写入流水的事务结束，并在检查点提交前
+        阻止新的流水写入；SQLite 同一时间只有一个写事务，无需加锁。
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE inventory_movements IN SHARE MODE"))
+        last_watermark = db.execute(select(func.max(InventorySnapshot.movement_id))).scalar()
+        current_watermark = db.execute(
+            select(func.coalesce(func.max(InventoryMovement.id), 0))
+        ).scalar()
+        if last_watermark is not None and current_watermark - last_watermark < max(min_new_movements, 1):
+            db.commit()
+            return {"created": 0, "movement_id": last_watermark}
+
+        # 数量取各仓库之和：汇总行在提交后同步，可能落后于流水
+        products = (
+            select(WarehouseStock.product_id, func.sum(WarehouseStock.quantity))
+            .group_by(WarehouseStock.product_id)
+        )
+        if last_watermark is not None:
+            products = products.where(WarehouseStock.product_id.in_(
+                select(InventoryMovement.product_id)
+                .where(InventoryMovement.id > last_watermark)
+                .distinct()
+            ))
+        # 水位线与库存数量在同一条语句中读取，保证快照与流水一致
+        watermark = (
+            select(func.coalesce(func.max(InventoryMovement.id), 0))
+            .scalar_subquery()
+        )
+        result = db.execute(
+            insert(InventorySnapshot).from_select(
+                ["product_id", "quantity", "movement_id"],
+                products.add_columns(watermark)
+            )
+        )
+        db.commit()
+        return {"created": result.rowcount, "movement_id": current_watermark}
+
+    def quantities_as_of(
+        self, db: Session, *, product_ids: Iterable[int], as_of: datetime
+    ) -> Dict[int, int]:
+        """返回 {商品ID: as_of 时刻的库存数量}，没有库存记录的商品不返回"""
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return {}
+
+        # 每个商品 as_of 之前最近的快照：按水位线而不是 snapshot_at 取最新，
+        # snapshot_at 在 SQLite 上只精确到秒，同一秒内的两个检查点无法区分
+        latest = (
+            select(
+                InventorySnapshot.product_id,
+                func.max(InventorySnapshot.movement_id).label("movement_id")
+            )
+            .where(
+                InventorySnapshot.product_id.in_(product_ids),
+                InventorySnapshot.snapshot_at <= as_of
+            )
+            .group_by(InventorySnapshot.product_id)
+            .subquery()
+        )
+        snapshots = (
+            select(
+                InventorySnapshot.product_id, InventorySnapshot.quantity,
+                InventorySnapshot.movement_id, InventorySnapshot.snapshot_at
+            )
+            .join(latest, and_(
+                InventorySnapshot.product_id == latest.c.product_id,
+                InventorySnapshot.movement_id == latest.c.movement_id
+            ))
+            .subquery()
+        )
+        quantities = {}
+        since = as_of
+        for row in db.execute(select(snapshots.c.product_id, snapshots.c.quantity, snapshots.c.snapshot_at)):
+            quantities[row.product_id] = row.quantity
+            since = min(since, row.snapshot_at)
+        # 需要读取的最早变动早于归档边界时合并查询归档流水
+        movement = archive.tiered(db, InventoryMovement, since=since)
+
+        # 快照之后、as_of 之前的变动
+        forward = (
+            select(movement.product_id, func.sum(movement.quantity))
+            .join(snapshots, and_(
+                movement.product_id == snapshots.c.product_id,
+                movement.id > snapshots.c.movement_id
+            ))
+            .where(movement.created_at <= as_of)
+            .group_by(movement.product_id)
+        )
+        for product_id, delta in db.execute(forward):
+            quantities[product_id] += delta or 0
+
+        # as_of 之前没有快照的商品：当前库存减去 as_of 之后的变动
+        missing = [product_id for product_id in product_ids if product_id not in quantities]
+        if missing:
+            current = inventory_crud.total_quantities(db, product_ids=missing)
+            later = dict(db.execute(
+                select(movement.product_id, func.sum(movement.quantity))
+                .where(
+                    movement.product_id.in_(list(current)),
+                    movement.created_at > as_of
+                )
+                .group_by(movement.product_id)
+            ).all())
+            for product_id, quantity in current.items():
+                quantities[product_id] = (quantity or 0) - (later.get(product_id) or 0)
+        return quantities
+
+
+inventory_snapshot = InventorySnapshotCRUD(InventorySnapshot)
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+# 订单状态及允许的流转，cancelled 为终态
+ORDER_STATUSES = ("pending", "completed", "cancelled")
+STATUS_TRANSITIONS = {
+    "pending": ("completed", "cancelled"),
+    "completed": ("cancelled",),
+    "cancelled": (),
+}
+
+
+def _outcome(id: int, outcome: str, detail: str = None) -> dict:
+    return {"id": id, "outcome": outcome, "detail": detail}
+
+
+def transition_status(
+    db: Session, model, *, ids: Sequence[int], status: str
+) -> Tuple[Dict[int, dict], Dict[int, str]]:
+    """一条带流转条件的UPDATE批量修改订单状态，不提交事务
+
+    返回 (逐ID结果, {已更新ID: 原状态})。
+    """
+    if status not in ORDER_STATUSES:
+        raise ValueError(f"不支持的订单状态: {status}")
+    allowed_from = [
+        current for current, targets in STATUS_TRANSITIONS.items() if status in targets
+    ]
+    ids = list(dict.fromkeys(ids))
+
+    # 读取原状态（PostgreSQL下同时锁定订单行），用于生成逐ID结果
+    current = dict(db.execute(
+        select(model.id, model.status)
+        .where(model.id.in_(ids))
+        .order_by(model.id)
+        .with_for_update()
+    ).all())
+
+    updated = set(db.execute(
+        update(model)
+        .where(model.id.in_(ids), model.status.in_(allowed_from))
+        .values(status=status, updated_at=datetime.now(), version_id=model.version_id + 1)
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+
+    outcomes = {}
+    for id in ids:
+        if id in updated:
+            outcomes[id] = _outcome(id, "updated")
+        elif id not in current:
+            outcomes[id] = _outcome(id, "not_found", "订单不存在")
+        elif current[id] == status:
+            outcomes[id] = _outcome(id, "unchanged", f"订单已是 {status} 状态")
+        else:
+            outcomes[id] = _outcome(
+                id, "invalid_transition", f"订单状态 {current[id]} 不能变更为 {status}"
+            )
+    return outcomes, {id: current.get(id) for id in updated}
+
+
+def summarize_outcomes(status: str, outcomes: Dict[int, dict]) -> dict:
+    results: List[dict] = list(outcomes.values())
+    return {
+        "status": status,
+        "updated": sum(1 for result in results if result["outcome"] == "updated"),
+        "results": results
+    }
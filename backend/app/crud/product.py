@@ -1,18 +1,22 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, bindparam, select
 from app.crud.base import CRUDBase
 from app.models.product import Product
 from app.models.inventory import Inventory
 from app.schemas.product import ProductCreate, ProductUpdate
 
+# 预构建的热点查询语句
+_GET_BY_SKU = select(Product).where(Product.sku == bindparam("sku")).limit(1)
+_GET_BY_NAME = select(Product).where(Product.name == bindparam("name")).limit(1)
+
 
 class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
     def get_by_sku(self, db: Session, *, sku: str) -> Optional[Product]:
-        return db.query(Product).filter(Product.sku == sku).first()
+        return db.execute(_GET_BY_SKU, {"sku": sku}).scalars().first()
 
     def get_by_name(self, db: Session, *, name: str) -> Optional[Product]:
-        return db.query(Product).filter(Product.name == name).first()
+        return db.execute(_GET_BY_NAME, {"name": name}).scalars().first()
 
     def search(
         self,
@@ -72,9 +76,10 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
             .join(Inventory)
             .options(joinedload(Product.inventory))
             .filter(and_(
-                Inventory.quantity <= Product.reorder_level,
+                Inventory.shortage_margin <= 0,
                 Product.reorder_level > 0
             ))
+            .order_by(Inventory.shortage_margin.asc())
             .offset(skip)
             .limit(limit)
             .all()
@@ -89,11 +94,13 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         """检查商品是否有关联的交易记录"""
         from app.models.purchase import PurchaseItem
         from app.models.sale import SaleItem
+        from app.models.stock_transfer import StockTransferItem
 
         purchase_item = db.query(PurchaseItem).filter(PurchaseItem.product_id == product_id).first()
         sale_item = db.query(SaleItem).filter(SaleItem.product_id == product_id).first()
+        transfer_item = db.query(StockTransferItem).filter(StockTransferItem.product_id == product_id).first()
 
-        return purchase_item is not None or sale_item is not None
+        return purchase_item is not None or sale_item is not None or transfer_item is not None
 
 
 product = CRUDProduct(Product)
\ No newline at end of file
@@ -1,23 +1,90 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, bindparam, insert, or_, select, update
 from app.models.purchase import Purchase, PurchaseItem
 from app.models.supplier import Supplier
 from app.models.product import Product
 from app.models.inventory import Inventory
 from app.models.inventory import InventoryMovement
 from app.schemas.purchase import PurchaseCreate, PurchaseUpdate, PurchaseItemCreate
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, check_version
+from app.crud.bulk import BulkEntry, post_in_chunks
+from app.crud.document_number import PURCHASE_PREFIX, document_number
+from app.crud.order_status import summarize_outcomes, transition_status
+from app.crud.inventory import inventory as inventory_crud
+from app.crud.warehouse import warehouse as warehouse_crud
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID
 from datetime import datetime
-import uuid
+
+
+def _flatten_purchase_item(item: PurchaseItem) -> dict:
+    """将订单项和商品信息合并为扁平结构"""
+    item_dict = {
+        "id": item.id,
+        "purchase_id": item.purchase_id,
+        "product_id": item.product_id,
+        "warehouse_id": item.warehouse_id,
+        "quantity": item.quantity,
+        "unit_price": float(item.unit_price) if item.unit_price else 0,
+        "total_price": float(item.total_price) if item.total_price else 0
+    }
+
+    # 如果有产品信息，添加产品详情
+    if item.product:
+        item_dict.update({
+            "product_name": item.product.name,
+            "product_sku": item.product.sku,
+            "product_description": item.product.description,
+            "unit": item.product.unit
+        })
+    return item_dict
+
+
+def _flatten_purchase(purchase: Purchase, supplier: Supplier, *, with_items: bool = False) -> dict:
+    """将采购订单和供应商信息合并为扁平结构"""
+    flattened_item = {
+        "id": purchase.id,
+        "supplier_id": purchase.supplier_id,
+        "user_id": purchase.user_id,
+        "purchase_number": purchase.purchase_number,
+        "purchase_date": purchase.purchase_date.isoformat() if purchase.purchase_date else None,
+        "total_amount": float(purchase.total_amount) if purchase.total_amount else 0,
+        "status": purchase.status,
+        "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
+        "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
+        "version_id": purchase.version_id,
+        "supplier_name": supplier.name
+    }
+    if with_items:
+        flattened_item["items"] = [_flatten_purchase_item(item) for item in purchase.items]
+    return flattened_item
+
+
+_purchase_table = Purchase.__table__
+
+# 撤销状态变更：仅当状态仍为本次写入的值时恢复原状态
+_RESTORE_STATUS = (
+    update(_purchase_table)
+    .where(
+        _purchase_table.c.id == bindparam("b_id"),
+        _purchase_table.c.status == bindparam("b_current")
+    )
+    .values(status=bindparam("b_status"), version_id=_purchase_table.c.version_id + 1)
+)
 
 
 class PurchaseCRUD(CRUDBase[Purchase, PurchaseCreate, PurchaseUpdate]):
-    def create_purchase_with_items(
+    def post_purchase(
         self, db: Session, *, purchase_in: PurchaseCreate, user_id: int
     ) -> Purchase:
+        """写入采购订单、订单项和库存流水并更新库存，不提交事务；仓库无效时抛出ValueError"""
+        warehouse_crud.check_active(
+            db, {item_data.warehouse_id or DEFAULT_WAREHOUSE_ID for item_data in purchase_in.items}
+        )
+
         # Generate purchase number
-        purchase_number = f"PO{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
+        purchase_number = document_number.allocate(db, PURCHASE_PREFIX)
 
         # Create purchase
         db_purchase = Purchase(
@@ -31,64 +98,73 @@ class PurchaseCRUD(CRUDBase[Purchase, PurchaseCreate, PurchaseUpdate]):
         db.flush()  # Get the ID without committing
 
         total_amount = 0
+        item_rows = []
+        movement_rows = []
+        # 按(商品, 仓库)汇总入库数量和成本，同一位置多行只更新一次库存
+        receipts = {}
 
-        # Create purchase items and update inventory
         for item_data in purchase_in.items:
             # Calculate total price for this item
             item_total = item_data.quantity * item_data.unit_price
             total_amount += item_total
+            warehouse_id = item_data.warehouse_id or DEFAULT_WAREHOUSE_ID
 
-            # Create purchase item
-            db_item = PurchaseItem(
-                purchase_id=db_purchase.id,
-                product_id=item_data.product_id,
-                quantity=item_data.quantity,
-                unit_price=item_data.unit_price,
-                total_price=item_total
-            )
-            db.add(db_item)
-
-            # Update inventory
-            inventory = db.query(Inventory).filter(
-                Inventory.product_id == item_data.product_id
-            ).first()
-
-            if inventory:
-                # Update existing inventory
-                old_quantity = inventory.quantity
-                inventory.quantity += item_data.quantity
-
-                # Calculate new average cost
-                total_cost = (old_quantity * inventory.avg_cost) + item_total
-                inventory.avg_cost = total_cost / inventory.quantity
-                inventory.last_updated = datetime.now()
-            else:
-                # Create new inventory record
-                inventory = Inventory(
-                    product_id=item_data.product_id,
-                    quantity=item_data.quantity,
-                    avg_cost=item_data.unit_price,
-                    last_updated=datetime.now()
-                )
-                db.add(inventory)
-
-            # Record inventory movement
-            movement = InventoryMovement(
-                product_id=item_data.product_id,
-                movement_type="in",
-                quantity=item_data.quantity,
-                reference_type="purchase",
-                reference_id=db_purchase.id,
-                reason=f"采购订单 {purchase_number}"
-            )
-            db.add(movement)
+            item_rows.append({
+                "purchase_id": db_purchase.id,
+                "product_id": item_data.product_id,
+                "warehouse_id": warehouse_id,
+                "quantity": item_data.quantity,
+                "unit_price": item_data.unit_price,
+                "total_price": item_total
+            })
+            movement_rows.append({
+                "product_id": item_data.product_id,
+                "warehouse_id": warehouse_id,
+                "movement_type": "in",
+                "quantity": item_data.quantity,
+                "reference_type": "purchase",
+                "reference_id": db_purchase.id,
+                "reason": f"采购订单 {purchase_number}"
+            })
+            key = (item_data.product_id, warehouse_id)
+            quantity, cost = receipts.get(key, (0, 0))
+            receipts[key] = (quantity + item_data.quantity, cost + item_total)
+
+        # 批量更新库存和加权平均成本，订单项和库存流水以executemany写入
+        inventory_crud.apply_receipts(db, receipts=receipts)
+        db.execute(insert(PurchaseItem), item_rows)
+        db.execute(insert(InventoryMovement), movement_rows)
 
         # Update purchase total amount
         db_purchase.total_amount = total_amount
+        db.flush()
+        return db_purchase
 
+    def create_purchase_with_items(
+        self, db: Session, *, purchase_in: PurchaseCreate, user_id: int
+    ) -> Purchase:
+        try:
+            db_purchase = self.post_purchase(db, purchase_in=purchase_in, user_id=user_id)
+        except ValueError:
+            db.rollback()
+            raise
         db.commit()
-        db.refresh(db_purchase)
-        return db_purchase
+        # 连同订单项和商品一并加载，避免调用方逐项懒加载
+        return self.get_with_items(db, id=db_purchase.id)
+
+    def import_purchases(
+        self, db: Session, *, orders: List[BulkEntry], user_id: int, chunk_size: int
+    ) -> List[dict]:
+        """批量导入采购订单，每chunk_size单提交一次，单个订单失败不影响其他订单"""
+        return post_in_chunks(
+            db,
+            orders,
+            lambda purchase_in: self.post_purchase(db, purchase_in=purchase_in, user_id=user_id),
+            number_of=lambda db_purchase: db_purchase.purchase_number,
+            chunk_size=chunk_size,
+            # 每块开始前预留足够的单据号，块内分配不再访问数据库
+            before_chunk=lambda count: document_number.reserve(db, PURCHASE_PREFIX, count)
+        )
 
     def get_with_items(self, db: Session, id: int) -> Optional[Purchase]:
         return (
@@ -103,61 +179,24 @@ class PurchaseCRUD(CRUDBase[Purchase, PurchaseCreate, PurchaseUpdate]):
         results = (
             db.query(Purchase, Supplier)
             .join(Supplier, Purchase.supplier_id == Supplier.id)
+            .options(selectinload(Purchase.items).selectinload(PurchaseItem.product))
             .order_by(Purchase.created_at.desc())
             .offset(skip)
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for purchase, supplier in results:
-            # 将采购订单和供应商信息合并为扁平结构
-            flattened_item = {
-                "id": purchase.id,
-                "supplier_id": purchase.supplier_id,
-                "user_id": purchase.user_id,
-                "purchase_number": purchase.purchase_number,
-                "purchase_date": purchase.purchase_date.isoformat() if purchase.purchase_date else None,
-                "total_amount": float(purchase.total_amount) if purchase.total_amount else 0,
-                "status": purchase.status,
-                "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
-                "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
-                "supplier_name": supplier.name,
-                "items": []
-            }
-            
-            # 处理订单项
-            for item in purchase.items:
-                item_dict = {
-                    "id": item.id,
-                    "purchase_id": item.purchase_id,
-                    "product_id": item.product_id,
-                    "quantity": item.quantity,
-                    "unit_price": float(item.unit_price) if item.unit_price else 0,
-                    "total_price": float(item.total_price) if item.total_price else 0
-                }
-                
-                # 如果有产品信息，添加产品详情
-                if item.product:
-                    item_dict.update({
-                        "product_name": item.product.name,
-                        "product_sku": item.product.sku,
-                        "product_description": item.product.description,
-                        "unit": item.product.unit
-                    })
-                
-                flattened_item["items"].append(item_dict)
-            
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [
+            _flatten_purchase(purchase, supplier, with_items=True)
+            for purchase, supplier in results
+        ]
 
     def get_multi_with_items(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[Purchase]:
         return (
             db.query(self.model)
-            .options(joinedload(Purchase.items).joinedload(PurchaseItem.product))
+            .options(selectinload(Purchase.items).selectinload(PurchaseItem.product))
             .order_by(Purchase.created_at.desc())
             .offset(skip)
             .limit(limit)
@@ -176,35 +215,124 @@ class PurchaseCRUD(CRUDBase[Purchase, PurchaseCreate, PurchaseUpdate]):
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for purchase, supplier in results:
-            # 将采购订单和供应商信息合并为扁平结构
-            flattened_item = {
-                "id": purchase.id,
-                "supplier_id": purchase.supplier_id,
-                "user_id": purchase.user_id,
-                "purchase_number": purchase.purchase_number,
-                "purchase_date": purchase.purchase_date.isoformat() if purchase.purchase_date else None,
-                "total_amount": float(purchase.total_amount) if purchase.total_amount else 0,
-                "status": purchase.status,
-                "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
-                "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
-                "supplier_name": supplier.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_purchase(purchase, supplier) for purchase, supplier in results]
+
+    async def aget_with_items_flattened(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ):
+        """获取采购订单信息并扁平化供应商和商品字段（异步）"""
+        result = await db.execute(
+            select(Purchase, Supplier)
+            .join(Supplier, Purchase.supplier_id == Supplier.id)
+            .options(selectinload(Purchase.items).selectinload(PurchaseItem.product))
+            .order_by(Purchase.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return [
+            _flatten_purchase(purchase, supplier, with_items=True)
+            for purchase, supplier in result.all()
+        ]
+
+    async def aget_multi_with_items_flattened(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ):
+        """获取采购订单列表并扁平化供应商字段（异步）"""
+        result = await db.execute(
+            select(Purchase, Supplier)
+            .join(Supplier, Purchase.supplier_id == Supplier.id)
+            .order_by(Purchase.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return [_flatten_purchase(purchase, supplier) for purchase, supplier in result.all()]
 
     def update_status(
-        self, db: Session, *, db_obj: Purchase, status: str
+        self, db: Session, *, db_obj: Purchase, status: str, expected_version: Optional[int] = None
     ) -> Purchase:
-        db_obj.status = status
-        db_obj.updated_at = datetime.now()
-        db.commit()
+        """变更单个采购订单状态，与批量变更使用相同的流转校验和库存处理
+
+        状态不允许流转或库存不足等未能变更时抛出ValueError；已是目标状态时不做修改。
+        """
+        check_version(db_obj, expected_version)
+        result = self.bulk_update_status(db, ids=[db_obj.id], status=status)["results"][0]
+        if result["outcome"] not in ("updated", "unchanged"):
+            raise ValueError(result["detail"])
         db.refresh(db_obj)
         return db_obj
 
+    def bulk_update_status(self, db: Session, *, ids: List[int], status: str) -> dict:
+        """批量变更采购订单状态，取消的订单批量扣回入库数量，整批在一个事务中提交
+
+        库存不足以扣回的订单恢复原状态，结果为 insufficient_stock。
+        """
+        outcomes, updated = transition_status(db, Purchase, ids=ids, status=status)
+
+        if status == "cancelled" and updated:
+            lines = db.execute(
+                select(PurchaseItem.purchase_id, PurchaseItem.product_id, PurchaseItem.warehouse_id,
+                       PurchaseItem.quantity, Purchase.purchase_number)
+                .join(Purchase, PurchaseItem.purchase_id == Purchase.id)
+                .where(PurchaseItem.purchase_id.in_(updated))
+                .order_by(PurchaseItem.purchase_id)
+            ).all()
+            lines_by_purchase = {}
+            for line in lines:
+                lines_by_purchase.setdefault(line.purchase_id, []).append(line)
+
+            # 按订单ID顺序在内存中逐单确认入库仓库的库存是否足以扣回
+            stock = inventory_crud.lock_quantities(
+                db, keys=[(line.product_id, line.warehouse_id) for line in lines]
+            )
+            accepted, rejected = [], []
+            for purchase_id in sorted(lines_by_purchase):
+                demand = {}
+                for line in lines_by_purchase[purchase_id]:
+                    key = (line.product_id, line.warehouse_id)
+                    demand[key] = demand.get(key, 0) + line.quantity
+                if all(stock.get(key, 0) >= quantity for key, quantity in demand.items()):
+                    for key, quantity in demand.items():
+                        stock[key] -= quantity
+                    accepted.append(purchase_id)
+                else:
+                    rejected.append(purchase_id)
+
+            if rejected:
+                db.execute(_RESTORE_STATUS, [
+                    {"b_id": purchase_id, "b_status": updated[purchase_id], "b_current": status}
+                    for purchase_id in rejected
+                ])
+                for purchase_id in rejected:
+                    outcomes[purchase_id] = {
+                        "id": purchase_id,
+                        "outcome": "insufficient_stock",
+                        "detail": "库存不足，无法扣回该订单的入库数量"
+                    }
+
+            accepted_lines = [line for purchase_id in accepted for line in lines_by_purchase[purchase_id]]
+            deltas = {}
+            for line in accepted_lines:
+                key = (line.product_id, line.warehouse_id)
+                deltas[key] = deltas.get(key, 0) - line.quantity
+            inventory_crud.shift_stock(db, deltas=deltas)
+            if accepted_lines:
+                db.execute(insert(InventoryMovement), [
+                    {
+                        "product_id": line.product_id,
+                        "warehouse_id": line.warehouse_id,
+                        "movement_type": "out",
+                        "quantity": -line.quantity,
+                        "reference_type": "purchase",
+                        "reference_id": line.purchase_id,
+                        "reason": f"取消采购订单 {line.purchase_number}"
+                    }
+                    for line in accepted_lines
+                ])
+
+        db.commit()
+        return summarize_outcomes(status, outcomes)
+
     def get_by_supplier(
         self, db: Session, *, supplier_id: int, skip: int = 0, limit: int = 100
     ) -> List[Purchase]:
@@ -230,25 +358,8 @@ class PurchaseCRUD(CRUDBase[Purchase, PurchaseCreate, PurchaseUpdate]):
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for purchase, supplier in results:
-            # 将采购订单和供应商信息合并为扁平结构
-            flattened_item = {
-                "id": purchase.id,
-                "supplier_id": purchase.supplier_id,
-                "user_id": purchase.user_id,
-                "purchase_number": purchase.purchase_number,
-                "purchase_date": purchase.purchase_date.isoformat() if purchase.purchase_date else None,
-                "total_amount": float(purchase.total_amount) if purchase.total_amount else 0,
-                "status": purchase.status,
-                "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
-                "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
-                "supplier_name": supplier.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_purchase(purchase, supplier) for purchase, supplier in results]
 
     def get_by_status(
         self, db: Session, *, status: str, skip: int = 0, limit: int = 100
@@ -275,25 +386,8 @@ class PurchaseCRUD(CRUDBase[Purchase, PurchaseCreate, PurchaseUpdate]):
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for purchase, supplier in results:
-            # 将采购订单和供应商信息合并为扁平结构
-            flattened_item = {
-                "id": purchase.id,
-                "supplier_id": purchase.supplier_id,
-                "user_id": purchase.user_id,
-                "purchase_number": purchase.purchase_number,
-                "purchase_date": purchase.purchase_date.isoformat() if purchase.purchase_date else None,
-                "total_amount": float(purchase.total_amount) if purchase.total_amount else 0,
-                "status": purchase.status,
-                "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
-                "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
-                "supplier_name": supplier.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_purchase(purchase, supplier) for purchase, supplier in results]
 
     def search_purchases(
         self, db: Session, *, query: str, skip: int = 0, limit: int = 100
@@ -331,25 +425,8 @@ class PurchaseCRUD(CRUDBase[Purchase, PurchaseCreate, PurchaseUpdate]):
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for purchase, supplier in results:
-            # 将采购订单和供应商信息合并为扁平结构
-            flattened_item = {
-                "id": purchase.id,
-                "supplier_id": purchase.supplier_id,
-                "user_id": purchase.user_id,
-                "purchase_number": purchase.purchase_number,
-                "purchase_date": purchase.purchase_date.isoformat() if purchase.purchase_date else None,
-                "total_amount": float(purchase.total_amount) if purchase.total_amount else 0,
-                "status": purchase.status,
-                "created_at": purchase.created_at.isoformat() if purchase.created_at else None,
-                "updated_at": purchase.updated_at.isoformat() if purchase.updated_at else None,
-                "supplier_name": supplier.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_purchase(purchase, supplier) for purchase, supplier in results]
 
 
 # Create a singleton instance
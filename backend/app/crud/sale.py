@@ -1,36 +1,92 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, insert, or_, select
 from app.models.sale import Sale, SaleItem
 from app.models.customer import Customer
-from app.models.product import Product
-from app.models.inventory import Inventory
 from app.models.inventory import InventoryMovement
 from app.schemas.sale import SaleCreate, SaleUpdate, SaleItemCreate
-from app.crud.base import CRUDBase
+from app.crud.archive import archive
+from app.crud.base import CRUDBase, check_version
+from app.crud.bulk import BulkEntry, post_in_chunks
+from app.crud.document_number import SALE_PREFIX, document_number
+from app.crud.order_status import summarize_outcomes, transition_status
+from app.crud.inventory import inventory as inventory_crud
+from app.crud.product import product as product_crud
+from app.crud.warehouse import warehouse as warehouse_crud
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID
 from datetime import datetime
-import uuid
+
+
+def _flatten_sale_item(item: SaleItem) -> dict:
+    """将订单项和商品信息合并为扁平结构"""
+    item_dict = {
+        "id": item.id,
+        "sale_id": item.sale_id,
+        "product_id": item.product_id,
+        "warehouse_id": item.warehouse_id,
+        "quantity": item.quantity,
+        "unit_price": float(item.unit_price) if item.unit_price else 0,
+        "total_price": float(item.total_price) if item.total_price else 0
+    }
+
+    # 如果有产品信息，添加产品详情
+    if item.product:
+        item_dict.update({
+            "product_name": item.product.name,
+            "product_sku": item.product.sku,
+            "product_description": item.product.description,
+            "unit": item.product.unit
+        })
+    return item_dict
+
+
+def _flatten_sale(sale: Sale, customer: Customer, *, with_items: bool = False) -> dict:
+    """将销售订单和客户信息合并为扁平结构"""
+    flattened_item = {
+        "id": sale.id,
+        "customer_id": sale.customer_id,
+        "user_id": sale.user_id,
+        "sale_number": sale.sale_number,
+        "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
+        "total_amount": float(sale.total_amount) if sale.total_amount else 0,
+        "status": sale.status,
+        "created_at": sale.created_at.isoformat() if sale.created_at else None,
+        "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
+        "version_id": sale.version_id,
+        "customer_name": customer.name
+    }
+    if with_items:
+        flattened_item["items"] = [_flatten_sale_item(item) for item in sale.items]
+    return flattened_item
 
 
 class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
-    def create_sale_with_items(
+    def post_sale(
         self, db: Session, *, sale_in: SaleCreate, user_id: int
     ) -> Sale:
+        """扣减库存并写入销售订单、订单项和库存流水，不提交事务；库存不足时抛出ValueError"""
         # Generate sale number
-        sale_number = f"SO{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
+        sale_number = document_number.allocate(db, SALE_PREFIX)
 
-        # Check inventory availability first
+        # 按(商品, 仓库)汇总需求数量，并按此顺序扣减，保证并发事务加锁顺序一致
+        demand = {}
         for item_data in sale_in.items:
-            inventory = db.query(Inventory).filter(
-                Inventory.product_id == item_data.product_id
-            ).first()
+            key = (item_data.product_id, item_data.warehouse_id or DEFAULT_WAREHOUSE_ID)
+            demand[key] = demand.get(key, 0) + item_data.quantity
+        warehouse_crud.check_active(db, {warehouse_id for _, warehouse_id in demand})
 
-            if not inventory or inventory.quantity < item_data.quantity:
-                product = db.query(Product).filter(
-                    Product.id == item_data.product_id
-                ).first()
-                product_name = product.name if product else f"商品ID {item_data.product_id}"
-                raise ValueError(f"商品 '{product_name}' 库存不足，需要 {item_data.quantity} 件，可用 {inventory.quantity if inventory else 0} 件")
+        for product_id, warehouse_id in sorted(demand):
+            quantity = demand[(product_id, warehouse_id)]
+            if not inventory_crud.deduct_stock(
+                db, product_id=product_id, quantity=quantity, warehouse_id=warehouse_id
+            ):
+                available = inventory_crud.location_quantity(
+                    db, product_id=product_id, warehouse_id=warehouse_id
+                )
+                product = product_crud.get(db, id=product_id)
+                product_name = product.name if product else f"商品ID {product_id}"
+                raise ValueError(f"商品 '{product_name}' 在仓库 {warehouse_id} 库存不足，需要 {quantity} 件，可用 {available} 件")
 
         # Create sale
         db_sale = Sale(
@@ -44,49 +100,67 @@ class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
         db.flush()  # Get the ID without committing
 
         total_amount = 0
+        item_rows = []
+        movement_rows = []
 
-        # Create sale items and update inventory
         for item_data in sale_in.items:
             # Calculate total price for this item
             item_total = item_data.quantity * item_data.unit_price
             total_amount += item_total
+            warehouse_id = item_data.warehouse_id or DEFAULT_WAREHOUSE_ID
 
-            # Create sale item
-            db_item = SaleItem(
-                sale_id=db_sale.id,
-                product_id=item_data.product_id,
-                quantity=item_data.quantity,
-                unit_price=item_data.unit_price,
-                total_price=item_total
-            )
-            db.add(db_item)
-
-            # Update inventory (decrease)
-            inventory = db.query(Inventory).filter(
-                Inventory.product_id == item_data.product_id
-            ).first()
-
-            if inventory:
-                inventory.quantity -= item_data.quantity
-                inventory.last_updated = datetime.now()
-
-            # Record inventory movement
-            movement = InventoryMovement(
-                product_id=item_data.product_id,
-                movement_type="out",
-                quantity=-item_data.quantity,  # Negative for outgoing
-                reference_type="sale",
-                reference_id=db_sale.id,
-                reason=f"销售订单 {sale_number}"
-            )
-            db.add(movement)
+            item_rows.append({
+                "sale_id": db_sale.id,
+                "product_id": item_data.product_id,
+                "warehouse_id": warehouse_id,
+                "quantity": item_data.quantity,
+                "unit_price": item_data.unit_price,
+                "total_price": item_total
+            })
+            movement_rows.append({
+                "product_id": item_data.product_id,
+                "warehouse_id": warehouse_id,
+                "movement_type": "out",
+                "quantity": -item_data.quantity,  # Negative for outgoing
+                "reference_type": "sale",
+                "reference_id": db_sale.id,
+                "reason": f"销售订单 {sale_number}"
+            })
+
+        # 库存已扣减，订单项和库存流水以executemany写入
+        db.execute(insert(SaleItem), item_rows)
+        db.execute(insert(InventoryMovement), movement_rows)
 
         # Update sale total amount
         db_sale.total_amount = total_amount
+        db.flush()
+        return db_sale
 
+    def create_sale_with_items(
+        self, db: Session, *, sale_in: SaleCreate, user_id: int
+    ) -> Sale:
+        try:
+            db_sale = self.post_sale(db, sale_in=sale_in, user_id=user_id)
+        except ValueError:
+            db.rollback()
+            raise
         db.commit()
-        db.refresh(db_sale)
-        return db_sale
+        # 连同订单项和商品一并加载，避免调用方逐项懒加载
+        return self.get_with_items(db, id=db_sale.id)
+
+    def import_sales(
+        self, db: Session, *, orders: List[BulkEntry], user_id: int, chunk_size: int
+    ) -> List[dict]:
+        """批量导入销售订单，每chunk_size单提交一次，单个订单失败不影响其他订单"""
+        return post_in_chunks(
+            db,
+            orders,
+            lambda sale_in: self.post_sale(db, sale_in=sale_in, user_id=user_id),
+            number_of=lambda db_sale: db_sale.sale_number,
+            chunk_size=chunk_size,
+            # 每块开始前预留足够的单据号，块内分配不再访问数据库
+            before_chunk=lambda count: document_number.reserve(db, SALE_PREFIX, count)
+        )
 
     def get_with_items(self, db: Session, id: int) -> Optional[Sale]:
         return (
@@ -101,61 +175,24 @@ class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
         results = (
             db.query(Sale, Customer)
             .join(Customer, Sale.customer_id == Customer.id)
+            .options(selectinload(Sale.items).selectinload(SaleItem.product))
             .order_by(Sale.created_at.desc())
             .offset(skip)
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for sale, customer in results:
-            # 将销售订单和客户信息合并为扁平结构
-            flattened_item = {
-                "id": sale.id,
-                "customer_id": sale.customer_id,
-                "user_id": sale.user_id,
-                "sale_number": sale.sale_number,
-                "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
-                "total_amount": float(sale.total_amount) if sale.total_amount else 0,
-                "status": sale.status,
-                "created_at": sale.created_at.isoformat() if sale.created_at else None,
-                "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
-                "customer_name": customer.name,
-                "items": []
-            }
-            
-            # 处理订单项
-            for item in sale.items:
-                item_dict = {
-                    "id": item.id,
-                    "sale_id": item.sale_id,
-                    "product_id": item.product_id,
-                    "quantity": item.quantity,
-                    "unit_price": float(item.unit_price) if item.unit_price else 0,
-                    "total_price": float(item.total_price) if item.total_price else 0
-                }
-                
-                # 如果有产品信息，添加产品详情
-                if item.product:
-                    item_dict.update({
-                        "product_name": item.product.name,
-                        "product_sku": item.product.sku,
-                        "product_description": item.product.description,
-                        "unit": item.product.unit
-                    })
-                
-                flattened_item["items"].append(item_dict)
-            
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [
+            _flatten_sale(sale, customer, with_items=True)
+            for sale, customer in results
+        ]
 
     def get_multi_with_items(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[Sale]:
         return (
             db.query(self.model)
-            .options(joinedload(Sale.items).joinedload(SaleItem.product))
+            .options(selectinload(Sale.items).selectinload(SaleItem.product))
             .order_by(Sale.created_at.desc())
             .offset(skip)
             .limit(limit)
@@ -174,35 +211,88 @@ class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for sale, customer in results:
-            # 将销售订单和客户信息合并为扁平结构
-            flattened_item = {
-                "id": sale.id,
-                "customer_id": sale.customer_id,
-                "user_id": sale.user_id,
-                "sale_number": sale.sale_number,
-                "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
-                "total_amount": float(sale.total_amount) if sale.total_amount else 0,
-                "status": sale.status,
-                "created_at": sale.created_at.isoformat() if sale.created_at else None,
-                "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
-                "customer_name": customer.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_sale(sale, customer) for sale, customer in results]
+
+    async def aget_with_items_flattened(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ):
+        """获取销售订单信息并扁平化客户和商品字段（异步）"""
+        result = await db.execute(
+            select(Sale, Customer)
+            .join(Customer, Sale.customer_id == Customer.id)
+            .options(selectinload(Sale.items).selectinload(SaleItem.product))
+            .order_by(Sale.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return [
+            _flatten_sale(sale, customer, with_items=True)
+            for sale, customer in result.all()
+        ]
+
+    async def aget_multi_with_items_flattened(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ):
+        """获取销售订单列表并扁平化客户字段（异步）"""
+        result = await db.execute(
+            select(Sale, Customer)
+            .join(Customer, Sale.customer_id == Customer.id)
+            .order_by(Sale.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return [_flatten_sale(sale, customer) for sale, customer in result.all()]
 
     def update_status(
-        self, db: Session, *, db_obj: Sale, status: str
+        self, db: Session, *, db_obj: Sale, status: str, expected_version: Optional[int] = None
     ) -> Sale:
-        db_obj.status = status
-        db_obj.updated_at = datetime.now()
-        db.commit()
+        """变更单个销售订单状态，与批量变更使用相同的流转校验和库存处理
+
+        状态不允许流转或库存不足等未能变更时抛出ValueError；已是目标状态时不做修改。
+        """
+        check_version(db_obj, expected_version)
+        result = self.bulk_update_status(db, ids=[db_obj.id], status=status)["results"][0]
+        if result["outcome"] not in ("updated", "unchanged"):
+            raise ValueError(result["detail"])
         db.refresh(db_obj)
         return db_obj
 
+    def bulk_update_status(self, db: Session, *, ids: List[int], status: str) -> dict:
+        """批量变更销售订单状态，取消的订单批量回补库存，整批在一个事务中提交"""
+        outcomes, updated = transition_status(db, Sale, ids=ids, status=status)
+
+        if status == "cancelled" and updated:
+            lines = db.execute(
+                select(
+                    SaleItem.sale_id, SaleItem.product_id, SaleItem.warehouse_id,
+                    SaleItem.quantity, Sale.sale_number
+                )
+                .join(Sale, SaleItem.sale_id == Sale.id)
+                .where(SaleItem.sale_id.in_(updated))
+            ).all()
+            deltas = {}
+            for line in lines:
+                key = (line.product_id, line.warehouse_id)
+                deltas[key] = deltas.get(key, 0) + line.quantity
+            inventory_crud.shift_stock(db, deltas=deltas)
+            if lines:
+                db.execute(insert(InventoryMovement), [
+                    {
+                        "product_id": line.product_id,
+                        "warehouse_id": line.warehouse_id,
+                        "movement_type": "in",
+                        "quantity": line.quantity,
+                        "reference_type": "sale",
+                        "reference_id": line.sale_id,
+                        "reason": f"取消销售订单 {line.sale_number}"
+                    }
+                    for line in lines
+                ])
+
+        db.commit()
+        return summarize_outcomes(status, outcomes)
+
     def get_by_customer(
         self, db: Session, *, customer_id: int, skip: int = 0, limit: int = 100
     ) -> List[Sale]:
@@ -228,25 +318,8 @@ class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for sale, customer in results:
-            # 将销售订单和客户信息合并为扁平结构
-            flattened_item = {
-                "id": sale.id,
-                "customer_id": sale.customer_id,
-                "user_id": sale.user_id,
-                "sale_number": sale.sale_number,
-                "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
-                "total_amount": float(sale.total_amount) if sale.total_amount else 0,
-                "status": sale.status,
-                "created_at": sale.created_at.isoformat() if sale.created_at else None,
-                "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
-                "customer_name": customer.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_sale(sale, customer) for sale, customer in results]
 
     def get_by_status(
         self, db: Session, *, status: str, skip: int = 0, limit: int = 100
@@ -273,25 +346,8 @@ class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for sale, customer in results:
-            # 将销售订单和客户信息合并为扁平结构
-            flattened_item = {
-                "id": sale.id,
-                "customer_id": sale.customer_id,
-                "user_id": sale.user_id,
-                "sale_number": sale.sale_number,
-                "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
-                "total_amount": float(sale.total_amount) if sale.total_amount else 0,
-                "status": sale.status,
-                "created_at": sale.created_at.isoformat() if sale.created_at else None,
-                "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
-                "customer_name": customer.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_sale(sale, customer) for sale, customer in results]
 
     def search_sales(
         self, db: Session, *, query: str, skip: int = 0, limit: int = 100
@@ -329,25 +385,8 @@ class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for sale, customer in results:
-            # 将销售订单和客户信息合并为扁平结构
-            flattened_item = {
-                "id": sale.id,
-                "customer_id": sale.customer_id,
-                "user_id": sale.user_id,
-                "sale_number": sale.sale_number,
-                "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
-                "total_amount": float(sale.total_amount) if sale.total_amount else 0,
-                "status": sale.status,
-                "created_at": sale.created_at.isoformat() if sale.created_at else None,
-                "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
-                "customer_name": customer.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_sale(sale, customer) for sale, customer in results]
 
     def get_daily_sales(
         self, db: Session, *, date: datetime, skip: int = 0, limit: int = 100
@@ -355,15 +394,16 @@ class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
         start_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
         end_date = date.replace(hour=23, minute=59, second=59, microsecond=999999)
 
+        sale = archive.tiered(db, Sale, since=start_date)
         return (
-            db.query(self.model)
+            db.query(sale)
             .filter(
                 and_(
-                    Sale.sale_date >= start_date,
-                    Sale.sale_date <= end_date
+                    sale.sale_date >= start_date,
+                    sale.sale_date <= end_date
                 )
             )
-            .order_by(Sale.created_at.desc())
+            .order_by(sale.created_at.desc())
             .offset(skip)
             .limit(limit)
             .all()
@@ -376,39 +416,23 @@ class SaleCRUD(CRUDBase[Sale, SaleCreate, SaleUpdate]):
         start_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
         end_date = date.replace(hour=23, minute=59, second=59, microsecond=999999)
         
+        sale = archive.tiered(db, Sale, since=start_date)
         results = (
-            db.query(Sale, Customer)
-            .join(Customer, Sale.customer_id == Customer.id)
+            db.query(sale, Customer)
+            .join(Customer, sale.customer_id == Customer.id)
             .filter(
                 and_(
-                    Sale.sale_date >= start_date,
-                    Sale.sale_date <= end_date
+                    sale.sale_date >= start_date,
+                    sale.sale_date <= end_date
                 )
             )
-            .order_by(Sale.created_at.desc())
+            .order_by(sale.created_at.desc())
             .offset(skip)
             .limit(limit)
             .all()
         )
-        
-        flattened_results = []
-        for sale, customer in results:
-            # 将销售订单和客户信息合并为扁平结构
-            flattened_item = {
-                "id": sale.id,
-                "customer_id": sale.customer_id,
-                "user_id": sale.user_id,
-                "sale_number": sale.sale_number,
-                "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
-                "total_amount": float(sale.total_amount) if sale.total_amount else 0,
-                "status": sale.status,
-                "created_at": sale.created_at.isoformat() if sale.created_at else None,
-                "updated_at": sale.updated_at.isoformat() if sale.updated_at else None,
-                "customer_name": customer.name
-            }
-            flattened_results.append(flattened_item)
-        
-        return flattened_results
+
+        return [_flatten_sale(sale, customer) for sale, customer in results]
 
 
 # Create a singleton instance
@@ -0,0 +1,147 @@
+from typing import List, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload
+from app.models.inventory import InventoryMovement
+from app.models.stock_transfer import StockTransfer, StockTransferItem
+from app.schemas.stock_transfer import StockTransferCreate
+from app.crud.base import CRUDBase
+from app.crud.document_number import TRANSFER_PREFIX, document_number
+from app.crud.inventory import inventory as inventory_crud
+from app.crud.product import product as product_crud
+from app.crud.warehouse import warehouse as warehouse_crud
+
+
+def _flatten_transfer(transfer: StockTransfer, *, with_items: bool = False) -> dict:
+    """将调拨单和仓库信息合并为扁平结构"""
+    flattened_item = {
+        "id": transfer.id,
+        "transfer_number": transfer.transfer_number,
+        "from_warehouse_id": transfer.from_warehouse_id,
+        "from_warehouse_name": transfer.from_warehouse.name if transfer.from_warehouse else None,
+        "to_warehouse_id": transfer.to_warehouse_id,
+        "to_warehouse_name": transfer.to_warehouse.name if transfer.to_warehouse else None,
+        "user_id": transfer.user_id,
+        "reason": transfer.reason,
+        "created_at": transfer.created_at.isoformat() if transfer.created_at else None
+    }
+    if with_items:
+        flattened_item["items"] = [
+            {
+                "id": item.id,
+                "transfer_id": item.transfer_id,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "product_name": item.product.name if item.product else None,
+                "product_sku": item.product.sku if item.product else None
+            }
+            for item in transfer.items
+        ]
+    return flattened_item
+
+
+class StockTransferCRUD(CRUDBase[StockTransfer, StockTransferCreate, dict]):
+    def post_transfer(
+        self, db: Session, *, transfer_in: StockTransferCreate, user_id: Optional[int]
+    ) -> StockTransfer:
+        """从调出仓库扣减、向调入仓库累加并写入调拨单和两条库存流水，不提交事务
+
+        商品总量和平均成本不变；调出仓库库存不足或仓库无效时抛出ValueError。
+        """
+        from_id, to_id = transfer_in.from_warehouse_id, transfer_in.to_warehouse_id
+        if from_id == to_id:
+            raise ValueError("调出仓库与调入仓库不能相同")
+        warehouse_crud.check_active(db, [from_id, to_id])
+
+        transfer_number = document_number.allocate(db, TRANSFER_PREFIX)
+
+        # 按商品汇总调拨数量，并按商品ID顺序扣减，保证并发事务加锁顺序一致
+        demand = {}
+        for item_data in transfer_in.items:
+            demand[item_data.product_id] = demand.get(item_data.product_id, 0) + item_data.quantity
+
+        for product_id in sorted(demand):
+            if not inventory_crud.deduct_stock(
+                db, product_id=product_id, quantity=demand[product_id], warehouse_id=from_id
+            ):
+                available = inventory_crud.location_quantity(
+                    db, product_id=product_id, warehouse_id=from_id
+                )
+                product = product_crud.get(db, id=product_id)
+                product_name = product.name if product else f"商品ID {product_id}"
+                raise ValueError(f"商品 '{product_name}' 在仓库 {from_id} 库存不足，需要 {demand[product_id]} 件，可用 {available} 件")
+        inventory_crud.shift_stock(
+            db, deltas={(product_id, to_id): quantity for product_id, quantity in demand.items()}
+        )
+
+        db_transfer = StockTransfer(
+            transfer_number=transfer_number,
+            from_warehouse_id=from_id,
+            to_warehouse_id=to_id,
+            user_id=user_id,
+            reason=transfer_in.reason
+        )
+        db.add(db_transfer)
+        db.flush()  # Get the ID without committing
+
+        reason = f"调拨单 {transfer_number}"
+        db.execute(insert(StockTransferItem), [
+            {"transfer_id": db_transfer.id, "product_id": item_data.product_id, "quantity": item_data.quantity}
+            for item_data in transfer_in.items
+        ])
+        db.execute(insert(InventoryMovement), [
+            {
+                "product_id": item_data.product_id,
+                "warehouse_id": warehouse_id,
+                "movement_type": movement_type,
+                "quantity": sign * item_data.quantity,
+                "reference_type": "transfer",
+                "reference_id": db_transfer.id,
+                "reason": reason
+            }
+            for item_data in transfer_in.items
+            for warehouse_id, movement_type, sign in ((from_id, "out", -1), (to_id, "in", 1))
+        ])
+        return db_transfer
+
+    def create_transfer(
+        self, db: Session, *, transfer_in: StockTransferCreate, user_id: Optional[int]
+    ) -> dict:
+        try:
+            db_transfer = self.post_transfer(db, transfer_in=transfer_in, user_id=user_id)
+        except ValueError:
+            db.rollback()
+            raise
+        db.commit()
+        return self.get_with_items_flattened(db, id=db_transfer.id)
+
+    def get_with_items_flattened(self, db: Session, *, id: int) -> Optional[dict]:
+        transfer = (
+            db.query(self.model)
+            .options(
+                joinedload(StockTransfer.from_warehouse),
+                joinedload(StockTransfer.to_warehouse),
+                joinedload(StockTransfer.items).joinedload(StockTransferItem.product)
+            )
+            .filter(StockTransfer.id == id)
+            .first()
+        )
+        return _flatten_transfer(transfer, with_items=True) if transfer else None
+
+    def get_multi_flattened(
+        self, db: Session, *, warehouse_id: Optional[int] = None, skip: int = 0, limit: int = 100
+    ) -> List[dict]:
+        """获取调拨单列表，可按调出或调入仓库筛选"""
+        query = db.query(self.model).options(
+            joinedload(StockTransfer.from_warehouse),
+            joinedload(StockTransfer.to_warehouse)
+        )
+        if warehouse_id:
+            query = query.filter(
+                (StockTransfer.from_warehouse_id == warehouse_id)
+                | (StockTransfer.to_warehouse_id == warehouse_id)
+            )
+        transfers = query.order_by(StockTransfer.created_at.desc()).offset(skip).limit(limit).all()
+        return [_flatten_transfer(transfer) for transfer in transfers]
+
+
+stock_transfer = StockTransferCRUD(StockTransfer)
@@ -0,0 +1,58 @@
+from sqlalchemy import String
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# 支持的统计周期
+TIME_BUCKETS = ("day", "week", "month", "quarter", "year")
+
+
+class time_bucket(FunctionElement):
+    """将时间列归入统计周期，结果为周期起始日期字符串 (YYYY-MM-DD)
+
+    SQLite 编译为 strftime/date，PostgreSQL 编译为 date_trunc。周为ISO周（周一开始）。
+    """
+    type = String()
+    name = "time_bucket"
+    inherit_cache = True
+    _traverse_internals = FunctionElement._traverse_internals + [
+        ("unit", InternalTraversal.dp_string)
+    ]
+
+    def __init__(self, unit: str, column):
+        if unit not in TIME_BUCKETS:
+            raise ValueError(f"不支持的统计周期: {unit}")
+        self.unit = unit
+        super().__init__(column)
+
+
+@compiles(time_bucket)
+def _compile_time_bucket(element, compiler, **kw):
+    raise CompileError(f"time_bucket 不支持数据库类型: {compiler.dialect.name}")
+
+
+@compiles(time_bucket, "sqlite")
+def _compile_time_bucket_sqlite(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    if element.unit == "day":
+        return f"date({column})"
+    if element.unit == "week":
+        # strftime('%w') 周日为0，回退到本周一
+        return (
+            f"date({column}, '-' || ((CAST(strftime('%w', {column}) AS INTEGER) + 6) % 7) || ' days')"
+        )
+    if element.unit == "month":
+        return f"strftime('%Y-%m-01', {column})"
+    if element.unit == "quarter":
+        return (
+            f"strftime('%Y-', {column}) || printf('%02d', "
+            f"((CAST(strftime('%m', {column}) AS INTEGER) - 1) / 3) * 3 + 1) || '-01'"
+        )
+    return f"strftime('%Y-01-01', {column})"
+
+
+@compiles(time_bucket, "postgresql")
+def _compile_time_bucket_postgresql(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"to_char(date_trunc('{element.unit}', {column}), 'YYYY-MM-DD')"
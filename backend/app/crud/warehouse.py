@@ -0,0 +1,54 @@
+from typing import Iterable, List, Optional
+from sqlalchemy.orm import Session
+from app.crud.base import CRUDBase
+from app.models.product import Product
+from app.models.warehouse import Warehouse, WarehouseStock
+from app.schemas.warehouse import WarehouseCreate, WarehouseUpdate
+
+
+class WarehouseCRUD(CRUDBase[Warehouse, WarehouseCreate, WarehouseUpdate]):
+    def get_by_code(self, db: Session, *, code: str) -> Optional[Warehouse]:
+        return db.query(Warehouse).filter(Warehouse.code == code).first()
+
+    def check_active(self, db: Session, warehouse_ids: Iterable[int]) -> None:
+        """校验仓库均存在且已启用，否则抛出ValueError"""
+        warehouse_ids = set(warehouse_ids)
+        active = {
+            warehouse_id for (warehouse_id,) in db.query(Warehouse.id).filter(
+                Warehouse.id.in_(warehouse_ids), Warehouse.is_active.is_(True)
+            )
+        }
+        missing = sorted(warehouse_ids - active)
+        if missing:
+            raise ValueError(f"仓库不存在或已停用: {', '.join(str(i) for i in missing)}")
+
+    def get_stock_flattened(
+        self, db: Session, *, warehouse_id: int, skip: int = 0, limit: int = 100
+    ) -> List[dict]:
+        """获取仓库内各商品的库存并扁平化商品字段"""
+        results = (
+            db.query(WarehouseStock, Product)
+            .join(Product, WarehouseStock.product_id == Product.id)
+            .filter(WarehouseStock.warehouse_id == warehouse_id)
+            .order_by(WarehouseStock.product_id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "id": stock.id,
+                "product_id": stock.product_id,
+                "warehouse_id": stock.warehouse_id,
+                "quantity": stock.quantity,
+                "last_updated": stock.last_updated.isoformat() if stock.last_updated else None,
+                "product_name": product.name,
+                "product_sku": product.sku,
+                "unit": product.unit,
+                "reorder_level": product.reorder_level
+            }
+            for stock, product in results
+        ]
+
+
+warehouse = WarehouseCRUD(Warehouse)
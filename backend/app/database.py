@@ -1,20 +1,165 @@
-from sqlalchemy import create_engine
+import sqlite3
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app import query_stats
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False}  # SQLite specific
-)
+# 同步驱动对应的异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """为每个新建的SQLite连接设置性能参数"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        # 负值表示以KiB为单位
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def _begin_before_savepoint(conn, name):
+    """pysqlite 在首条DML前才发出BEGIN，SAVEPOINT若先执行会自成事务并在RELEASE时提交，
+    这里在建立保存点前显式开启外层事务"""
+    dbapi_connection = conn.connection.dbapi_connection
+    if not dbapi_connection.in_transaction:
+        dbapi_connection.execute("BEGIN")
+
+
+def create_db_engine(database_url: str, *, is_async: bool = False):
+    """根据配置创建数据库引擎"""
+    url = make_url(database_url)
+    engine_kwargs = {"pool_pre_ping": settings.db_pool_pre_ping}
+
+    is_sqlite = url.get_backend_name() == "sqlite"
+    is_memory = is_sqlite and url.database in (None, "", ":memory:")
+
+    if is_sqlite and not is_async:
+        engine_kwargs["connect_args"] = {"check_same_thread": False}
+    if not is_memory:
+        engine_kwargs["pool_size"] = settings.db_pool_size
+        engine_kwargs["max_overflow"] = settings.db_max_overflow
+        if is_sqlite and is_async:
+            # aiosqlite默认使用NullPool，显式启用连接池
+            engine_kwargs["poolclass"] = AsyncAdaptedQueuePool
+
+    if is_async:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        db_engine = create_async_engine(database_url, **engine_kwargs)
+        sync_engine = db_engine.sync_engine
+    else:
+        db_engine = create_engine(database_url, **engine_kwargs)
+        sync_engine = db_engine
+
+    if is_sqlite and not is_async:
+        event.listen(sync_engine, "savepoint", _begin_before_savepoint)
+
+    if is_sqlite and settings.sqlite_tuning_enabled:
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+
+    if settings.sql_instrumentation_enabled:
+        event.listen(sync_engine, "before_cursor_execute", query_stats.before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", query_stats.after_cursor_execute)
+
+    return db_engine
+
+
+def refresh_sqlite_replica() -> None:
+    """将SQLite主库整体复制到副本文件，用于本地读写分离测试"""
+    if not settings.replica_database_url:
+        raise ValueError("未配置replica_database_url")
+    primary_url = make_url(settings.database_url)
+    replica_url = make_url(settings.replica_database_url)
+    if primary_url.get_backend_name() != "sqlite" or replica_url.get_backend_name() != "sqlite":
+        raise ValueError("仅支持SQLite主库和SQLite副本")
+
+    source = sqlite3.connect(primary_url.database)
+    target = sqlite3.connect(replica_url.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def get_async_database_url() -> str:
+    """获取异步数据库地址，未配置时根据database_url推导"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"不支持的异步数据库类型: {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+engine = create_db_engine(settings.database_url)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 只读副本，未配置时回落到主库
+replica_engine = (
+    create_db_engine(settings.replica_database_url)
+    if settings.replica_database_url else engine
+)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.async_db_enabled:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_db_engine(get_async_database_url(), is_async=True)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
+
+def _forbid_lazy_loads(orm_execute_state):
+    """严格加载模式：关系属性懒加载需要发出SQL时直接报错"""
+    # ORM UPDATE/DELETE 没有懒加载来源，读取 lazy_loaded_from 会报错
+    if not orm_execute_state.is_select:
+        return
+    if orm_execute_state.lazy_loaded_from is not None:
+        owner = orm_execute_state.lazy_loaded_from.class_.__name__
+        raise InvalidRequestError(
+            f"严格加载模式下禁止懒加载 ({owner}): {orm_execute_state.statement}"
+        )
+
+
+def enable_strict_loading() -> None:
+    """对所有会话启用严格加载，测试中用于发现N+1查询"""
+    if not event.contains(Session, "do_orm_execute", _forbid_lazy_loads):
+        event.listen(Session, "do_orm_execute", _forbid_lazy_loads)
+
+
+def disable_strict_loading() -> None:
+    if event.contains(Session, "do_orm_execute", _forbid_lazy_loads):
+        event.remove(Session, "do_orm_execute", _forbid_lazy_loads)
+
+
+if settings.db_strict_loading:
+    enable_strict_loading()
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
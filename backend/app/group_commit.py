@@ -0,0 +1,141 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.crud.document_number import SALE_PREFIX, document_number
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """组提交写入器
+
+    写请求排队交给单个写线程，写线程把一个时间窗口内到达的请求放进同一事务，
+    每个请求各自使用一个保存点：单个请求失败只回滚自己的保存点。
+    整批提交成功后才逐个返回结果，多次提交（及fsync）合并为一次。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        window_ms: float,
+        max_batch: int,
+        before_batch: Optional[Callable[[Session, int], None]] = None,
+        name: str = "group-commit"
+    ):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.before_batch = before_batch
+        self.name = name
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """处理完已排队的请求后停止写线程"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, work: Callable[[Session], Any]) -> Future:
+        """提交一个写操作，work(db) 在共享事务的保存点内执行，不应自行提交
+
+        返回的 Future 在整批提交后给出 work 的返回值，或 work/提交抛出的异常。
+        """
+        if not self.running:
+            raise RuntimeError(f"{self.name} 写线程未启动")
+        future = Future()
+        self._queue.put((work, future))
+        return future
+
+    def _collect(self, first) -> tuple:
+        """收集时间窗口内到达的请求，返回 (批次, 是否收到停止信号)"""
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            batch, stop = self._collect(job)
+            self._apply(batch)
+            if stop:
+                return
+
+    def _apply(self, batch) -> None:
+        batch = [(work, future) for work, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        done, failed = [], []
+        db = self.session_factory()
+        try:
+            if self.before_batch:
+                self.before_batch(db, len(batch))
+            for work, future in batch:
+                savepoint = db.begin_nested()
+                try:
+                    result = work(db)
+                    savepoint.commit()
+                except Exception as e:
+                    savepoint.rollback()
+                    failed.append((future, e))
+                    continue
+                done.append((future, result))
+            db.commit()
+        except Exception as e:
+            logger.exception("%s 批次提交失败", self.name)
+            db.rollback()
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            db.close()
+        # 失败的请求也在提交后返回，此时能读到同批其他请求写入的数据（如幂等记录）
+        for future, error in failed:
+            future.set_exception(error)
+        for future, result in done:
+            future.set_result(result)
+
+
+# 销售订单组提交写入器，sale_group_commit_enabled 时由 lifespan 启动
+sale_writer = GroupCommitWriter(
+    SessionLocal,
+    window_ms=settings.group_commit_window_ms,
+    max_batch=settings.group_commit_max_batch,
+    # 事务开始前预留单据号，批内分配不再访问数据库
+    before_batch=lambda db, count: document_number.reserve(db, SALE_PREFIX, count),
+    name="sale-group-commit"
+)
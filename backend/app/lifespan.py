@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from app.config import settings
+from app.database import engine, replica_engine, async_engine, SessionLocal
+from app.group_commit import sale_writer
+from app.migrations import upgrade_database
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """记录启动各阶段耗时"""
+
+    def __init__(self):
+        self.phases: List[Dict[str, float]] = []
+        self.total_ms = 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.phases.append({"phase": name, "ms": round(elapsed_ms, 2)})
+            logger.info("startup phase %s: %.2f ms", name, elapsed_ms)
+
+    def as_dict(self) -> dict:
+        return {"total_ms": round(self.total_ms, 2), "phases": self.phases}
+
+
+def warmup_pool(db_engine, connections: int) -> None:
+    """预先建立连接并归还连接池，首批请求无需再建连"""
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = db_engine.connect()
+            conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+async def warmup_async_pool(db_engine, connections: int) -> None:
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = await db_engine.connect()
+            await conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        for conn in opened:
+            await conn.close()
+
+
+def prime_statement_cache() -> None:
+    """完成ORM映射配置，并执行一次热点查询以填充编译缓存"""
+    from app.crud import customer, inventory, product
+
+    configure_mappers()
+    db = SessionLocal()
+    try:
+        product.get(db, id=0)
+        product.get_by_sku(db, sku="")
+        product.get_by_name(db, name="")
+        customer.get(db, id=0)
+        customer.get_by_name(db, name="")
+        inventory.get_by_product(db, product_id=0)
+    finally:
+        db.close()
+
+
+def revalue_avg_costs() -> dict:
+    from app.crud import cost_revaluation
+
+    db = SessionLocal()
+    try:
+        return cost_revaluation.revalue(db)
+    finally:
+        db.close()
+
+
+def snapshot_inventory() -> dict:
+    from app.crud import inventory_snapshot
+
+    db = SessionLocal()
+    try:
+        return inventory_snapshot.take_snapshot(db)
+    finally:
+        db.close()
+
+
+def archive_history() -> dict:
+    from app.crud import archive
+    from app.crud.archive import archive_cutoff
+
+    db = SessionLocal()
+    try:
+        return archive.archive_closed_periods(
+            db, before=archive_cutoff(settings.archive_retention_months)
+        )
+    finally:
+        db.close()
+
+
+async def run_rollup_sync(interval_ms: float) -> None:
+    """定期批量同步汇总行数量，失败的商品留待下一周期"""
+    from app.crud.inventory import rollup_sync
+
+    while True:
+        await asyncio.sleep(interval_ms / 1000)
+        if not rollup_sync.pending:
+            continue
+        try:
+            await run_in_threadpool(rollup_sync.flush, engine)
+        except Exception:
+            logger.exception("inventory rollup sync failed")
+
+
+async def run_daily(hour: int, job: Callable[[], dict], name: str) -> None:
+    """每天在指定整点执行任务，失败只记录日志，次日照常执行"""
+    while True:
+        now = datetime.now()
+        next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        try:
+            report = await run_in_threadpool(job)
+            logger.info("%s: %s", name, report)
+        except Exception:
+            logger.exception("%s failed", name)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    report = StartupReport()
+    started = time.perf_counter()
+
+    if settings.run_migrations_on_startup:
+        # 默认由部署流程执行 alembic upgrade，避免多个worker并发执行DDL
+        with report.phase("migrations"):
+            upgrade_database()
+
+    # 连接池之外的连接会被直接关闭，预热数量不超过池大小
+    connections = min(settings.db_warmup_connections, settings.db_pool_size)
+    if connections > 0:
+        with report.phase("pool_warmup"):
+            warmup_pool(engine, connections)
+        if replica_engine is not engine:
+            with report.phase("replica_pool_warmup"):
+                warmup_pool(replica_engine, connections)
+        if async_engine is not None:
+            with report.phase("async_pool_warmup"):
+                await warmup_async_pool(async_engine, connections)
+
+    with report.phase("statement_cache"):
+        prime_statement_cache()
+
+    if settings.sale_group_commit_enabled:
+        with report.phase("group_commit_writer"):
+            sale_writer.start()
+
+    background_tasks = []
+    if settings.inventory_rollup_interval_ms > 0:
+        from app.crud.inventory import rollup_sync
+
+        rollup_sync.deferred = True
+        background_tasks.append(asyncio.create_task(run_rollup_sync(settings.inventory_rollup_interval_ms)))
+    if settings.avg_cost_revaluation_hour is not None:
+        background_tasks.append(asyncio.create_task(
+            run_daily(settings.avg_cost_revaluation_hour, revalue_avg_costs, "avg cost revaluation")
+        ))
+    if settings.inventory_snapshot_hour is not None:
+        background_tasks.append(asyncio.create_task(
+            run_daily(settings.inventory_snapshot_hour, snapshot_inventory, "inventory snapshot")
+        ))
+    if settings.archive_hour is not None:
+        background_tasks.append(asyncio.create_task(
+            run_daily(settings.archive_hour, archive_history, "history archive")
+        ))
+
+    report.total_ms = (time.perf_counter() - started) * 1000
+    logger.info("startup completed in %.2f ms", report.total_ms)
+    app.state.startup_report = report.as_dict()
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    # 先停止写线程，保证已排队的订单提交完成
+    sale_writer.stop()
+    if settings.inventory_rollup_interval_ms > 0:
+        from app.crud.inventory import rollup_sync
+
+        rollup_sync.deferred = False
+        rollup_sync.flush(engine)
+    if async_engine is not None:
+        await async_engine.dispose()
+    if replica_engine is not engine:
+        replica_engine.dispose()
+    engine.dispose()
@@ -1,15 +1,19 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.api import auth, suppliers, customers, products, purchases, sales, inventory, analytics
+import logging
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
+from app.config import settings
+from app.lifespan import lifespan
+from app.query_stats import start_request_stats
+from app.api import auth, suppliers, customers, products, purchases, sales, inventory, analytics, warehouses, transfers
 
 app = FastAPI(
     title="库存管理系统 API",
     description="进销存管理系统后端API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -21,6 +25,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+logger = logging.getLogger("app.request")
+
+if settings.sql_instrumentation_enabled:
+    @app.middleware("http")
+    async def record_query_stats(request: Request, call_next):
+        stats = start_request_stats()
+        response = await call_next(request)
+        summary = stats.summary()
+        response.headers["X-DB-Query-Count"] = str(summary["query_count"])
+        response.headers["X-DB-Time-Ms"] = str(summary["db_time_ms"])
+        response.headers["X-DB-Row-Count"] = str(summary["row_count"])
+        response.headers["X-DB-Slowest-Ms"] = str(summary["slowest_ms"])
+        if summary["slowest_rows"] is not None:
+            response.headers["X-DB-Slowest-Rows"] = str(summary["slowest_rows"])
+        logger.info(
+            "%s %s queries=%d rows=%d db_time=%.2fms slowest=%.2fms rows=%s %s",
+            request.method, request.url.path, summary["query_count"], summary["row_count"],
+            summary["db_time_ms"], summary["slowest_ms"], summary["slowest_rows"],
+            summary["slowest_statement"] or ""
+        )
+        return response
+
+@app.exception_handler(StaleDataError)
+async def version_conflict_handler(request: Request, exc: StaleDataError):
+    """乐观锁冲突：数据在读取后已被其他请求修改"""
+    logger.info("%s %s version conflict: %s", request.method, request.url.path, exc)
+    return JSONResponse(status_code=409, content={"detail": "数据已被其他请求修改，请刷新后重试"})
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["认证"])
 app.include_router(suppliers.router, prefix="/api/suppliers", tags=["供应商"])
@@ -30,6 +62,8 @@ app.include_router(purchases.router, prefix="/api/purchases", tags=["采购"])
 app.include_router(sales.router, prefix="/api/sales", tags=["销售"])
 app.include_router(inventory.router, prefix="/api/inventory", tags=["库存"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["统计分析"])
+app.include_router(warehouses.router, prefix="/api/warehouses", tags=["仓库"])
+app.include_router(transfers.router, prefix="/api/transfers", tags=["调拨"])
 
 @app.get("/")
 async def root():
@@ -37,4 +71,7 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "startup": getattr(app.state, "startup_report", None)
+    }
\ No newline at end of file
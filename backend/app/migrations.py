@@ -0,0 +1,40 @@
+import os
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app.config import settings
+from app.database import create_db_engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+
+# 与历史 create_all 建出的表结构一致的迁移版本
+BASELINE_REVISION = "0001"
+
+
+def get_alembic_config(database_url: Optional[str] = None) -> Config:
+    """构建Alembic配置"""
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", database_url or settings.database_url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_database(database_url: Optional[str] = None, revision: str = "head") -> None:
+    """将数据库升级到指定迁移版本
+
+    由 create_all 创建、尚无 alembic_version 表的旧数据库会先标记为基线版本再升级。
+    """
+    config = get_alembic_config(database_url)
+    engine = create_db_engine(database_url or settings.database_url)
+    try:
+        tables = set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+
+    if tables and "alembic_version" not in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
@@ -6,6 +6,13 @@ from .product import Product
 from .inventory import Inventory, InventoryMovement
 from .purchase import Purchase, PurchaseItem
 from .sale import Sale, SaleItem
+from .idempotency import IdempotencyKey
+from .document_sequence import DocumentSequence
+from .inventory_snapshot import InventorySnapshot
+from .archive import ArchiveBoundary
+from .inventory_counter import InventoryCounter
+from .warehouse import Warehouse, WarehouseStock
+from .stock_transfer import StockTransfer, StockTransferItem
 
 __all__ = [
     "Base",
@@ -18,5 +25,14 @@ __all__ = [
     "Purchase",
     "PurchaseItem",
     "Sale",
-    "SaleItem"
+    "SaleItem",
+    "IdempotencyKey",
+    "DocumentSequence",
+    "InventorySnapshot",
+    "ArchiveBoundary",
+    "InventoryCounter",
+    "Warehouse",
+    "WarehouseStock",
+    "StockTransfer",
+    "StockTransferItem"
 ]
\ No newline at end of file
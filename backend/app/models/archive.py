@@ -0,0 +1,38 @@
+from sqlalchemy import Column, DateTime, Index, String, Table
+from app.database import Base
+from app.models.inventory import InventoryMovement
+from app.models.purchase import Purchase, PurchaseItem
+from app.models.sale import Sale, SaleItem
+
+
+def archive_table(table: Table, *indexes) -> Table:
+    """创建与 table 列结构相同的归档表 <表名>_archive
+
+    归档行保留原主键，不带外键和默认值；indexes 为需要建立索引的列组合。
+    """
+    name = f"{table.name}_archive"
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in table.columns
+    ]
+    return Table(
+        name, Base.metadata, *columns,
+        *[Index(f"ix_{name}_{'_'.join(columns)}", *columns) for columns in indexes]
+    )
+
+
+inventory_movements_archive = archive_table(
+    InventoryMovement.__table__, ("created_at",), ("product_id", "created_at")
+)
+sales_archive = archive_table(Sale.__table__, ("created_at",), ("sale_date",), ("customer_id",))
+sale_items_archive = archive_table(SaleItem.__table__, ("sale_id",), ("product_id",))
+purchases_archive = archive_table(Purchase.__table__, ("created_at",), ("purchase_date",), ("supplier_id",))
+purchase_items_archive = archive_table(PurchaseItem.__table__, ("purchase_id",), ("product_id",))
+
+
+class ArchiveBoundary(Base):
+    """各数据族已归档的时间边界：早于 archived_before 的已关闭数据可能位于归档表"""
+    __tablename__ = "archive_boundaries"
+
+    family = Column(String(50), primary_key=True)  # inventory_movements / sales / purchases
+    archived_before = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+class DocumentSequence(Base):
+    """单据号序列：每种前缀每天一行，next_value 为下一个未分配的号码"""
+    __tablename__ = "document_sequences"
+
+    prefix = Column(String(10), primary_key=True)  # SO / PO
+    day = Column(String(8), primary_key=True)  # YYYYMMDD
+    next_value = Column(Integer, nullable=False, default=1)
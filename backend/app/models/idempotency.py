@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class IdempotencyKey(Base):
+    """幂等键：保存首次请求的响应，过期后清理"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(50), nullable=False)  # 接口标识，如 sales / purchases
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
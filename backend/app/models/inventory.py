@@ -1,31 +1,53 @@
-from sqlalchemy import Column, Integer, DateTime, Numeric, ForeignKey, String
+from sqlalchemy import Boolean, Column, Integer, DateTime, Numeric, ForeignKey, String, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Inventory(Base):
     __tablename__ = "inventory"
+    __table_args__ = (
+        # 库存不足/缺货列表按余量范围扫描
+        Index("ix_inventory_shortage_margin_quantity", "shortage_margin", "quantity"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, unique=True, index=True)
     quantity = Column(Integer, default=0)
     avg_cost = Column(Numeric(10, 2), default=0)
-    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
+    # 乐观锁版本号，ORM更新时校验并递增
+    version_id = Column(Integer, nullable=False, server_default="1")
+    # 本行已计入 inventory_counters 的库存价值与状态，为空表示尚未计入
+    counted_value = Column(Numeric(16, 4))
+    counted_low = Column(Boolean)
+    counted_out = Column(Boolean)
+    # 库存余量：数量减预警值（预警值为空按0计），<=0 即库存不足；随汇总计数器在提交前同步
+    shortage_margin = Column(Integer)
+
+    __mapper_args__ = {"version_id_col": version_id}
     
     # Relationships
     product = relationship("Product", backref="inventory")
 
 class InventoryMovement(Base):
     __tablename__ = "inventory_movements"
+    __table_args__ = (
+        Index("ix_inventory_movements_product_id_created_at", "product_id", "created_at"),
+        Index("ix_inventory_movements_type_created_at", "movement_type", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     movement_type = Column(String(20), nullable=False)  # 'in', 'out', 'adjustment'
     quantity = Column(Integer, nullable=False)
-    reference_type = Column(String(20))  # 'purchase', 'sale', 'adjustment'
+    reference_type = Column(String(20))  # 'purchase', 'sale', 'adjustment', 'transfer'
     reference_id = Column(Integer)
     reason = Column(String(255))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 手工调整指定的平均成本，未指定时为空；平均成本重算时按该值重放
+    unit_cost = Column(Numeric(10, 2))
+    # 出入库仓库，默认仓库ID为1
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False, server_default="1", index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Relationships
     product = relationship("Product", backref="movements")
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric
+from sqlalchemy.sql import func
+from app.database import Base
+
+class InventoryCounter(Base):
+    """库存汇总计数器（分槽，各行之和为汇总值）
+
+    库存写入在同一事务中按增量维护，库存汇总接口直接读取，无需扫描库存表。
+    id 为槽号：商品的增量累加到 商品ID % 槽数 对应的行，并发写入分散到多行。
+    """
+    __tablename__ = "inventory_counters"
+
+    id = Column(Integer, primary_key=True)
+    total_items = Column(Integer, nullable=False, default=0)
+    low_stock_items = Column(Integer, nullable=False, default=0)
+    out_of_stock_items = Column(Integer, nullable=False, default=0)
+    total_value = Column(Numeric(16, 4), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class InventorySnapshot(Base):
+    """库存快照：检查点时刻各商品的库存数量
+
+    movement_id 为快照包含的最后一条库存变动记录ID，之后的变动不计入 quantity。
+    """
+    __tablename__ = "inventory_snapshots"
+    __table_args__ = (
+        Index("ix_inventory_snapshots_product_id_snapshot_at", "product_id", "snapshot_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    movement_id = Column(Integer, nullable=False, index=True)
+    snapshot_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
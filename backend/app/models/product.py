@@ -14,4 +14,8 @@ class Product(Base):
     selling_price = Column(Numeric(10, 2), default=0)
     reorder_level = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 乐观锁版本号，ORM更新时校验并递增
+    version_id = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version_id}
\ No newline at end of file
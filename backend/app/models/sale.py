@@ -1,20 +1,29 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        Index("ix_sales_status_created_at", "status", "created_at"),
+        Index("ix_sales_customer_id_created_at", "customer_id", "created_at"),
+        Index("ix_sales_status_sale_date", "status", "sale_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     sale_number = Column(String(50), unique=True, nullable=False, index=True)
-    sale_date = Column(DateTime(timezone=True), server_default=func.now())
+    sale_date = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     total_amount = Column(Numeric(12, 2), default=0)
     status = Column(String(20), default="pending")  # pending, completed, cancelled
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # 乐观锁版本号，ORM更新时校验并递增
+    version_id = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version_id}
     
     # Relationships
     customer = relationship("Customer", backref="sales")
@@ -25,11 +34,13 @@ class SaleItem(Base):
     __tablename__ = "sale_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Numeric(10, 2), nullable=False)
     total_price = Column(Numeric(12, 2), nullable=False)
+    # 出入库仓库，默认仓库ID为1
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False, server_default="1")
     
     # Relationships
     sale = relationship("Sale", back_populates="items")
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class StockTransfer(Base):
+    """仓库间调拨单，创建即过账"""
+    __tablename__ = "stock_transfers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    transfer_number = Column(String(50), unique=True, nullable=False, index=True)
+    from_warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False, index=True)
+    to_warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    reason = Column(String(255))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # Relationships
+    from_warehouse = relationship("Warehouse", foreign_keys=[from_warehouse_id])
+    to_warehouse = relationship("Warehouse", foreign_keys=[to_warehouse_id])
+    items = relationship("StockTransferItem", back_populates="transfer", cascade="all, delete-orphan")
+
+class StockTransferItem(Base):
+    __tablename__ = "stock_transfer_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    transfer_id = Column(Integer, ForeignKey("stock_transfers.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+    quantity = Column(Integer, nullable=False)
+
+    # Relationships
+    transfer = relationship("StockTransfer", back_populates="items")
+    product = relationship("Product")
@@ -0,0 +1,35 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+# 迁移时创建的默认仓库，未指定仓库的订单行和调整记入此仓库
+DEFAULT_WAREHOUSE_ID = 1
+
+class Warehouse(Base):
+    __tablename__ = "warehouses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String(20), unique=True, nullable=False, index=True)
+    name = Column(String(100), nullable=False)
+    address = Column(String(255))
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class WarehouseStock(Base):
+    """各仓库的库存数量；inventory 表为按商品汇总的总量及平均成本"""
+    __tablename__ = "warehouse_stock"
+    __table_args__ = (
+        UniqueConstraint("product_id", "warehouse_id", name="uq_warehouse_stock_product_warehouse"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False, index=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    product = relationship("Product")
+    warehouse = relationship("Warehouse")
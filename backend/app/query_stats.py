@@ -0,0 +1,101 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.slow_query")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """将SQL归一化为指纹：字面量替换为?，IN列表折叠，空白压缩"""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """单个请求内的SQL执行统计
+
+    行数取驱动报告的 cursor.rowcount：写语句为影响行数，驱动未报告的
+    （如SQLite的SELECT返回-1）不计入。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.total_rows = 0
+        self.slowest_ms = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.slowest_rows: Optional[int] = None
+
+    def record(self, statement_fingerprint: str, duration_ms: float, rowcount: int) -> None:
+        rows = rowcount if rowcount is not None and rowcount >= 0 else None
+        self.count += 1
+        self.total_ms += duration_ms
+        self.total_rows += rows or 0
+        if duration_ms > self.slowest_ms:
+            self.slowest_ms = duration_ms
+            self.slowest_statement = statement_fingerprint
+            self.slowest_rows = rows
+
+    def summary(self) -> dict:
+        return {
+            "query_count": self.count,
+            "db_time_ms": round(self.total_ms, 2),
+            "row_count": self.total_rows,
+            "slowest_ms": round(self.slowest_ms, 2),
+            "slowest_rows": self.slowest_rows,
+            "slowest_statement": self.slowest_statement
+        }
+
+
+# 同步路由在线程池中运行时会复制上下文，QueryStats对象本身在请求内共享
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_request_stats() -> QueryStats:
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def get_request_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 开始时间记在本次执行的上下文上，语句失败时随上下文一起丢弃
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start_time", None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    rowcount = cursor.rowcount
+
+    stats = _current_stats.get()
+    if stats is None and duration_ms < settings.slow_query_threshold_ms:
+        return
+
+    statement_fingerprint = fingerprint(statement)
+    if stats is not None:
+        stats.record(statement_fingerprint, duration_ms, rowcount)
+    if duration_ms >= settings.slow_query_threshold_ms:
+        slow_query_logger.warning(
+            "slow query %.2f ms rows=%s: %s", duration_ms, rowcount, statement_fingerprint
+        )
@@ -3,8 +3,10 @@ from .supplier import Supplier, SupplierCreate, SupplierUpdate
 from .customer import Customer, CustomerCreate, CustomerUpdate
 from .product import Product, ProductCreate, ProductUpdate
 from .inventory import Inventory, InventoryMovement
-from .purchase import Purchase, PurchaseCreate, PurchaseUpdate, PurchaseItem, PurchaseItemCreate
-from .sale import Sale, SaleCreate, SaleUpdate, SaleItem, SaleItemCreate
+from .purchase import Purchase, PurchaseCreate, PurchaseUpdate, PurchaseItem, PurchaseItemCreate, PurchaseStatusBulkUpdate
+from .sale import Sale, SaleCreate, SaleUpdate, SaleItem, SaleItemCreate, SaleStatusBulkUpdate
+from .warehouse import Warehouse, WarehouseCreate, WarehouseUpdate
+from .stock_transfer import StockTransfer, StockTransferCreate, StockTransferItem, StockTransferItemCreate
 
 __all__ = [
     "User", "UserCreate", "UserUpdate", "Token",
@@ -12,6 +14,8 @@ __all__ = [
     "Customer", "CustomerCreate", "CustomerUpdate",
     "Product", "ProductCreate", "ProductUpdate",
     "Inventory", "InventoryMovement",
-    "Purchase", "PurchaseCreate", "PurchaseUpdate", "PurchaseItem", "PurchaseItemCreate",
-    "Sale", "SaleCreate", "SaleUpdate", "SaleItem", "SaleItemCreate"
+    "Purchase", "PurchaseCreate", "PurchaseUpdate", "PurchaseItem", "PurchaseItemCreate", "PurchaseStatusBulkUpdate",
+    "Sale", "SaleCreate", "SaleUpdate", "SaleItem", "SaleItemCreate", "SaleStatusBulkUpdate",
+    "Warehouse", "WarehouseCreate", "WarehouseUpdate",
+    "StockTransfer", "StockTransferCreate", "StockTransferItem", "StockTransferItemCreate"
 ]
\ No newline at end of file
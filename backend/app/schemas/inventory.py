@@ -55,7 +55,7 @@ class InventoryWithProduct(InventoryBase):
 class InventoryMovementBase(BaseModel):
     movement_type: str = Field(..., max_length=20, description="移动类型(in/out/adjustment)")
     quantity: int = Field(..., description="移动数量")
-    reference_type: Optional[str] = Field(None, max_length=20, description="关联类型(purchase/sale/adjustment)")
+    reference_type: Optional[str] = Field(None, max_length=20, description="关联类型(purchase/sale/adjustment/transfer)")
     reference_id: Optional[int] = Field(None, description="关联ID")
     reason: Optional[str] = Field(None, max_length=255, description="原因")
 
@@ -67,6 +67,7 @@ class InventoryMovementCreate(InventoryMovementBase):
 class InventoryMovement(InventoryMovementBase):
     id: int
     product_id: int
+    warehouse_id: int
     created_at: datetime
 
     class Config:
@@ -36,6 +36,7 @@ class ProductUpdate(BaseModel):
     cost_price: Optional[Decimal] = Field(None, ge=0, description="成本价")
     selling_price: Optional[Decimal] = Field(None, ge=0, description="销售价")
     reorder_level: Optional[int] = Field(None, ge=0, description="库存预警值")
+    version_id: Optional[int] = Field(None, description="读取时的版本号，提供时校验数据是否已被修改")
 
     @validator('selling_price')
     def selling_price_must_be_greater_than_cost(cls, v, values):
@@ -55,6 +56,7 @@ class Product(ProductBase):
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version_id: int
 
     class Config:
         from_attributes = True
@@ -8,6 +8,7 @@ class PurchaseItemBase(BaseModel):
     product_id: int = Field(..., description="产品ID")
     quantity: int = Field(..., gt=0, description="数量")
     unit_price: Decimal = Field(..., gt=0, description="单价")
+    warehouse_id: Optional[int] = Field(None, description="仓库ID，为空时使用默认仓库")
 
 
 class PurchaseItemCreate(PurchaseItemBase):
@@ -37,6 +38,12 @@ class PurchaseUpdate(BaseModel):
     supplier_id: Optional[int] = Field(None, description="供应商ID")
     total_amount: Optional[Decimal] = Field(None, description="总金额")
     status: Optional[str] = Field(None, max_length=20, description="状态")
+    version_id: Optional[int] = Field(None, description="读取时的版本号，提供时校验数据是否已被修改")
+
+
+class PurchaseStatusBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=5000, description="采购订单ID列表")
+    status: str = Field(..., max_length=20, description="目标状态")
 
 
 class Purchase(PurchaseBase):
@@ -46,6 +53,7 @@ class Purchase(PurchaseBase):
     purchase_date: datetime
     created_at: datetime
     updated_at: datetime
+    version_id: int
     items: List[PurchaseItem] = []
 
     class Config:
@@ -8,6 +8,7 @@ class SaleItemBase(BaseModel):
     product_id: int = Field(..., description="产品ID")
     quantity: int = Field(..., gt=0, description="数量")
     unit_price: Decimal = Field(..., gt=0, description="单价")
+    warehouse_id: Optional[int] = Field(None, description="仓库ID，为空时使用默认仓库")
 
 
 class SaleItemCreate(SaleItemBase):
@@ -37,6 +38,12 @@ class SaleUpdate(BaseModel):
     customer_id: Optional[int] = Field(None, description="客户ID")
     total_amount: Optional[Decimal] = Field(None, description="总金额")
     status: Optional[str] = Field(None, max_length=20, description="状态")
+    version_id: Optional[int] = Field(None, description="读取时的版本号，提供时校验数据是否已被修改")
+
+
+class SaleStatusBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=5000, description="销售订单ID列表")
+    status: str = Field(..., max_length=20, description="目标状态")
 
 
 class Sale(SaleBase):
@@ -46,6 +53,7 @@ class Sale(SaleBase):
     sale_date: datetime
     created_at: datetime
     updated_at: datetime
+    version_id: int
     items: List[SaleItem] = []
 
     class Config:
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class StockTransferItemBase(BaseModel):
+    product_id: int = Field(..., description="产品ID")
+    quantity: int = Field(..., gt=0, description="数量")
+
+
+class StockTransferItemCreate(StockTransferItemBase):
+    pass
+
+
+class StockTransferItem(StockTransferItemBase):
+    id: int
+    transfer_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class StockTransferBase(BaseModel):
+    from_warehouse_id: int = Field(..., description="调出仓库ID")
+    to_warehouse_id: int = Field(..., description="调入仓库ID")
+    reason: Optional[str] = Field(None, max_length=255, description="调拨原因")
+
+
+class StockTransferCreate(StockTransferBase):
+    items: List[StockTransferItemCreate] = Field(..., min_length=1, description="调拨商品列表")
+
+
+class StockTransfer(StockTransferBase):
+    id: int
+    transfer_number: str
+    user_id: Optional[int] = None
+    created_at: datetime
+    items: List[StockTransferItem] = []
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class WarehouseBase(BaseModel):
+    code: str = Field(..., min_length=1, max_length=20, description="仓库编码")
+    name: str = Field(..., min_length=1, max_length=100, description="仓库名称")
+    address: Optional[str] = Field(None, max_length=255, description="地址")
+    is_active: bool = Field(default=True, description="是否启用")
+
+
+class WarehouseCreate(WarehouseBase):
+    pass
+
+
+class WarehouseUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=100, description="仓库名称")
+    address: Optional[str] = Field(None, max_length=255, description="地址")
+    is_active: Optional[bool] = Field(None, description="是否启用")
+
+
+class Warehouse(WarehouseBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.inventory import Inventory
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+# 会话中记录本事务改动过库存的商品ID
+_TOUCHED_KEY = "stock_alert_touched"
+
+# 库存状态：缺货 / 低于预警值 / 正常
+OUT_OF_STOCK, LOW_STOCK, OK = "out_of_stock", "low_stock", "ok"
+
+_LEVELS_BY_PRODUCTS = (
+    select(
+        Inventory.product_id, Inventory.quantity,
+        Product.reorder_level, Product.name, Product.sku
+    )
+    .join(Product, Inventory.product_id == Product.id)
+    .where(Inventory.product_id.in_(bindparam("product_ids", expanding=True)))
+)
+
+
+def stock_level(quantity: int, reorder_level: int) -> str:
+    """与库存预警列表一致：数量为0为缺货，不超过预警值为库存不足"""
+    if quantity <= 0:
+        return OUT_OF_STOCK
+    if quantity <= reorder_level:
+        return LOW_STOCK
+    return OK
+
+
+class StockAlertMonitor:
+    """写入后按商品增量检查库存预警，跨越阈值时生成告警
+
+    库存写入方法通过 touch() 在会话中登记商品ID，事务提交后只查询这些商品的
+    当前库存与预警值，与进程内记录的上次状态比较，状态变化时写入告警队列。
+    回滚的事务不产生告警。队列为进程内有界队列，多个worker各自独立；
+    进程启动后某商品首次被检查时视上次状态为正常。
+
+    告警编号只在进程内递增，进程重启后从1重新编号：客户端提交的 after 大于当前
+    最大编号时视为服务已重启，从头返回新进程的告警，避免一直收不到告警。
+    """
+
+    def __init__(self, max_alerts: int = 1000):
+        self._alerts: deque = deque(maxlen=max_alerts)
+        self._levels: Dict[int, str] = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+        # 正在长轮询的请求：(事件循环, asyncio.Event)，由提交线程通过 call_soon_threadsafe 唤醒
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def touch(self, db: Session, product_ids: Iterable[int]) -> None:
+        """登记本事务改动过库存的商品，提交后检查"""
+        db.info.setdefault(_TOUCHED_KEY, set()).update(product_ids)
+
+    def evaluate(self, bind, product_ids: Iterable[int]) -> List[dict]:
+        """在独立连接上读取这些商品的库存状态，返回新产生的告警"""
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return []
+        with bind.connect() as conn:
+            rows = conn.execute(_LEVELS_BY_PRODUCTS, {"product_ids": product_ids}).all()
+
+        created = []
+        with self._lock:
+            for row in rows:
+                quantity = row.quantity or 0
+                reorder_level = row.reorder_level or 0
+                level = stock_level(quantity, reorder_level)
+                previous = self._levels.get(row.product_id, OK)
+                self._levels[row.product_id] = level
+                if level == previous:
+                    continue
+                self._sequence += 1
+                alert = {
+                    "id": self._sequence,
+                    "product_id": row.product_id,
+                    "product_name": row.name,
+                    "product_sku": row.sku,
+                    "level": level,
+                    "previous_level": previous,
+                    "quantity": quantity,
+                    "reorder_level": reorder_level,
+                    "created_at": datetime.now().isoformat()
+                }
+                self._alerts.append(alert)
+                created.append(alert)
+            if created:
+                for loop, waiter in self._waiters:
+                    try:
+                        loop.call_soon_threadsafe(waiter.set)
+                    except RuntimeError:
+                        # 事件循环已关闭
+                        pass
+        return created
+
+    def list_alerts(self, *, after: int = 0, limit: int = 100) -> List[dict]:
+        """返回编号大于 after 的告警；after 超过当前最大编号时（进程已重启）从头返回"""
+        with self._lock:
+            if after > self._sequence:
+                after = 0
+            return [alert for alert in self._alerts if alert["id"] > after][:limit]
+
+    async def wait_alerts(self, *, after: int = 0, limit: int = 100, wait: float = 0) -> List[dict]:
+        """与 list_alerts 相同，暂无新告警时在事件循环上最多等待 wait 秒，不占用线程池线程"""
+        alerts = self.list_alerts(after=after, limit=limit)
+        if alerts or wait <= 0:
+            return alerts
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            # 登记与检查在同一把锁内，不会错过两者之间产生的告警
+            if self._sequence <= after:
+                self._waiters.add(waiter)
+            else:
+                waiter = None
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter[1].wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    self._waiters.discard(waiter)
+        return self.list_alerts(after=after, limit=limit)
+
+    @property
+    def last_id(self) -> int:
+        return self._sequence
+
+
+stock_alerts = StockAlertMonitor(max_alerts=settings.stock_alert_queue_size)
+
+
+def _evaluate_after_commit(session: Session) -> None:
+    product_ids = session.info.pop(_TOUCHED_KEY, None)
+    if not product_ids:
+        return
+    try:
+        stock_alerts.evaluate(session.get_bind(), product_ids)
+    except Exception:
+        # 告警失败不影响已提交的写入
+        logger.exception("stock alert evaluation failed")
+
+
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_TOUCHED_KEY, None)
+
+
+def enable_stock_alerts() -> None:
+    """在所有会话上注册提交/回滚事件"""
+    if not event.contains(Session, "after_commit", _evaluate_after_commit):
+        event.listen(Session, "after_commit", _evaluate_after_commit)
+        event.listen(Session, "after_rollback", _discard_after_rollback)
+
+
+def disable_stock_alerts() -> None:
+    if event.contains(Session, "after_commit", _evaluate_after_commit):
+        event.remove(Session, "after_commit", _evaluate_after_commit)
+        event.remove(Session, "after_rollback", _discard_after_rollback)
+
+
+if settings.stock_alerts_enabled:
+    enable_stock_alerts()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+"""
+把早于保留期的库存变动及已关闭的销售/采购订单移入归档表（可配置为定时任务）
+用法: python archive_data.py [--months N]
+  --months N  热表保留最近N个整月，默认取 ARCHIVE_RETENTION_MONTHS；截止时间不晚于今年1月1日
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import settings
+from app.crud import archive
+from app.crud.archive import archive_cutoff
+from app.database import SessionLocal
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="归档历史数据")
+    parser.add_argument("--months", type=int, default=settings.archive_retention_months)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = archive.archive_closed_periods(db, before=archive_cutoff(args.months))
+    finally:
+        db.close()
+    print(
+        f"归档截止 {report['archived_before']}: 库存变动 {report['inventory_movements']} 条，"
+        f"销售单 {report['sales']} 张，采购单 {report['purchases']} 张，耗时 {report['elapsed_ms']} ms"
+    )
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+全量平均成本重算耗时
+用法: python benchmarks/cost_revaluation.py [--products 100000] [--purchases 3] [--sales 3]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Customer, Inventory, Product, Purchase, PurchaseItem, Sale, SaleItem, Supplier, User
+from app.crud import cost_revaluation
+
+CHUNK = 20000
+
+
+def insert_chunked(conn, model, rows):
+    for start in range(0, len(rows), CHUNK):
+        conn.execute(insert(model), rows[start:start + CHUNK])
+
+
+def prepare(engine, args):
+    Base.metadata.create_all(bind=engine)
+    random.seed(42)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(username="bench", email="bench@example.com", password_hash="x"))
+        conn.execute(insert(Customer).values(name="基准客户"))
+        conn.execute(insert(Supplier).values(name="基准供应商"))
+        insert_chunked(conn, Product, [
+            {"name": f"商品{i}", "sku": f"SKU{i:06d}"} for i in range(1, args.products + 1)
+        ])
+        # 订单头：每个采购/销售单对应一组商品，日期随机（含补录的历史日期）
+        insert_chunked(conn, Purchase, [
+            {"supplier_id": 1, "user_id": 1, "purchase_number": f"PO{i:08d}", "status": "completed",
+             "purchase_date": start + timedelta(minutes=random.randint(0, 500000))}
+            for i in range(1, args.purchases + 1)
+        ])
+        insert_chunked(conn, Sale, [
+            {"customer_id": 1, "user_id": 1, "sale_number": f"SO{i:08d}", "status": "completed",
+             "sale_date": start + timedelta(minutes=random.randint(0, 500000))}
+            for i in range(1, args.sales + 1)
+        ])
+        purchase_lines = []
+        sale_lines = []
+        stock = {}
+        for product_id in range(1, args.products + 1):
+            for purchase_id in random.sample(range(1, args.purchases + 1), min(3, args.purchases)):
+                quantity = random.randint(10, 50)
+                price = round(random.uniform(5, 50), 2)
+                purchase_lines.append({"purchase_id": purchase_id, "product_id": product_id,
+                                       "quantity": quantity, "unit_price": price,
+                                       "total_price": round(quantity * price, 2)})
+                stock[product_id] = stock.get(product_id, 0) + quantity
+            for sale_id in random.sample(range(1, args.sales + 1), min(3, args.sales)):
+                quantity = random.randint(1, 10)
+                sale_lines.append({"sale_id": sale_id, "product_id": product_id, "quantity": quantity,
+                                   "unit_price": 60, "total_price": quantity * 60})
+                stock[product_id] -= quantity
+        insert_chunked(conn, PurchaseItem, purchase_lines)
+        insert_chunked(conn, SaleItem, sale_lines)
+        # 增量维护的成本已失真
+        insert_chunked(conn, Inventory, [
+            {"product_id": product_id, "quantity": quantity, "avg_cost": 0}
+            for product_id, quantity in stock.items()
+        ])
+    return len(purchase_lines) + len(sale_lines)
+
+
+def main():
+    logging.getLogger("app.slow_query").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(description="平均成本重算基准测试")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--purchases", type=int, default=2000, help="采购单数")
+    parser.add_argument("--sales", type=int, default=5000, help="销售单数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        lines = prepare(engine, args)
+        db = sessionmaker(bind=engine, autoflush=False)()
+
+        started = time.perf_counter()
+        first = cost_revaluation.revalue(db)
+        first_s = time.perf_counter() - started
+        started = time.perf_counter()
+        second = cost_revaluation.revalue(db)
+        second_s = time.perf_counter() - started
+
+        db.close()
+        engine.dispose()
+
+    print(f"商品 {args.products}，订单明细 {lines}")
+    print(f"首次重算  更新 {first['updated']:>7} 个  耗时 {first_s:>6.2f} s")
+    print(f"再次重算  更新 {second['updated']:>7} 个  耗时 {second_s:>6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
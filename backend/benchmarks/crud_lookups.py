@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+热点单行查询的单次耗时对比：旧式 db.query() 与预构建语句
+用法: python benchmarks/crud_lookups.py [--iterations 5000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Customer, Inventory, Product
+from app.crud import customer as customer_crud
+from app.crud import inventory as inventory_crud
+from app.crud import product as product_crud
+
+
+def prepare(engine):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {"name": f"商品{i}", "sku": f"SKU{i:05d}"} for i in range(1, 1001)
+        ])
+        conn.execute(insert(Inventory), [
+            {"product_id": i, "quantity": 100, "avg_cost": 10} for i in range(1, 1001)
+        ])
+        conn.execute(insert(Customer), [
+            {"name": f"客户{i}"} for i in range(1, 201)
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CRUD热点查询微基准")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        prepare(engine)
+        db = sessionmaker(bind=engine, autoflush=False)()
+
+        cases = [
+            (
+                "CRUDBase.get",
+                lambda: db.query(Product).filter(Product.id == 500).first(),
+                lambda: product_crud.get(db, id=500),
+            ),
+            (
+                "InventoryCRUD.get_by_product",
+                lambda: db.query(Inventory).filter(Inventory.product_id == 500).first(),
+                lambda: inventory_crud.get_by_product(db, product_id=500),
+            ),
+            (
+                "CRUDProduct.get_by_sku",
+                lambda: db.query(Product).filter(Product.sku == "SKU00500").first(),
+                lambda: product_crud.get_by_sku(db, sku="SKU00500"),
+            ),
+            (
+                "CRUDProduct.get_by_name",
+                lambda: db.query(Product).filter(Product.name == "商品500").first(),
+                lambda: product_crud.get_by_name(db, name="商品500"),
+            ),
+            (
+                "CRUDCustomer.get_by_name",
+                lambda: db.query(Customer).filter(Customer.name == "客户100").first(),
+                lambda: customer_crud.get_by_name(db, name="客户100"),
+            ),
+        ]
+
+        print(f"{'查询':<30}{'db.query (us)':>16}{'预构建 (us)':>14}{'节省':>10}")
+        for name, legacy, cached in cases:
+            # 预热编译缓存
+            legacy()
+            cached()
+            legacy_us = min(timeit.repeat(legacy, number=args.iterations, repeat=3)) / args.iterations * 1e6
+            cached_us = min(timeit.repeat(cached, number=args.iterations, repeat=3)) / args.iterations * 1e6
+            saving = (legacy_us - cached_us) / legacy_us
+            print(f"{name:<30}{legacy_us:>16.1f}{cached_us:>14.1f}{saving:>10.0%}")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+并发下单：每单独立提交与组提交（同一时间窗口内的订单合并为一次提交）的吞吐对比
+用法: python benchmarks/group_commit.py [--threads 16] [--orders 200] [--window-ms 2] [--synchronous FULL]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base, create_db_engine
+from app.group_commit import GroupCommitWriter
+from app.models import Customer, Inventory, Product, Sale, User
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID, Warehouse, WarehouseStock
+from app.crud import sale as sale_crud
+from app.crud.document_number import SALE_PREFIX, document_number
+from app.schemas.sale import SaleCreate
+
+PRODUCT_COUNT = 20
+
+
+def prepare(engine, stock):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(username="bench", email="bench@example.com", password_hash="x"))
+        conn.execute(insert(Customer).values(name="基准客户"))
+        conn.execute(insert(Product), [
+            {"name": f"商品{i}", "sku": f"SKU{i:05d}"} for i in range(1, PRODUCT_COUNT + 1)
+        ])
+        conn.execute(insert(Inventory), [
+            {"product_id": i, "quantity": stock, "avg_cost": 10} for i in range(1, PRODUCT_COUNT + 1)
+        ])
+        conn.execute(insert(Warehouse).values(id=DEFAULT_WAREHOUSE_ID, code="MAIN", name="默认仓库"))
+        conn.execute(insert(WarehouseStock), [
+            {"product_id": i, "warehouse_id": DEFAULT_WAREHOUSE_ID, "quantity": stock}
+            for i in range(1, PRODUCT_COUNT + 1)
+        ])
+
+
+def per_call_worker(Session, orders):
+    for sale_in in orders:
+        db = Session()
+        try:
+            sale_crud.create_sale_with_items(db, sale_in=sale_in, user_id=1)
+        finally:
+            db.close()
+
+
+def group_worker(writer, orders):
+    for sale_in in orders:
+        writer.submit(
+            lambda db, sale_in=sale_in: sale_crud.post_sale(db, sale_in=sale_in, user_id=1).id
+        ).result()
+
+
+def run(label, args, order_batches):
+    # 号段缓存属于进程，切换数据库前清空
+    document_number._blocks.clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        prepare(engine, stock=10 ** 6)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        writer = None
+        if label == "组提交":
+            writer = GroupCommitWriter(
+                Session,
+                window_ms=args.window_ms,
+                max_batch=args.max_batch,
+                before_batch=lambda db, count: document_number.reserve(db, SALE_PREFIX, count),
+                name="bench-group-commit"
+            )
+            writer.start()
+            pool = [threading.Thread(target=group_worker, args=(writer, batch)) for batch in order_batches]
+        else:
+            pool = [threading.Thread(target=per_call_worker, args=(Session, batch)) for batch in order_batches]
+
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+        if writer:
+            writer.stop()
+
+        with engine.connect() as conn:
+            created = conn.execute(select(func.count()).select_from(Sale)).scalar_one()
+        engine.dispose()
+
+    print(f"{label:<8} 订单 {created:>6}  耗时 {elapsed:>7.2f} s  吞吐 {created / elapsed:>8.1f} 单/s")
+    return created / elapsed
+
+
+def main():
+    logging.getLogger("app.slow_query").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(description="组提交基准测试")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--orders", type=int, default=200, help="每个线程的下单数")
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=200)
+    parser.add_argument("--synchronous", default=settings.sqlite_synchronous,
+                        help="SQLite synchronous 级别，FULL 时每次提交都会fsync")
+    args = parser.parse_args()
+    # 连接建立时读取，需在创建引擎前设置
+    settings.sqlite_synchronous = args.synchronous
+
+    random.seed(42)
+    order_batches = [
+        [
+            SaleCreate(customer_id=1, items=[
+                {"product_id": pid, "quantity": random.randint(1, 3), "unit_price": 20}
+                for pid in random.sample(range(1, PRODUCT_COUNT + 1), random.randint(1, 3))
+            ])
+            for _ in range(args.orders)
+        ]
+        for _ in range(args.threads)
+    ]
+
+    print(f"线程数 {args.threads}，每线程订单 {args.orders}，synchronous={args.synchronous}，"
+          f"窗口 {args.window_ms} ms")
+    per_call_tps = run("逐单提交", args, order_batches)
+    group_tps = run("组提交", args, order_batches)
+    print(f"吞吐提升: {group_tps / per_call_tps:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+大采购单入库耗时：逐行ORM处理与批量（IN查询 + executemany）处理对比
+用法: python benchmarks/purchase_posting.py [--lines 100 300 1000]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Inventory, InventoryMovement, Product, Purchase, PurchaseItem, Supplier, User
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID, Warehouse, WarehouseStock
+from app.crud import purchase as purchase_crud
+from app.schemas.purchase import PurchaseCreate
+
+PRODUCT_COUNT = 1200
+
+
+def prepare(engine):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(username="bench", email="bench@example.com", password_hash="x"))
+        conn.execute(insert(Supplier).values(name="基准供应商"))
+        conn.execute(insert(Product), [
+            {"name": f"商品{i}", "sku": f"SKU{i:05d}"} for i in range(1, PRODUCT_COUNT + 1)
+        ])
+        # 留出一部分商品没有库存记录，覆盖新建库存的分支
+        conn.execute(insert(Inventory), [
+            {"product_id": i, "quantity": 50, "avg_cost": 8} for i in range(1, PRODUCT_COUNT - 99)
+        ])
+        conn.execute(insert(Warehouse).values(id=DEFAULT_WAREHOUSE_ID, code="MAIN", name="默认仓库"))
+        conn.execute(insert(WarehouseStock), [
+            {"product_id": i, "warehouse_id": DEFAULT_WAREHOUSE_ID, "quantity": 50}
+            for i in range(1, PRODUCT_COUNT - 99)
+        ])
+
+
+def legacy_create_purchase(db, purchase_in, user_id):
+    """改造前的实现：逐行查询库存并通过ORM逐条写入"""
+    purchase_number = f"PO{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
+    db_purchase = Purchase(supplier_id=purchase_in.supplier_id, user_id=user_id,
+                           purchase_number=purchase_number, total_amount=0, status="pending")
+    db.add(db_purchase)
+    db.flush()
+    total_amount = 0
+    for item_data in purchase_in.items:
+        item_total = item_data.quantity * item_data.unit_price
+        total_amount += item_total
+        db.add(PurchaseItem(purchase_id=db_purchase.id, product_id=item_data.product_id,
+                            quantity=item_data.quantity, unit_price=item_data.unit_price,
+                            total_price=item_total))
+        inventory = db.query(Inventory).filter(Inventory.product_id == item_data.product_id).first()
+        if inventory:
+            old_value = inventory.quantity * inventory.avg_cost
+            inventory.quantity += item_data.quantity
+            inventory.avg_cost = (old_value + item_total) / inventory.quantity
+            inventory.last_updated = datetime.now()
+        else:
+            db.add(Inventory(product_id=item_data.product_id, quantity=item_data.quantity,
+                             avg_cost=item_data.unit_price))
+        db.add(InventoryMovement(product_id=item_data.product_id, movement_type="in",
+                                 quantity=item_data.quantity, reference_type="purchase",
+                                 reference_id=db_purchase.id))
+        db.flush()
+    db_purchase.total_amount = total_amount
+    db.commit()
+
+
+def set_based_create_purchase(db, purchase_in, user_id):
+    purchase_crud.create_purchase_with_items(db, purchase_in=purchase_in, user_id=user_id)
+
+
+def run(create, purchase_in):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        prepare(engine)
+        db = sessionmaker(bind=engine, autoflush=False)()
+        started = time.perf_counter()
+        create(db, purchase_in, 1)
+        elapsed = time.perf_counter() - started
+        stock = db.execute(
+            select(Inventory.product_id, Inventory.quantity, Inventory.avg_cost)
+            .order_by(Inventory.product_id)
+        ).all()
+        db.close()
+        engine.dispose()
+    return elapsed, [(pid, qty, float(cost)) for pid, qty, cost in stock]
+
+
+def same_stock(left, right):
+    """数量必须一致；逐行与汇总计算平均成本的舍入顺序不同，允许一分钱误差"""
+    return len(left) == len(right) and all(
+        a[0] == b[0] and a[1] == b[1] and abs(a[2] - b[2]) <= 0.011
+        for a, b in zip(left, right)
+    )
+
+
+def main():
+    logging.getLogger("app.slow_query").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(description="大采购单入库基准测试")
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 300, 1000])
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f"{'行数':>6}{'逐行 (ms)':>14}{'批量 (ms)':>14}{'加速':>8}  结果一致")
+    for lines in args.lines:
+        purchase_in = PurchaseCreate(supplier_id=1, items=[
+            {"product_id": random.randint(1, PRODUCT_COUNT), "quantity": random.randint(1, 20),
+             "unit_price": f"{random.uniform(5, 15):.2f}"}
+            for _ in range(lines)
+        ])
+        legacy_s, legacy_stock = run(legacy_create_purchase, purchase_in)
+        bulk_s, bulk_stock = run(set_based_create_purchase, purchase_in)
+        print(f"{lines:>6}{legacy_s * 1000:>14.1f}{bulk_s * 1000:>14.1f}"
+              f"{legacy_s / bulk_s:>7.1f}x  {'是' if same_stock(legacy_stock, bulk_stock) else '否'}")
+
+
+if __name__ == "__main__":
+    main()
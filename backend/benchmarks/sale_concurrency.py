@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+并发下单：旧式“先查后改”扣减与条件UPDATE扣减的吞吐及超卖对比
+用法: python benchmarks/sale_concurrency.py [--threads 8] [--orders 400] [--stock 300]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Customer, Inventory, InventoryMovement, Product, Sale, SaleItem, User
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID, Warehouse, WarehouseStock
+from app.crud import sale as sale_crud
+from app.schemas.sale import SaleCreate
+
+PRODUCT_COUNT = 5
+
+
+def prepare(engine, stock):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(username="bench", email="bench@example.com", password_hash="x"))
+        conn.execute(insert(Customer).values(name="基准客户"))
+        conn.execute(insert(Product), [
+            {"name": f"商品{i}", "sku": f"SKU{i:05d}"} for i in range(1, PRODUCT_COUNT + 1)
+        ])
+        conn.execute(insert(Inventory), [
+            {"product_id": i, "quantity": stock, "avg_cost": 10} for i in range(1, PRODUCT_COUNT + 1)
+        ])
+        conn.execute(insert(Warehouse).values(id=DEFAULT_WAREHOUSE_ID, code="MAIN", name="默认仓库"))
+        conn.execute(insert(WarehouseStock), [
+            {"product_id": i, "warehouse_id": DEFAULT_WAREHOUSE_ID, "quantity": stock}
+            for i in range(1, PRODUCT_COUNT + 1)
+        ])
+
+
+def legacy_create_sale(db, sale_in, user_id):
+    """改造前的实现：逐项查询校验，再逐项读取并在Python中扣减"""
+    sale_number = f"SO{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
+    for item_data in sale_in.items:
+        inventory = db.query(Inventory).filter(Inventory.product_id == item_data.product_id).first()
+        if not inventory or inventory.quantity < item_data.quantity:
+            raise ValueError("库存不足")
+
+    db_sale = Sale(customer_id=sale_in.customer_id, user_id=user_id,
+                   sale_number=sale_number, total_amount=0, status="pending")
+    db.add(db_sale)
+    db.flush()
+    for item_data in sale_in.items:
+        db.add(SaleItem(sale_id=db_sale.id, product_id=item_data.product_id,
+                        quantity=item_data.quantity, unit_price=item_data.unit_price,
+                        total_price=item_data.quantity * item_data.unit_price))
+        inventory = db.query(Inventory).filter(Inventory.product_id == item_data.product_id).first()
+        if inventory:
+            inventory.quantity -= item_data.quantity
+            inventory.last_updated = datetime.now()
+        db.add(InventoryMovement(product_id=item_data.product_id, movement_type="out",
+                                 quantity=-item_data.quantity, reference_type="sale",
+                                 reference_id=db_sale.id))
+    db.commit()
+    db.refresh(db_sale)
+    return db_sale
+
+
+def guarded_create_sale(db, sale_in, user_id):
+    return sale_crud.create_sale_with_items(db, sale_in=sale_in, user_id=user_id)
+
+
+def worker(Session, create, orders, stats, lock):
+    created = rejected = errors = 0
+    for sale_in in orders:
+        db = Session()
+        try:
+            create(db, sale_in, 1)
+            created += 1
+        except ValueError:
+            rejected += 1
+        except OperationalError:
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    with lock:
+        stats["created"] += created
+        stats["rejected"] += rejected
+        stats["errors"] += errors
+
+
+def run(label, create, args, order_batches):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        prepare(engine, args.stock)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        stats = {"created": 0, "rejected": 0, "errors": 0}
+        lock = threading.Lock()
+        pool = [
+            threading.Thread(target=worker, args=(Session, create, batch, stats, lock))
+            for batch in order_batches
+        ]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with engine.connect() as conn:
+            sold = dict(conn.execute(
+                select(SaleItem.product_id, func.sum(SaleItem.quantity)).group_by(SaleItem.product_id)
+            ).all())
+            remaining = dict(conn.execute(select(Inventory.product_id, Inventory.quantity)).all())
+        engine.dispose()
+
+    # 超卖：实际售出超过初始库存，或库存数与售出数对不上（丢失更新）
+    oversold = sum(
+        max(0, sold.get(pid, 0) - args.stock) + abs(args.stock - sold.get(pid, 0) - remaining[pid])
+        for pid in remaining
+    )
+    processed = stats["created"] + stats["rejected"]
+    print(f"{label:<8} 成功 {stats['created']:>5}  库存不足 {stats['rejected']:>5}  锁冲突 {stats['errors']:>4}  "
+          f"吞吐 {processed / elapsed:>8.1f} 单/s  库存偏差 {oversold:>5}")
+    return processed / elapsed, oversold
+
+
+def main():
+    # 锁等待会产生大量慢查询日志，基准测试中关闭
+    logging.getLogger("app.slow_query").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(description="并发下单基准测试")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=400, help="每个线程的下单数")
+    parser.add_argument("--stock", type=int, default=300, help="每个商品的初始库存")
+    args = parser.parse_args()
+
+    random.seed(42)
+    order_batches = [
+        [
+            SaleCreate(customer_id=1, items=[
+                {"product_id": pid, "quantity": random.randint(1, 3), "unit_price": 20}
+                for pid in random.sample(range(1, PRODUCT_COUNT + 1), random.randint(1, 3))
+            ])
+            for _ in range(args.orders)
+        ]
+        for _ in range(args.threads)
+    ]
+
+    print(f"线程数 {args.threads}，每线程订单 {args.orders}，每商品初始库存 {args.stock}")
+    legacy_tps, _ = run("先查后改", legacy_create_sale, args, order_batches)
+    guarded_tps, _ = run("条件扣减", guarded_create_sale, args, order_batches)
+    print(f"吞吐提升: {guarded_tps / legacy_tps:.2f}x" if legacy_tps else "先查后改无成功订单")
+
+
+if __name__ == "__main__":
+    main()
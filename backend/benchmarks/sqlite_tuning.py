@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+SQLite调优前后的混合读写吞吐对比
+用法: python benchmarks/sqlite_tuning.py [--threads 8] [--seconds 5] [--write-ratio 0.2]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from app.database import Base, create_db_engine
+from app.models import Product, Inventory, InventoryMovement
+
+PRODUCT_COUNT = 200
+
+
+def prepare(engine):
+    """创建表结构并写入基础数据"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {"name": f"商品{i}", "sku": f"SKU{i:05d}", "reorder_level": 10}
+            for i in range(1, PRODUCT_COUNT + 1)
+        ])
+        conn.execute(insert(Inventory), [
+            {"product_id": i, "quantity": 1000, "avg_cost": 10}
+            for i in range(1, PRODUCT_COUNT + 1)
+        ])
+
+
+def worker(engine, deadline, write_ratio, stats, lock):
+    reads = writes = errors = 0
+    read_stmt = (
+        select(Inventory.quantity, Product.name)
+        .join(Product, Inventory.product_id == Product.id)
+    )
+    while time.perf_counter() < deadline:
+        product_id = random.randint(1, PRODUCT_COUNT)
+        try:
+            if random.random() < write_ratio:
+                with engine.begin() as conn:
+                    conn.execute(
+                        update(Inventory)
+                        .where(Inventory.product_id == product_id)
+                        .values(quantity=Inventory.quantity - 1)
+                    )
+                    conn.execute(insert(InventoryMovement).values(
+                        product_id=product_id,
+                        movement_type="out",
+                        quantity=-1,
+                        reference_type="benchmark"
+                    ))
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(
+                        read_stmt.where(Inventory.product_id == product_id)
+                    ).all()
+                reads += 1
+        except OperationalError:
+            # database is locked
+            errors += 1
+    with lock:
+        stats["reads"] += reads
+        stats["writes"] += writes
+        stats["errors"] += errors
+
+
+def run(label, engine, threads, seconds, write_ratio):
+    prepare(engine)
+    stats = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    pool = [
+        threading.Thread(target=worker, args=(engine, deadline, write_ratio, stats, lock))
+        for _ in range(threads)
+    ]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    engine.dispose()
+
+    total = stats["reads"] + stats["writes"]
+    print(f"{label:<8} 总操作 {total:>8}  吞吐 {total / seconds:>10.1f} ops/s  "
+          f"读 {stats['reads']:>8}  写 {stats['writes']:>7}  锁冲突 {stats['errors']:>5}")
+    return total / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite调优基准测试")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_url = f"sqlite:///{os.path.join(tmp, 'baseline.db')}"
+        tuned_url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+
+        print(f"线程数 {args.threads}，时长 {args.seconds}s，写比例 {args.write_ratio:.0%}")
+        before = run(
+            "调优前",
+            create_engine(baseline_url, connect_args={"check_same_thread": False}),
+            args.threads, args.seconds, args.write_ratio
+        )
+        after = run(
+            "调优后",
+            create_db_engine(tuned_url),
+            args.threads, args.seconds, args.write_ratio
+        )
+        print(f"吞吐提升: {after / before:.2f}x" if before else "调优前无成功操作")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,12 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import engine
-from app.models import Base
+from app.migrations import upgrade_database
 
 def create_tables():
-    """创建所有数据库表"""
+    """执行数据库迁移，创建所有数据库表"""
     try:
-        Base.metadata.create_all(bind=engine)
+        upgrade_database()
         print("数据库表创建成功！")
     except Exception as e:
         print(f"创建数据库表时出错: {e}")
@@ -8,17 +8,26 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy.orm import Session
 from decimal import Decimal
-from app.database import engine, SessionLocal, Base
-from app.models import User, Supplier, Customer, Product, Inventory, Purchase, Sale, PurchaseItem, SaleItem
+from app.database import SessionLocal
+from app.migrations import upgrade_database
+from app.models import User, Supplier, Customer, Product, Inventory, Purchase, Sale, PurchaseItem, SaleItem, WarehouseStock
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID
 from app.core.security import get_password_hash
 
+def _default_stock(db: Session, product_id: int) -> WarehouseStock:
+    """商品在默认仓库的库存行"""
+    return db.query(WarehouseStock).filter(
+        WarehouseStock.product_id == product_id,
+        WarehouseStock.warehouse_id == DEFAULT_WAREHOUSE_ID
+    ).one()
+
 def create_test_data():
     """创建大量测试数据"""
     print("脚本开始执行...")
 
     # 确保所有表都已创建
     print("正在创建数据库表...")
-    Base.metadata.create_all(bind=engine)
+    upgrade_database()
     print("数据库表创建完成")
 
     # 创建数据库会话
@@ -35,6 +44,7 @@ def create_test_data():
         db.query(SaleItem).delete()
         db.query(Purchase).delete()
         db.query(Sale).delete()
+        db.query(WarehouseStock).delete()
         db.query(Inventory).delete()
         db.query(Product).delete()
         db.query(Customer).delete()
@@ -179,6 +189,12 @@ def create_test_data():
             )
             inventories.append(inventory)
             db.add(inventory)
+            # 测试数据全部放在默认仓库
+            db.add(WarehouseStock(
+                product_id=product.id,
+                warehouse_id=DEFAULT_WAREHOUSE_ID,
+                quantity=quantity
+            ))
 
         db.commit()
 
@@ -228,6 +244,7 @@ def create_test_data():
                     inventory = db.query(Inventory).filter(Inventory.product_id == product.id).first()
                     if inventory:
                         inventory.quantity += quantity
+                        _default_stock(db, product.id).quantity += quantity
 
             purchase.total_amount = round(total_amount, 2)
 
@@ -270,6 +287,7 @@ def create_test_data():
                     inventory = db.query(Inventory).filter(Inventory.product_id == product.id).first()
                     if inventory and inventory.quantity >= quantity:
                         inventory.quantity -= quantity
+                        _default_stock(db, product.id).quantity -= quantity
 
             sale.total_amount = round(total_amount, 2)
 
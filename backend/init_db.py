@@ -5,14 +5,16 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy.orm import Session
-from app.database import engine, SessionLocal, Base
-from app.models import User, Supplier, Customer, Product, Inventory, Purchase, Sale
+from app.database import SessionLocal
+from app.migrations import upgrade_database
+from app.models import User, Supplier, Customer, Product, Inventory, Purchase, Sale, WarehouseStock
+from app.models.warehouse import DEFAULT_WAREHOUSE_ID
 from app.core.auth import get_password_hash
 
 def init_db():
     """初始化数据库"""
-    # 创建所有表
-    Base.metadata.create_all(bind=engine)
+    # 执行数据库迁移
+    upgrade_database()
     print("数据库表创建完成")
 
     # 创建数据库会话
@@ -132,7 +134,7 @@ def init_db():
         # 提交商品数据以便获取ID
         db.commit()
 
-        # 为每个商品创建库存记录
+        # 为每个商品创建库存记录（汇总行及默认仓库的库存）
         for product in products:
             inventory = Inventory(
                 product_id=product.id,
@@ -140,6 +142,11 @@ def init_db():
                 avg_cost=product.cost_price
             )
             db.add(inventory)
+            db.add(WarehouseStock(
+                product_id=product.id,
+                warehouse_id=DEFAULT_WAREHOUSE_ID,
+                quantity=inventory.quantity
+            ))
 
         # 提交所有更改
         db.commit()
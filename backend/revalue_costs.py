@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+"""
+按采购、销售流水重算全部商品的平均成本（可配置为每日定时任务）
+用法: python revalue_costs.py [商品ID ...]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.crud import cost_revaluation
+from app.database import SessionLocal
+
+if __name__ == "__main__":
+    product_ids = [int(arg) for arg in sys.argv[1:]] or None
+    db = SessionLocal()
+    try:
+        report = cost_revaluation.revalue(db, product_ids=product_ids)
+    finally:
+        db.close()
+    print(f"平均成本重算完成: 商品 {report['products']} 个，更新 {report['updated']} 个，耗时 {report['elapsed_ms']} ms")
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+"""
+创建库存快照检查点（可配置为定时任务）
+用法: python snapshot_inventory.py [--min-new-movements N]
+  --min-new-movements N  自上次检查点新增变动少于N条时跳过，频繁调用即每N条变动一个检查点
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.crud import inventory_snapshot
+from app.database import SessionLocal
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="创建库存快照检查点")
+    parser.add_argument("--min-new-movements", type=int, default=0)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = inventory_snapshot.take_snapshot(db, min_new_movements=args.min_new_movements)
+    finally:
+        db.close()
+    print(f"库存快照: 新增 {report['created']} 条，流水水位 {report['movement_id']}")
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+
+"""
+将SQLite主库复制到只读副本文件（本地测试读写分离）
+用法: REPLICA_DATABASE_URL=sqlite:///./inventory_replica.db python sync_replica.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import settings
+from app.database import refresh_sqlite_replica
+
+if __name__ == "__main__":
+    refresh_sqlite_replica()
+    print(f"副本已同步: {settings.database_url} -> {settings.replica_database_url}")
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# 导入 app 前指向临时库，避免在工作目录创建或改动 inventory.db
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'import.db')}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.api import deps  # noqa: E402
+from app.database import create_db_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import upgrade_database  # noqa: E402
+from app.models import Customer, Product, Supplier, User  # noqa: E402
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """每个测试使用独立的SQLite文件库，结构由迁移创建"""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    upgrade_database(url)
+    db_engine = create_db_engine(url)
+    yield db_engine
+    db_engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(session_factory):
+    """路由的读写会话都指向测试库；不进入lifespan，不启动定时任务"""
+    def override():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[deps.get_db] = override
+    app.dependency_overrides[deps.get_read_db] = override
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def seeded(db):
+    """基础数据：一个用户、供应商、客户和五个商品（预警值5）"""
+    db.add_all([
+        User(username="tester", email="tester@example.com", password_hash="x"),
+        Supplier(name="测试供应商"),
+        Customer(name="测试客户"),
+    ] + [
+        Product(name=f"商品{i}", sku=f"SKU{i}", reorder_level=5, cost_price=2, selling_price=5)
+        for i in range(1, 6)
+    ])
+    db.commit()
+    return db
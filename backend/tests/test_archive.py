@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.crud import archive, inventory, inventory_movement, sale
+from app.crud.archive import archive_cutoff
+from app.models import InventoryMovement, Sale
+from app.schemas.sale import SaleCreate
+
+OLD = datetime(2020, 3, 15, 10, 0)
+BEFORE = datetime(2021, 1, 1)
+
+
+@pytest.fixture
+def history(seeded):
+    """2020年的三条库存流水、两张已完成和一张待处理的销售单，另有一张当前订单"""
+    inventory.create_or_update(seeded, product_id=1, quantity=20)
+    for _ in range(3):
+        sale.create_sale_with_items(seeded, sale_in=SaleCreate(
+            customer_id=1, items=[{"product_id": 1, "quantity": 1, "unit_price": 5}]
+        ), user_id=1)
+    seeded.execute(text("UPDATE inventory_movements SET created_at = :old"), {"old": OLD})
+    seeded.execute(
+        text("UPDATE sales SET sale_date = :old, created_at = :old, "
+             "status = CASE WHEN id = 2 THEN 'pending' ELSE 'completed' END"),
+        {"old": OLD}
+    )
+    sale.create_sale_with_items(seeded, sale_in=SaleCreate(
+        customer_id=1, items=[{"product_id": 1, "quantity": 1, "unit_price": 5}]
+    ), user_id=1)
+    seeded.commit()
+    return seeded
+
+
+def test_cutoff_never_passes_start_of_year():
+    now = datetime(2026, 10, 18)
+    assert archive_cutoff(12, now) == datetime(2025, 10, 1)
+    assert archive_cutoff(3, now) == datetime(2026, 1, 1)
+
+
+def test_closed_rows_move_and_tiered_reads_include_them(history):
+    report = archive.archive_closed_periods(history, before=BEFORE)
+    assert report["sales"] == 2
+    assert report["inventory_movements"] == 4
+
+    hot_sales = {row.id: row.status for row in history.query(Sale)}
+    assert hot_sales == {2: "pending", 4: "pending"}
+
+    # 2020年的范围早于归档边界：合并归档表
+    daily = sale.get_daily_sales(history, date=OLD)
+    assert sorted(row.id for row in daily) == [1, 2, 3]
+    movements = inventory_movement.get_movements_by_date_range(
+        history, start_date=datetime(2020, 1, 1), end_date=datetime(2020, 12, 31)
+    )
+    assert len(movements) == 4
+
+    # 范围在边界之后只查热表
+    assert archive.tiered(history, Sale, since=BEFORE) is Sale
+    assert archive.tiered(history, InventoryMovement, since=datetime(2020, 1, 1)) is not InventoryMovement
+
+
+def test_rearchiving_does_not_move_boundary_back(history):
+    archive.archive_closed_periods(history, before=BEFORE)
+    report = archive.archive_closed_periods(history, before=datetime(2020, 1, 1))
+    assert report["sales"] == 0
+    assert archive.boundary(history, "sales") == BEFORE
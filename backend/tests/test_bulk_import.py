@@ -0,0 +1,97 @@
+import asyncio
+
+from sqlalchemy.exc import OperationalError
+
+from app.api.bulk import ndjson_chunks
+from app.crud.base import VersionConflict
+from app.crud.bulk import post_in_chunks
+from app.models import Customer
+from app.schemas.sale import SaleCreate
+
+
+def _post(db, order):
+    """写入一个客户作为订单；名称指定的错误在写入后抛出"""
+    name = order["name"]
+    customer = Customer(name=name)
+    db.add(customer)
+    db.flush()
+    if name == "conflict":
+        raise VersionConflict("版本已变更")
+    if name == "busy":
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+    if name == "invalid":
+        raise ValueError("库存不足")
+    return customer
+
+
+def test_order_errors_fail_only_that_order(seeded):
+    entries = [
+        (line, {"name": name})
+        for line, name in enumerate(["a", "conflict", "busy", None, "invalid", "b"], start=1)
+    ]
+    entries[3] = (4, "无法解析")
+    results = post_in_chunks(
+        seeded, entries, lambda order: _post(seeded, order), number_of=lambda customer: customer.name,
+        chunk_size=2
+    )
+    assert [(result["line"], result["status"]) for result in results] == [
+        (1, "created"), (2, "failed"), (3, "failed"), (4, "failed"), (5, "failed"), (6, "created")
+    ]
+    assert results[2]["error"] == "database is locked"
+    names = {customer.name for customer in seeded.query(Customer)}
+    assert {"a", "b"} <= names
+    assert not {"conflict", "busy", "invalid"} & names
+
+
+def test_failed_chunk_keeps_earlier_results(seeded, monkeypatch):
+    entries = [(1, {"name": "a"}), (2, {"name": "b"}), (3, {"name": "c"})]
+    commits = []
+    real_commit = seeded.commit
+
+    def commit():
+        commits.append(1)
+        if len(commits) == 2:
+            raise OperationalError("COMMIT", {}, Exception("database is locked"))
+        real_commit()
+
+    monkeypatch.setattr(seeded, "commit", commit)
+    results = post_in_chunks(
+        seeded, entries, lambda order: _post(seeded, order), number_of=lambda customer: customer.name,
+        chunk_size=2
+    )
+    assert [result["status"] for result in results] == ["created", "created", "failed"]
+    assert results[2]["error"] == "database is locked"
+
+
+async def _stream(*parts):
+    for part in parts:
+        yield part
+
+
+def _collect(stream, chunk_size):
+    async def run():
+        return [chunk async for chunk in ndjson_chunks(stream, SaleCreate, chunk_size)]
+    return asyncio.run(run())
+
+
+def test_ndjson_parsed_while_streaming():
+    line = b'{"customer_id": 1, "items": [{"product_id": 1, "quantity": 1, "unit_price": 5}]}'
+    # 行跨越多个数据块，含空行、CRLF与无法解析的行，末行没有换行符
+    body = line + b"\r\n\n" + b"not json\n" + line + b"\n" + b'{"customer_id": "x"}\n' + line
+    chunks = _collect(_stream(*[body[i:i + 7] for i in range(0, len(body), 7)]), 2)
+    assert [[line_number for line_number, _ in chunk] for chunk in chunks] == [[1, 3], [4, 5], [6]]
+    entries = [entry for chunk in chunks for _, entry in chunk]
+    assert isinstance(entries[0], SaleCreate)
+    assert entries[1].startswith("无法解析")
+    assert entries[3].startswith("数据校验失败")
+
+
+def test_bulk_route_reports_every_line(client, seeded):
+    body = b'{"customer_id": 99, "items": [{"product_id": 1, "quantity": 1, "unit_price": 5}]}\n[1]\n'
+    response = client.post(
+        "/api/sales/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["total"] == 2 and report["failed"] == 2
+    assert [result["error"] for result in report["results"]] == ["客户不存在", "无法解析: 每行必须是一个JSON对象"]
@@ -0,0 +1,65 @@
+from sqlalchemy import update
+
+from app.crud import cost_revaluation, inventory, purchase
+from app.crud.costing import _ADJUSTMENT, _INFLOW, _OUTFLOW, replay_average_costs
+from app.models.inventory import Inventory
+from app.schemas.purchase import PurchaseCreate
+
+
+def _adjust(db, quantity, new_avg_cost=None):
+    inventory.adjust_inventory(
+        db, product_id=1, adjustment_quantity=quantity, reason="盘点", user_id=1, new_avg_cost=new_avg_cost
+    )
+
+
+def _avg_cost(db):
+    db.expire_all()
+    return float(inventory.get_by_product(db, product_id=1).avg_cost)
+
+
+def test_replay_adjustments():
+    events = [
+        (1, _INFLOW, 10, 2.0),
+        (1, _ADJUSTMENT, 5, None),   # 按当前成本增加数量
+        (1, _OUTFLOW, -3, None),
+        (1, _ADJUSTMENT, 0, 4.0),    # 指定成本
+        (2, _ADJUSTMENT, 3, 1.0),
+        (3, _ADJUSTMENT, 3, None),   # 由未指定成本的调整入库，成本无法确定
+        (4, _ADJUSTMENT, 3, None),
+        (4, _OUTFLOW, -3, None),
+        (4, _INFLOW, 2, 6.0),
+    ]
+    assert replay_average_costs(events) == {1: 4.0, 2: 1.0, 4: 6.0}
+
+
+def test_revalue_keeps_adjustment_cost(seeded):
+    _adjust(seeded, 3, new_avg_cost=1.0)
+    assert _avg_cost(seeded) == 1.0
+    cost_revaluation.revalue(seeded)
+    assert _avg_cost(seeded) == 1.0
+
+    purchase.create_purchase_with_items(seeded, purchase_in=PurchaseCreate(
+        supplier_id=1, items=[{"product_id": 1, "quantity": 7, "unit_price": 2}]
+    ), user_id=1)
+    _adjust(seeded, 5, new_avg_cost=4.0)
+    assert _avg_cost(seeded) == 4.0
+    cost_revaluation.revalue(seeded)
+    assert _avg_cost(seeded) == 4.0
+
+
+def test_revalue_skips_unknown_cost(seeded):
+    _adjust(seeded, 3)
+    seeded.execute(update(Inventory).where(Inventory.product_id == 1).values(avg_cost=2.5))
+    seeded.commit()
+    assert cost_revaluation.revalue(seeded)["updated"] == 0
+    assert _avg_cost(seeded) == 2.5
+
+
+def test_revalue_keeps_directly_set_cost(seeded):
+    purchase.create_purchase_with_items(seeded, purchase_in=PurchaseCreate(
+        supplier_id=1, items=[{"product_id": 1, "quantity": 7, "unit_price": 2}]
+    ), user_id=1)
+    inventory.create_or_update(seeded, product_id=1, quantity=9, avg_cost=3.5)
+    assert _avg_cost(seeded) == 3.5
+    cost_revaluation.revalue(seeded)
+    assert _avg_cost(seeded) == 3.5
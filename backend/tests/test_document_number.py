@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from app.crud.document_number import DocumentNumberAllocator
+from app.models import Customer
+
+
+def _sequence(number):
+    return int(number[-6:])
+
+
+def test_numbers_continue_across_block_refills(db):
+    allocator = DocumentNumberAllocator(block_size=3)
+    numbers = [allocator.allocate(db, "SO") for _ in range(10)]
+    assert [_sequence(n) for n in numbers] == list(range(1, 11))
+
+    # 另一个进程（新分配器）从数据库中已预留的号码之后继续
+    other = DocumentNumberAllocator(block_size=3)
+    assert _sequence(other.allocate(db, "SO")) == 13
+
+
+def test_concurrent_allocations_are_unique(session_factory):
+    allocator = DocumentNumberAllocator(block_size=4)
+    numbers = []
+    lock = threading.Lock()
+
+    def worker():
+        session = session_factory()
+        try:
+            allocated = [allocator.allocate(session, "SO") for _ in range(25)]
+        finally:
+            session.close()
+        with lock:
+            numbers.extend(allocated)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(numbers) == 100
+    assert len(set(numbers)) == 100
+
+
+def test_reserved_numbers_stay_with_the_session(session_factory):
+    allocator = DocumentNumberAllocator(block_size=3)
+    first, second = session_factory(), session_factory()
+    try:
+        allocator.reserve(first, "SO", 5)
+        other = allocator.allocate(second, "SO")
+        mine = [allocator.allocate(first, "SO") for _ in range(5)]
+    finally:
+        first.close()
+        second.close()
+
+    assert other not in mine
+    assert [_sequence(n) for n in mine] == list(range(1, 6))
+
+
+def test_refill_fails_fast_while_session_holds_sqlite_write(db):
+    allocator = DocumentNumberAllocator(block_size=2)
+    allocator.reserve(db, "SO", 1)
+    db.add(Customer(name="写锁"))
+    db.flush()
+
+    assert [_sequence(allocator.allocate(db, "SO")) for _ in range(2)] == [1, 2]
+    with pytest.raises(RuntimeError):
+        allocator.allocate(db, "SO")
+    db.rollback()
+
+    # 事务结束后照常补充号段
+    assert _sequence(allocator.allocate(db, "SO")) == 3
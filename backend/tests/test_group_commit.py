@@ -0,0 +1,62 @@
+import pytest
+
+from app.group_commit import GroupCommitWriter
+from app.models import Customer
+
+
+@pytest.fixture
+def writer(session_factory):
+    """时间窗口足够长，同时提交的请求合并为一批；记录每批的会话与预留数量"""
+    batches = []
+
+    def open_session():
+        batches.append([])
+        return session_factory()
+
+    group_writer = GroupCommitWriter(
+        open_session, window_ms=200, max_batch=10,
+        before_batch=lambda db, count: batches[-1].append(count)
+    )
+    group_writer.start()
+    yield group_writer, batches
+    group_writer.stop()
+
+
+def _add_customer(name):
+    def work(db):
+        if name == "invalid":
+            db.add(Customer(name=name))
+            db.flush()
+            raise ValueError("无效客户")
+        customer = Customer(name=name)
+        db.add(customer)
+        db.flush()
+        return customer.id
+    return work
+
+
+def test_requests_in_one_window_share_a_commit(writer, db):
+    group_writer, batches = writer
+    futures = [group_writer.submit(_add_customer(f"客户{i}")) for i in range(5)]
+    ids = [future.result(timeout=5) for future in futures]
+
+    assert batches == [[5]]
+    assert len(set(ids)) == 5
+    assert db.query(Customer).count() == 5
+
+
+def test_failed_request_rolls_back_only_its_savepoint(writer, db):
+    group_writer, _ = writer
+    futures = [group_writer.submit(_add_customer(name)) for name in ("a", "invalid", "b")]
+
+    assert futures[0].result(timeout=5)
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5)
+    assert sorted(customer.name for customer in db.query(Customer)) == ["a", "b"]
+
+
+def test_submit_requires_running_writer(session_factory):
+    group_writer = GroupCommitWriter(session_factory, window_ms=1, max_batch=1)
+    with pytest.raises(RuntimeError):
+        group_writer.submit(_add_customer("a"))
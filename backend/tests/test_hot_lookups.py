@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT
+
+from app.crud import customer, inventory, product
+
+
+@pytest.fixture
+def cache_hits(engine):
+    """记录每条语句是否命中编译缓存"""
+    hits = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        hits.append(context.cache_hit is CACHE_HIT)
+
+    event.listen(engine, "after_cursor_execute", record)
+    yield hits
+    event.remove(engine, "after_cursor_execute", record)
+
+
+def test_lookups_find_rows_and_reuse_compiled_statements(seeded, cache_hits):
+    inventory.create_or_update(seeded, product_id=2, quantity=4)
+
+    for _ in range(2):
+        assert product.get(seeded, id=1).sku == "SKU1"
+        assert product.get_by_sku(seeded, sku="SKU2").id == 2
+        assert product.get_by_name(seeded, name="商品3").id == 3
+        assert customer.get_by_name(seeded, name="测试客户").id == 1
+        assert inventory.get_by_product(seeded, product_id=2).quantity == 4
+
+    # 第二轮的五次查询全部命中缓存
+    assert cache_hits[-5:] == [True] * 5
+
+
+def test_lookups_return_none_for_missing_rows(seeded):
+    assert product.get(seeded, id=999) is None
+    assert product.get_by_sku(seeded, sku="missing") is None
+    assert product.get_by_name(seeded, name="missing") is None
+    assert customer.get_by_name(seeded, name="missing") is None
+    assert inventory.get_by_product(seeded, product_id=5) is None
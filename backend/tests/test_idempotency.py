@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.idempotency import commit_with_key, find_replay
+from app.config import settings
+from app.crud import idempotency
+from app.models import IdempotencyKey
+
+
+def _commit(db, *, response, **kwargs):
+    return commit_with_key(db, write=lambda write_db: response, **kwargs)
+
+
+def test_expired_key_is_reused(db, monkeypatch):
+    # 有效期为0：写入即过期，且不触发定期清理
+    monkeypatch.setattr(settings, "idempotency_ttl_seconds", 0)
+    monkeypatch.setattr(settings, "idempotency_purge_interval_seconds", 3600)
+    monkeypatch.setattr(idempotency, "_last_purge", float("inf"))
+
+    assert _commit(db, scope="sales", key="k1", request_hash="a", response={"id": 1}) == {"id": 1}
+    assert find_replay(db, scope="sales", key="k1", request_hash="a") is None
+
+    monkeypatch.setattr(settings, "idempotency_ttl_seconds", 60)
+    assert _commit(db, scope="sales", key="k1", request_hash="b", response={"id": 2}) == {"id": 2}
+
+    rows = db.query(IdempotencyKey).filter(IdempotencyKey.key == "k1").all()
+    assert [json.loads(row.response_body) for row in rows] == [{"id": 2}]
+    assert find_replay(db, scope="sales", key="k1", request_hash="b").status_code == 200
+
+
+def test_active_key_replays_and_rejects_other_body(db):
+    _commit(db, scope="purchases", key="k2", request_hash="a", response={"id": 1})
+    replayed = find_replay(db, scope="purchases", key="k2", request_hash="a")
+    assert json.loads(replayed.body) == {"id": 1}
+    with pytest.raises(HTTPException) as error:
+        find_replay(db, scope="purchases", key="k2", request_hash="other")
+    assert error.value.status_code == 422
+
+
+def test_commit_callback_replays_concurrent_duplicate(db, session_factory):
+    """commit 回调在另一会话中执行写入（如组提交写线程），重复键返回先提交的响应"""
+    def commit(job):
+        write_db = session_factory()
+        try:
+            result = job(write_db)
+            write_db.commit()
+            return result
+        finally:
+            write_db.close()
+
+    first = commit_with_key(
+        db, scope="sales", key="k3", request_hash="a",
+        write=lambda write_db: {"id": 1}, commit=commit
+    )
+    assert first == {"id": 1}
+
+    # 并发请求在首次提交前已通过 find_replay，写入幂等记录时冲突
+    second = commit_with_key(
+        db, scope="sales", key="k3", request_hash="a",
+        write=lambda write_db: {"id": 2}, commit=commit
+    )
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert json.loads(second.body) == {"id": 1}
@@ -0,0 +1,63 @@
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.crud import analytics, inventory, inventory_counter, purchase, sale
+from app.models.inventory import Inventory
+from app.models.inventory_counter import InventoryCounter
+from app.schemas.purchase import PurchaseCreate
+from app.schemas.sale import SaleCreate
+
+
+def _write_stock(db):
+    purchase.create_purchase_with_items(db, purchase_in=PurchaseCreate(
+        supplier_id=1,
+        items=[{"product_id": product_id, "quantity": 10, "unit_price": 2} for product_id in range(1, 6)]
+    ), user_id=1)
+    db_sale = sale.create_sale_with_items(db, sale_in=SaleCreate(
+        customer_id=1,
+        items=[{"product_id": product_id, "quantity": product_id * 2, "unit_price": 5} for product_id in (1, 2, 5)]
+    ), user_id=1)
+    inventory.adjust_inventory(db, product_id=3, adjustment_quantity=-10, reason="报损", user_id=1)
+    return db_sale
+
+
+def _assert_no_drift(db):
+    summary = inventory_counter.get_summary(db)
+    report = inventory_counter.rebuild(db)
+    assert not any(report["drift"].values()), report["drift"]
+    assert inventory_counter.get_summary(db) == summary
+
+
+def test_counters_match_recount(seeded):
+    db_sale = _write_stock(seeded)
+    summary = inventory_counter.get_summary(seeded)
+    assert summary["total_items"] == 5
+    assert summary["out_of_stock_items"] == 2
+    assert summary["low_stock_items"] == 2
+    # 不同商品的增量写入不同的槽行
+    assert seeded.execute(select(func.count(InventoryCounter.id))).scalar() > 1
+    _assert_no_drift(seeded)
+
+    sale.bulk_update_status(seeded, ids=[db_sale.id], status="cancelled")
+    seeded.delete(seeded.execute(select(Inventory).where(Inventory.product_id == 4)).scalar_one())
+    seeded.commit()
+    assert inventory_counter.get_summary(seeded)["total_items"] == 4
+    _assert_no_drift(seeded)
+
+
+def test_slot_count_change(seeded, monkeypatch):
+    _write_stock(seeded)
+    monkeypatch.setattr(settings, "inventory_counter_slots", 3)
+    inventory.adjust_inventory(seeded, product_id=4, adjustment_quantity=-8, reason="报损", user_id=1)
+    _assert_no_drift(seeded)
+    slots = seeded.execute(select(InventoryCounter.id)).scalars().all()
+    assert set(slots) <= {0, 1, 2}
+
+
+def test_dashboard_reads_slot_sum(seeded):
+    _write_stock(seeded)
+    inventory_stats = analytics.get_dashboard_data(seeded)["inventory"]
+    summary = inventory_counter.get_summary(seeded)
+    assert inventory_stats["low_stock_products"] == summary["low_stock_items"]
+    assert inventory_stats["out_of_stock_products"] == summary["out_of_stock_items"]
+    assert inventory_stats["total_value"] == summary["total_inventory_value"]
@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.crud import inventory, inventory_counter, purchase, sale, stock_transfer
+from app.crud.inventory import rollup_sync
+from app.models import InventoryMovement, Warehouse
+from app.schemas.purchase import PurchaseCreate
+from app.schemas.sale import SaleCreate
+from app.schemas.stock_transfer import StockTransferCreate
+
+
+@pytest.fixture
+def deferred():
+    rollup_sync.deferred = True
+    yield
+    rollup_sync.deferred = False
+
+
+def _rollup_quantity(db, product_id):
+    db.expire_all()
+    return inventory.get_by_product(db, product_id=product_id).quantity
+
+
+def test_sale_commit_does_not_write_rollup(engine, seeded, deferred):
+    purchase.create_purchase_with_items(seeded, purchase_in=PurchaseCreate(
+        supplier_id=1, items=[{"product_id": 1, "quantity": 10, "unit_price": 2}]
+    ), user_id=1)
+    rollup_sync.flush(engine)
+    assert _rollup_quantity(seeded, 1) == 10
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        sale.create_sale_with_items(seeded, sale_in=SaleCreate(
+            customer_id=1, items=[{"product_id": 1, "quantity": 3, "unit_price": 5}]
+        ), user_id=1)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert not [statement for statement in statements if statement.startswith("UPDATE inventory ")]
+    assert not [statement for statement in statements if "inventory_counters" in statement]
+
+    # 可用数量立即反映出库，汇总行与计数器在批量同步后更新
+    assert inventory.total_quantities(seeded, product_ids=[1]) == {1: 7}
+    assert _rollup_quantity(seeded, 1) == 10
+    assert rollup_sync.pending == 1
+    assert rollup_sync.flush(engine) == 1
+    assert _rollup_quantity(seeded, 1) == 7
+    assert rollup_sync.pending == 0
+    report = inventory_counter.rebuild(seeded)
+    assert not any(report["drift"].values())
+
+
+def test_rollup_synced_after_commit_without_batch(seeded):
+    sale_in = SaleCreate(customer_id=1, items=[{"product_id": 2, "quantity": 1, "unit_price": 5}])
+    inventory.adjust_inventory(seeded, product_id=2, adjustment_quantity=4, reason="盘点", user_id=1)
+    sale.create_sale_with_items(seeded, sale_in=sale_in, user_id=1)
+    assert _rollup_quantity(seeded, 2) == 3
+    assert rollup_sync.pending == 0
+
+
+@pytest.fixture
+def two_warehouses(seeded):
+    """默认仓库有商品1共10件、平均成本2，另有一个空的二号仓库"""
+    seeded.add(Warehouse(code="WH2", name="二号仓库"))
+    seeded.commit()
+    purchase.create_purchase_with_items(seeded, purchase_in=PurchaseCreate(
+        supplier_id=1, items=[{"product_id": 1, "quantity": 10, "unit_price": 2}]
+    ), user_id=1)
+    return seeded
+
+
+def _locations(db, product_id):
+    return {
+        row["warehouse_id"]: row["quantity"]
+        for row in inventory.get_locations_flattened(db, product_id=product_id)
+    }
+
+
+def test_transfer_conserves_total_and_cost(client, two_warehouses):
+    response = client.post("/api/transfers/", json={
+        "from_warehouse_id": 1, "to_warehouse_id": 2,
+        "items": [{"product_id": 1, "quantity": 4}]
+    })
+    assert response.status_code == 200
+
+    assert _locations(two_warehouses, 1) == {1: 6, 2: 4}
+    assert _rollup_quantity(two_warehouses, 1) == 10
+    assert inventory.get_by_product(two_warehouses, product_id=1).avg_cost == Decimal("2.00")
+    movements = two_warehouses.query(InventoryMovement).filter_by(reference_type="transfer").all()
+    assert sorted((m.warehouse_id, m.quantity) for m in movements) == [(1, -4), (2, 4)]
+
+
+def test_transfer_beyond_source_stock_moves_nothing(client, two_warehouses):
+    response = client.post("/api/transfers/", json={
+        "from_warehouse_id": 1, "to_warehouse_id": 2,
+        "items": [{"product_id": 1, "quantity": 11}]
+    })
+    assert response.status_code == 400
+    assert "库存不足" in response.json()["detail"]
+    assert _locations(two_warehouses, 1) == {1: 10}
+
+
+def test_sale_deducts_only_its_warehouse(two_warehouses):
+    stock_transfer.create_transfer(two_warehouses, transfer_in=StockTransferCreate(
+        from_warehouse_id=1, to_warehouse_id=2, items=[{"product_id": 1, "quantity": 4}]
+    ), user_id=1)
+
+    # 总量10件，但二号仓库只有4件
+    with pytest.raises(ValueError, match="仓库 2 库存不足"):
+        sale.create_sale_with_items(two_warehouses, sale_in=SaleCreate(
+            customer_id=1,
+            items=[{"product_id": 1, "warehouse_id": 2, "quantity": 5, "unit_price": 5}]
+        ), user_id=1)
+
+    sale.create_sale_with_items(two_warehouses, sale_in=SaleCreate(
+        customer_id=1,
+        items=[{"product_id": 1, "warehouse_id": 2, "quantity": 3, "unit_price": 5}]
+    ), user_id=1)
+    assert _locations(two_warehouses, 1) == {1: 6, 2: 1}
+    assert _rollup_quantity(two_warehouses, 1) == 7
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.crud import inventory, inventory_snapshot
+from app.models.inventory_snapshot import InventorySnapshot
+
+
+def _adjust(db, quantity):
+    inventory.adjust_inventory(db, product_id=1, adjustment_quantity=quantity, reason="盘点", user_id=1)
+
+
+def test_checkpoints_in_same_second(seeded):
+    _adjust(seeded, 10)
+    inventory_snapshot.take_snapshot(seeded)
+    _adjust(seeded, 5)
+    inventory_snapshot.take_snapshot(seeded)
+    # SQLite 的 snapshot_at 只精确到秒：两个检查点落在同一秒
+    same_second = datetime.now().replace(microsecond=0) - timedelta(seconds=1)
+    seeded.execute(update(InventorySnapshot).values(snapshot_at=same_second))
+    seeded.commit()
+    _adjust(seeded, 2)
+
+    as_of = datetime.now() + timedelta(seconds=1)
+    assert inventory_snapshot.quantities_as_of(seeded, product_ids=[1], as_of=as_of) == {1: 17}
+
+
+def test_create_or_update_is_snapshotted(seeded):
+    _adjust(seeded, 10)
+    inventory_snapshot.take_snapshot(seeded)
+    inventory.create_or_update(seeded, product_id=1, quantity=4)
+    # 直接设置的数量记为调整流水，增量检查点会重新读取该商品
+    assert inventory_snapshot.take_snapshot(seeded)["created"] == 1
+    as_of = datetime.now() + timedelta(seconds=1)
+    assert inventory_snapshot.quantities_as_of(seeded, product_ids=[1], as_of=as_of) == {1: 4}
+    assert inventory.get_by_product(seeded, product_id=1).quantity == 4
+
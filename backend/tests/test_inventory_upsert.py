@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.crud import inventory as inventory_crud
+from app.database import create_db_engine
+from app.migrations import upgrade_database
+from app.models import Inventory
+
+
+def _rows(db, product_id):
+    db.expire_all()
+    return db.query(Inventory).filter(Inventory.product_id == product_id).all()
+
+
+def test_receipts_upsert_one_row_with_weighted_cost(seeded):
+    inventory_crud.apply_receipts(seeded, receipts={(1, 1): (10, Decimal(20))})
+    seeded.commit()
+    inventory_crud.apply_receipts(seeded, receipts={(1, 1): (10, Decimal(40))})
+    seeded.commit()
+
+    rows = _rows(seeded, 1)
+    assert len(rows) == 1
+    assert rows[0].quantity == 20
+    assert rows[0].avg_cost == Decimal("3.00")
+
+
+def test_create_or_update_keeps_cost_unless_given(seeded):
+    inventory_crud.create_or_update(seeded, product_id=2, quantity=5, avg_cost=4)
+    inventory = inventory_crud.create_or_update(seeded, product_id=2, quantity=8)
+    assert (inventory.quantity, inventory.avg_cost) == (8, Decimal("4.00"))
+
+    inventory = inventory_crud.create_or_update(seeded, product_id=2, quantity=8, avg_cost=6)
+    assert inventory.avg_cost == Decimal("6.00")
+    assert len(_rows(seeded, 2)) == 1
+
+
+def test_second_row_for_product_is_rejected(seeded):
+    inventory_crud.create_or_update(seeded, product_id=3, quantity=1)
+    seeded.add(Inventory(product_id=3, quantity=1))
+    with pytest.raises(IntegrityError):
+        seeded.flush()
+    seeded.rollback()
+
+
+def test_migration_merges_duplicate_rows(tmp_path):
+    url = f"sqlite:///{tmp_path / 'duplicates.db'}"
+    upgrade_database(url, revision="0002")
+    db_engine = create_db_engine(url)
+    try:
+        with db_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO inventory (product_id, quantity, avg_cost) "
+                "VALUES (1, 10, 2), (1, 30, 4), (2, 5, 1)"
+            ))
+        upgrade_database(url)
+        with db_engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT product_id, quantity, avg_cost FROM inventory ORDER BY product_id"
+            )).all()
+    finally:
+        db_engine.dispose()
+    assert [tuple(row) for row in rows] == [(1, 40, 3.5), (2, 5, 1)]
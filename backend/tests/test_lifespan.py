@@ -0,0 +1,37 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import lifespan as lifespan_module
+from app.config import settings
+from app.main import app
+from app.migrations import upgrade_database
+
+
+@pytest.fixture
+def migrations(monkeypatch):
+    """导入时使用的库先升级到最新版本，启动过程中的迁移调用只做记录"""
+    upgrade_database(settings.database_url)
+    calls = []
+    monkeypatch.setattr(lifespan_module, "upgrade_database", lambda: calls.append(True))
+    return calls
+
+
+def _startup_phases():
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        return [phase["phase"] for phase in app.state.startup_report["phases"]]
+
+
+def test_startup_skips_migrations_by_default(migrations):
+    phases = _startup_phases()
+    assert migrations == []
+    assert "migrations" not in phases
+    assert phases[0] == "pool_warmup"
+    assert "statement_cache" in phases
+
+
+def test_startup_runs_migrations_when_enabled(migrations, monkeypatch):
+    monkeypatch.setattr(settings, "run_migrations_on_startup", True)
+    phases = _startup_phases()
+    assert migrations == [True]
+    assert phases[0] == "migrations"
@@ -0,0 +1,54 @@
+from sqlalchemy import text
+
+from app.crud import inventory
+
+
+def test_adjust_response_hides_bookkeeping_columns(client, seeded):
+    response = client.post("/api/inventory/adjust", json={
+        "product_id": 1, "adjustment_quantity": 3, "reason": "盘点"
+    })
+    assert response.status_code == 200
+    inventory = response.json()["inventory"]
+    assert inventory["product_id"] == 1
+    assert inventory["quantity"] == 3
+    for column in ("counted_value", "counted_low", "counted_out", "shortage_margin", "version_id"):
+        assert column not in inventory
+
+
+def _set_stock(db, quantities):
+    for product_id, quantity in quantities.items():
+        inventory.create_or_update(db, product_id=product_id, quantity=quantity)
+
+
+def test_low_stock_lists_order_by_shortage(client, seeded):
+    # 预警值均为5：余量 1→-5, 2→-2, 3→0, 4→+5, 5→-1
+    _set_stock(seeded, {1: 0, 2: 3, 3: 5, 4: 10, 5: 4})
+
+    items = client.get("/api/inventory/", params={"low_stock": True}).json()
+    assert [item["product_id"] for item in items] == [1, 2, 5, 3]
+
+    items = client.get("/api/inventory/", params={"out_of_stock": True}).json()
+    assert [item["product_id"] for item in items] == [1]
+
+    products = client.get("/api/products/low-stock").json()
+    assert [product["id"] for product in products] == [1, 2, 5, 3]
+
+
+def test_reorder_level_change_moves_product_in_and_out(client, seeded):
+    _set_stock(seeded, {1: 8})
+    assert client.get("/api/inventory/", params={"low_stock": True}).json() == []
+
+    assert client.put("/api/products/1", json={"reorder_level": 10}).status_code == 200
+    items = client.get("/api/inventory/", params={"low_stock": True}).json()
+    assert [item["product_id"] for item in items] == [1]
+
+    assert client.put("/api/products/1", json={"reorder_level": 2}).status_code == 200
+    assert client.get("/api/inventory/", params={"low_stock": True}).json() == []
+
+
+def test_low_stock_query_uses_margin_index(seeded):
+    plan = seeded.execute(text(
+        "EXPLAIN QUERY PLAN SELECT * FROM inventory WHERE shortage_margin <= 0 "
+        "ORDER BY shortage_margin"
+    )).all()
+    assert any("ix_inventory_shortage_margin_quantity" in row[-1] for row in plan)
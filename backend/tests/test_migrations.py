@@ -0,0 +1,42 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import inspect, text
+
+from app.database import Base, create_db_engine
+from app.migrations import upgrade_database
+import app.models  # noqa: F401  注册全部模型
+
+
+def test_migrated_schema_matches_models(engine):
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+
+
+def test_filtered_order_lists_use_composite_indexes(engine):
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM sales "
+            "WHERE status = 'completed' ORDER BY created_at DESC LIMIT 20"
+        )).all()
+    assert any("ix_sales_status_created_at" in row[-1] for row in plan)
+
+
+def test_legacy_database_is_stamped_then_upgraded(tmp_path):
+    """旧版 create_all 建出的库没有 alembic_version：先标记为基线版本，再执行后续迁移"""
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    upgrade_database(url, revision="0001")
+    db_engine = create_db_engine(url)
+    try:
+        with db_engine.begin() as conn:
+            conn.execute(text("DROP TABLE alembic_version"))
+
+        upgrade_database(url)
+
+        inspector = inspect(db_engine)
+        assert "alembic_version" in inspector.get_table_names()
+        indexes = {index["name"] for index in inspector.get_indexes("sales")}
+        assert "ix_sales_status_created_at" in indexes
+        with db_engine.connect() as conn:
+            assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    finally:
+        db_engine.dispose()
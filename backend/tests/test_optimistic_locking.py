@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.crud import inventory
+from app.crud.base import VersionConflict, retry_on_conflict
+from app.models import Product
+
+
+def test_stale_product_version_returns_409(client, seeded):
+    response = client.put("/api/products/1", json={"selling_price": 6, "version_id": 1})
+    assert response.status_code == 200
+    assert response.json()["version_id"] == 2
+
+    response = client.put("/api/products/1", json={"selling_price": 7, "version_id": 1})
+    assert response.status_code == 409
+    seeded.expire_all()
+    assert seeded.get(Product, 1).selling_price == 6
+
+
+def test_concurrent_orm_writes_raise_stale_data(session_factory, seeded):
+    first, second = session_factory(), session_factory()
+    try:
+        product_a = first.get(Product, 2)
+        product_b = second.get(Product, 2)
+        product_a.reorder_level = 8
+        first.commit()
+
+        product_b.reorder_level = 9
+        with pytest.raises(StaleDataError):
+            second.commit()
+    finally:
+        first.close()
+        second.close()
+
+
+def test_retry_on_conflict_reruns_server_side_updates(db):
+    attempts = []
+
+    def operation():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise StaleDataError("并发修改")
+        return "done"
+
+    assert retry_on_conflict(db, operation) == "done"
+    assert len(attempts) == 2
+
+    def client_conflict():
+        attempts.append(1)
+        raise VersionConflict("版本已变更")
+
+    attempts.clear()
+    with pytest.raises(VersionConflict):
+        retry_on_conflict(db, client_conflict)
+    assert len(attempts) == 1
+
+
+def test_adjustments_from_stale_sessions_both_apply(session_factory, seeded):
+    inventory.create_or_update(seeded, product_id=1, quantity=10)
+    first, second = session_factory(), session_factory()
+    try:
+        # 第二个会话持有旧版本的库存行，调整时版本冲突，回滚后按最新数据重试
+        stale = inventory.get_by_product(second, product_id=1)
+        inventory.adjust_inventory(first, product_id=1, adjustment_quantity=3, reason="a", user_id=1)
+        assert stale.quantity == 10
+        inventory.adjust_inventory(second, product_id=1, adjustment_quantity=-2, reason="b", user_id=1)
+    finally:
+        first.close()
+        second.close()
+    seeded.expire_all()
+    assert inventory.get_by_product(seeded, product_id=1).quantity == 11
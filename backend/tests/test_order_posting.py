@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.crud import inventory, purchase
+from app.crud.document_number import PURCHASE_PREFIX, document_number
+from app.models import InventoryMovement, Product, PurchaseItem
+from app.schemas.purchase import PurchaseCreate
+
+
+def _purchase(lines):
+    return PurchaseCreate(supplier_id=1, items=[
+        {"product_id": product_id, "quantity": quantity, "unit_price": price}
+        for product_id, quantity, price in lines
+    ])
+
+
+@pytest.fixture
+def products(seeded):
+    """共300个商品，均已有库存记录"""
+    seeded.add_all([Product(name=f"批量商品{i}", sku=f"BULK{i}") for i in range(6, 301)])
+    seeded.commit()
+    purchase.create_purchase_with_items(
+        seeded, purchase_in=_purchase([(i, 1, 1) for i in range(1, 301)]), user_id=1
+    )
+    return seeded
+
+
+def _statements(engine, db, purchase_in):
+    """写入一张采购单并统计执行的SQL语句数（executemany计为一条）"""
+    document_number.reserve(db, PURCHASE_PREFIX, 1)
+    count = []
+    listener = lambda *args: count.append(1)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        purchase.create_purchase_with_items(db, purchase_in=purchase_in, user_id=1)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(count)
+
+
+def test_statement_count_does_not_grow_with_lines(engine, products):
+    # 汇总计数器按商品ID取模分行更新，小订单也覆盖全部计数器行
+    small = _statements(engine, products, _purchase([(i, 2, 3) for i in range(1, 21)]))
+    large = _statements(engine, products, _purchase([(i, 2, 3) for i in range(1, 301)]))
+    assert large == small
+
+
+def test_lines_are_written_and_costs_weighted(products):
+    # 同一商品的两行合并入库：原有1件成本1，新增 2件*4 + 1件*7
+    db_purchase = purchase.create_purchase_with_items(
+        products, purchase_in=_purchase([(7, 2, 4), (8, 5, 2), (7, 1, 7)]), user_id=1
+    )
+    assert products.query(PurchaseItem).filter_by(purchase_id=db_purchase.id).count() == 3
+    assert products.query(InventoryMovement).filter_by(reference_id=db_purchase.id).count() == 3
+    assert db_purchase.total_amount == Decimal("25.00")
+
+    products.expire_all()
+    row = inventory.get_by_product(products, product_id=7)
+    assert row.quantity == 4
+    assert row.avg_cost == Decimal("4.00")
+
+
+def test_inactive_warehouse_rejects_the_whole_order(products):
+    before = products.query(PurchaseItem).count()
+    with pytest.raises(ValueError):
+        purchase.create_purchase_with_items(products, purchase_in=PurchaseCreate(
+            supplier_id=1, items=[
+                {"product_id": 1, "quantity": 1, "unit_price": 1},
+                {"product_id": 2, "quantity": 1, "unit_price": 1, "warehouse_id": 99},
+            ]
+        ), user_id=1)
+    assert products.query(PurchaseItem).count() == before
+    products.expire_all()
+    assert inventory.get_by_product(products, product_id=1).quantity == 1
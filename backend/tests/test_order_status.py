@@ -0,0 +1,57 @@
+import pytest
+
+from app.crud import inventory, purchase, sale
+from app.schemas.purchase import PurchaseCreate
+from app.schemas.sale import SaleCreate
+
+
+def _quantity(db, product_id):
+    db.expire_all()
+    return inventory.get_by_product(db, product_id=product_id).quantity
+
+
+@pytest.fixture
+def orders(seeded):
+    """采购入库10件后销售出库3件，返回 (采购单ID, 销售单ID)"""
+    db_purchase = purchase.create_purchase_with_items(seeded, purchase_in=PurchaseCreate(
+        supplier_id=1, items=[{"product_id": 1, "quantity": 10, "unit_price": 2}]
+    ), user_id=1)
+    db_sale = sale.create_sale_with_items(seeded, sale_in=SaleCreate(
+        customer_id=1, items=[{"product_id": 1, "quantity": 3, "unit_price": 5}]
+    ), user_id=1)
+    return db_purchase.id, db_sale.id
+
+
+def test_patch_sale_cancel_restores_stock(client, seeded, orders):
+    _, sale_id = orders
+    assert _quantity(seeded, 1) == 7
+    response = client.patch(f"/api/sales/{sale_id}/status", params={"status": "cancelled"})
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "cancelled"
+    assert _quantity(seeded, 1) == 10
+
+    # 已取消订单不能恢复，未知状态同样拒绝
+    response = client.patch(f"/api/sales/{sale_id}/status", params={"status": "pending"})
+    assert response.status_code == 400
+    response = client.patch(f"/api/sales/{sale_id}/status", params={"status": "whatever"})
+    assert response.status_code == 400
+    assert _quantity(seeded, 1) == 10
+
+
+def test_put_sale_status_goes_through_transition(client, seeded, orders):
+    _, sale_id = orders
+    response = client.put(f"/api/sales/{sale_id}", json={"status": "cancelled"})
+    assert response.status_code == 200, response.text
+    assert _quantity(seeded, 1) == 10
+    response = client.put(f"/api/sales/{sale_id}", json={"status": "completed"})
+    assert response.status_code == 400
+
+
+def test_patch_purchase_cancel_deducts_stock(client, seeded, orders):
+    purchase_id, _ = orders
+    response = client.patch(f"/api/purchases/{purchase_id}/status", params={"status": "completed"})
+    assert response.status_code == 200, response.text
+    # 入库的10件已售出3件，取消采购时库存不足
+    response = client.patch(f"/api/purchases/{purchase_id}/status", params={"status": "cancelled"})
+    assert response.status_code == 400
+    assert _quantity(seeded, 1) == 7
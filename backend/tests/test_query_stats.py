@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from app import query_stats
+from app.query_stats import QueryStats, start_request_stats
+
+
+def test_summary_reports_rows():
+    stats = QueryStats()
+    stats.record("UPDATE a", 1.0, 3)
+    stats.record("SELECT b", 5.0, -1)
+    stats.record("DELETE c", 2.0, 2)
+    summary = stats.summary()
+    assert summary["query_count"] == 3
+    assert summary["row_count"] == 5
+    assert summary["slowest_statement"] == "SELECT b"
+    assert summary["slowest_rows"] is None
+
+
+@pytest.fixture
+def instrumented_engine():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "before_cursor_execute", query_stats.before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", query_stats.after_cursor_execute)
+    yield engine
+    engine.dispose()
+
+
+def test_records_rowcount_of_writes(instrumented_engine):
+    stats = start_request_stats()
+    with instrumented_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1), (2), (3)"))
+        conn.execute(text("UPDATE t SET x = x + 1 WHERE x > 1"))
+    summary = stats.summary()
+    assert summary["query_count"] == 3
+    assert summary["row_count"] == 5
+
+
+def test_failed_statement_leaves_no_state(instrumented_engine):
+    start_request_stats()
+    with instrumented_engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        assert "query_start_time" not in conn.info
+        assert conn.execute(text("SELECT 1")).scalar() == 1
@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.api import deps
+from app.config import settings
+from app.crud import inventory as inventory_crud
+from app.database import create_db_engine, refresh_sqlite_replica
+from app.main import app
+from app.migrations import upgrade_database
+
+
+@pytest.fixture
+def replica(tmp_path, engine, seeded, monkeypatch):
+    """主库有一条库存，副本为刚迁移的空库；路由使用真实的读写会话依赖"""
+    inventory_crud.adjust_inventory(
+        seeded, product_id=1, adjustment_quantity=7, reason="入库", user_id=1
+    )
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    upgrade_database(replica_url)
+    replica_engine = create_db_engine(replica_url)
+    monkeypatch.setattr(deps, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(deps, "ReadSessionLocal", sessionmaker(bind=replica_engine))
+    monkeypatch.setattr(settings, "database_url", str(engine.url))
+    monkeypatch.setattr(settings, "replica_database_url", replica_url)
+    yield TestClient(app)
+    replica_engine.dispose()
+
+
+def test_reads_go_to_replica_unless_read_your_writes(replica):
+    assert replica.get("/api/inventory/").json() == []
+
+    response = replica.get("/api/inventory/", headers={deps.READ_YOUR_WRITES_HEADER: "true"})
+    assert [item["quantity"] for item in response.json()] == [7]
+
+
+def test_refresh_copies_primary_into_replica(replica):
+    refresh_sqlite_replica()
+    assert [item["quantity"] for item in replica.get("/api/inventory/").json()] == [7]
+
+
+def test_refresh_requires_sqlite_replica(monkeypatch):
+    monkeypatch.setattr(settings, "replica_database_url", None)
+    with pytest.raises(ValueError):
+        refresh_sqlite_replica()
+
+    monkeypatch.setattr(settings, "replica_database_url", "postgresql://localhost/erp")
+    with pytest.raises(ValueError):
+        refresh_sqlite_replica()
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from app.crud import inventory, sale
+from app.models import InventoryMovement, Sale
+from app.schemas.sale import SaleCreate
+
+
+def _sale(items):
+    return SaleCreate(customer_id=1, items=[
+        {"product_id": product_id, "quantity": quantity, "unit_price": 5}
+        for product_id, quantity in items
+    ])
+
+
+def _quantity(db, product_id):
+    db.expire_all()
+    return inventory.get_by_product(db, product_id=product_id).quantity
+
+
+@pytest.fixture
+def stocked(seeded):
+    inventory.create_or_update(seeded, product_id=1, quantity=10)
+    inventory.create_or_update(seeded, product_id=2, quantity=3)
+    return seeded
+
+
+def test_oversell_is_rejected_without_side_effects(stocked):
+    sale.create_sale_with_items(stocked, sale_in=_sale([(1, 6)]), user_id=1)
+    with pytest.raises(ValueError, match="库存不足"):
+        sale.create_sale_with_items(stocked, sale_in=_sale([(1, 6)]), user_id=1)
+
+    assert _quantity(stocked, 1) == 4
+    assert stocked.query(Sale).count() == 1
+    assert stocked.query(InventoryMovement).filter_by(movement_type="out").count() == 1
+
+
+def test_failed_line_rolls_back_the_whole_sale(stocked):
+    # 同一商品的多行合并后一起校验：2 + 2 > 3
+    with pytest.raises(ValueError):
+        sale.create_sale_with_items(stocked, sale_in=_sale([(1, 2), (2, 2), (2, 2)]), user_id=1)
+    assert _quantity(stocked, 1) == 10
+    assert _quantity(stocked, 2) == 3
+    assert stocked.query(Sale).count() == 0
+
+
+def test_concurrent_sales_never_oversell(stocked, session_factory):
+    barrier = threading.Barrier(4)
+    outcomes = []
+
+    def worker():
+        db = session_factory()
+        try:
+            barrier.wait()
+            sale.create_sale_with_items(db, sale_in=_sale([(1, 3)]), user_id=1)
+            outcomes.append("ok")
+        except ValueError:
+            outcomes.append("rejected")
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ["ok", "ok", "ok", "rejected"]
+    assert _quantity(stocked, 1) == 1
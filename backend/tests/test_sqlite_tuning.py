@@ -0,0 +1,41 @@
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import create_db_engine
+
+
+def _pragma(db_engine, name):
+    with db_engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_new_connections_get_tuning_pragmas(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    try:
+        assert _pragma(db_engine, "journal_mode") == "wal"
+        assert _pragma(db_engine, "synchronous") == 1  # NORMAL
+        assert _pragma(db_engine, "busy_timeout") == settings.sqlite_busy_timeout_ms
+        assert _pragma(db_engine, "cache_size") == -settings.sqlite_cache_size_kb
+        assert _pragma(db_engine, "temp_store") == 2  # MEMORY
+        assert db_engine.pool.size() == settings.db_pool_size
+    finally:
+        db_engine.dispose()
+
+
+def test_tuning_can_be_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_tuning_enabled", False)
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'plain.db'}")
+    try:
+        assert _pragma(db_engine, "journal_mode") == "delete"
+        assert _pragma(db_engine, "synchronous") == 2  # FULL
+    finally:
+        db_engine.dispose()
+
+
+def test_memory_database_keeps_default_pool():
+    # 内存库不支持连接池大小参数，创建引擎不应报错
+    db_engine = create_db_engine("sqlite://")
+    try:
+        assert _pragma(db_engine, "journal_mode") == "memory"
+    finally:
+        db_engine.dispose()
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import time
+
+from app.crud import inventory
+from app.stock_alerts import LOW_STOCK, StockAlertMonitor
+
+
+def _stock(db, *product_ids):
+    """为商品写入低于预警值的库存"""
+    for product_id in product_ids:
+        inventory.adjust_inventory(db, product_id=product_id, adjustment_quantity=3, reason="盘点", user_id=1)
+
+
+def test_wait_is_woken_by_commit_thread(engine, seeded):
+    _stock(seeded, 1)
+    monitor = StockAlertMonitor()
+
+    async def poll():
+        timer = threading.Timer(0.1, monitor.evaluate, args=(engine, [1]))
+        timer.start()
+        started = time.monotonic()
+        alerts = await monitor.wait_alerts(after=0, wait=5)
+        timer.join()
+        return alerts, time.monotonic() - started
+
+    alerts, elapsed = asyncio.run(poll())
+    assert [alert["level"] for alert in alerts] == [LOW_STOCK]
+    assert elapsed < 2
+    assert not monitor._waiters
+
+
+def test_wait_times_out_without_alerts():
+    monitor = StockAlertMonitor()
+    assert asyncio.run(monitor.wait_alerts(after=0, wait=0.05)) == []
+    assert not monitor._waiters
+
+
+def test_after_beyond_last_id_restarts_from_first(engine, seeded):
+    # 进程重启后编号从1开始，客户端仍持有旧进程的编号
+    _stock(seeded, 1, 2)
+    monitor = StockAlertMonitor()
+    monitor.evaluate(engine, [1, 2])
+    assert [alert["id"] for alert in monitor.list_alerts(after=50)] == [1, 2]
+    assert monitor.list_alerts(after=2) == []
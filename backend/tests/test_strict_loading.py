@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from app.crud import purchase, sale
+from app.database import disable_strict_loading, enable_strict_loading
+from app.models import Sale
+from app.schemas.purchase import PurchaseCreate
+from app.schemas.sale import SaleCreate
+
+
+@pytest.fixture
+def strict():
+    enable_strict_loading()
+    yield
+    disable_strict_loading()
+
+
+@pytest.fixture
+def count_queries(engine):
+    """返回计数器：调用期间发出的SQL语句数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+    def run(fn):
+        statements.clear()
+        fn()
+        return len(statements)
+
+    yield run
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _post_orders(db, count):
+    for _ in range(count):
+        purchase.create_purchase_with_items(db, purchase_in=PurchaseCreate(
+            supplier_id=1,
+            items=[{"product_id": product_id, "quantity": 10, "unit_price": 2} for product_id in (1, 2, 3)]
+        ), user_id=1)
+        sale.create_sale_with_items(db, sale_in=SaleCreate(
+            customer_id=1,
+            items=[{"product_id": product_id, "quantity": 1, "unit_price": 5} for product_id in (1, 2, 3)]
+        ), user_id=1)
+
+
+def test_lazy_load_raises(seeded, strict):
+    _post_orders(seeded, 1)
+    seeded.expunge_all()
+    db_sale = seeded.query(Sale).first()
+    with pytest.raises(InvalidRequestError):
+        db_sale.items
+
+
+def test_writes_allowed_in_strict_mode(seeded, strict):
+    # 下单路径包含 ORM UPDATE（乐观锁版本号）与批量状态变更
+    _post_orders(seeded, 2)
+    assert sale.bulk_update_status(seeded, ids=[1], status="cancelled")["updated"] == 1
+    assert purchase.bulk_update_status(seeded, ids=[2], status="completed")["updated"] == 1
+
+
+def test_write_routes_in_strict_mode(client, seeded, strict):
+    response = client.post("/api/products/", json={
+        "name": "新商品", "sku": "NEW-1", "cost_price": 1, "selling_price": 2
+    })
+    assert response.status_code == 200, response.text
+    response = client.post("/api/inventory/adjust", json={
+        "product_id": 1, "adjustment_quantity": 5, "reason": "盘点", "new_avg_cost": 1
+    })
+    assert response.status_code == 200, response.text
+    response = client.put("/api/products/1", json={"reorder_level": 2})
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize("crud, reader", [
+    (sale, "get_with_items_flattened"),
+    (sale, "get_multi_with_items"),
+    (purchase, "get_with_items_flattened"),
+    (purchase, "get_multi_with_items"),
+])
+def test_list_query_count_is_constant(seeded, session_factory, strict, count_queries, crud, reader):
+    def read():
+        session = session_factory()
+        try:
+            results = getattr(crud, reader)(session)
+            if reader == "get_multi_with_items":
+                # 访问预加载的明细与商品，严格模式下懒加载会直接报错
+                for order in results:
+                    [item.product.name for item in order.items]
+        finally:
+            session.close()
+
+    _post_orders(seeded, 1)
+    few = count_queries(read)
+    _post_orders(seeded, 5)
+    many = count_queries(read)
+    assert few == many
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import column, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.crud import analytics, purchase, sale
+from app.crud.time_bucket import TIME_BUCKETS, time_bucket
+from app.models import Purchase, Sale
+from app.schemas.purchase import PurchaseCreate
+from app.schemas.sale import SaleCreate
+
+
+def _compile(unit, dialect):
+    return str(select(time_bucket(unit, column("sale_date"))).compile(dialect=dialect))
+
+
+@pytest.mark.parametrize("unit", TIME_BUCKETS)
+def test_compiles_for_sqlite(unit):
+    sql = _compile(unit, sqlite.dialect())
+    assert "sale_date" in sql
+    assert "date_trunc" not in sql
+
+
+@pytest.mark.parametrize("unit", TIME_BUCKETS)
+def test_compiles_for_postgresql(unit):
+    sql = _compile(unit, postgresql.dialect())
+    assert f"to_char(date_trunc('{unit}', sale_date), 'YYYY-MM-DD')" in sql
+
+
+def test_rejects_unknown_unit():
+    with pytest.raises(ValueError):
+        time_bucket("hour", column("sale_date"))
+
+
+# 2024-05-15 为周三：周一为 05-13，季度起始为 04-01
+EXPECTED_PERIODS = {
+    "day": "2024-05-15",
+    "week": "2024-05-13",
+    "month": "2024-05-01",
+    "quarter": "2024-04-01",
+    "year": "2024-01-01",
+}
+
+
+@pytest.fixture
+def completed_orders(seeded):
+    db = seeded
+    db_purchase = purchase.create_purchase_with_items(db, purchase_in=PurchaseCreate(
+        supplier_id=1, items=[{"product_id": 1, "quantity": 10, "unit_price": 2}]
+    ), user_id=1)
+    db_sale = sale.create_sale_with_items(db, sale_in=SaleCreate(
+        customer_id=1, items=[{"product_id": 1, "quantity": 3, "unit_price": 5}]
+    ), user_id=1)
+    business_date = datetime(2024, 5, 15, 14, 30)
+    db.query(Purchase).filter(Purchase.id == db_purchase.id).update(
+        {"purchase_date": business_date, "status": "completed"}
+    )
+    db.query(Sale).filter(Sale.id == db_sale.id).update(
+        {"sale_date": business_date, "status": "completed"}
+    )
+    db.commit()
+    return db
+
+
+@pytest.mark.parametrize("unit", TIME_BUCKETS)
+def test_sales_report_on_sqlite(completed_orders, unit):
+    report = analytics.get_sales_report(
+        completed_orders, start_date=datetime(2024, 1, 1), end_date=datetime(2024, 12, 31),
+        group_by=unit
+    )
+    assert report == [{
+        "period": EXPECTED_PERIODS[unit], "order_count": 1, "total_amount": 15.0, "avg_amount": 15.0
+    }]
+
+
+@pytest.mark.parametrize("unit", TIME_BUCKETS)
+def test_purchase_report_on_sqlite(completed_orders, unit):
+    report = analytics.get_purchase_report(
+        completed_orders, start_date=datetime(2024, 1, 1), end_date=datetime(2024, 12, 31),
+        group_by=unit
+    )
+    assert report == [{
+        "period": EXPECTED_PERIODS[unit], "order_count": 1, "total_amount": 20.0, "avg_amount": 20.0
+    }]